@@ -0,0 +1,295 @@
+"""
+Measures the throughput and peak memory of the opensearch_utils hot paths
+and of the indexer end to end, with OpenSearch and the data bucket replaced
+by in-process stand-ins so the numbers don't depend on the network.
+
+Every case reports documents per second, bytes per second and the peak
+memory allocated while it runs. The bytes are the bulk request contents
+for the Document and Payload cases, the filenames for the matching cases
+and the SQS events for the handler.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_indexer [--sizes 1000 100000 1000000] [--output results.json]
+
+and compare a later commit against the saved results with:
+
+    python -m benchmarks.bench_indexer --compare results.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from unittest import mock
+
+from benchmarks.bench_serializer import INSTRUMENTS, metadata_bodies
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.fits_header import BLOCK_SIZE, FitsHeaderReader
+from sds_in_a_box.SDSCode.lifecycle import ContainerResources
+from sds_in_a_box.SDSCode.matcher import FiletypeMatcher
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.client import Client
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.local_cluster import LocalCluster
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+
+
+class LocalBucket():
+    """Stands in for a boto3 S3 client, every object is the same small FITS file."""
+
+    def __init__(self):
+        cards = ["SIMPLE  =                    T", "DATE-OBS= '2025-01-02T03:04:05'",
+                 "DATE-END= '2025-01-02T04:04:05'", "INSTRUME= 'SWAPI'", "OBS_MODE= 'SCIENCE'", "END"]
+        header = "".join(card.ljust(80) for card in cards).ljust(BLOCK_SIZE).encode("ascii")
+        self.data = header + bytes(BLOCK_SIZE)
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(position) for position in Range[len("bytes="):].split("-"))
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+
+def measure(repeat, setup, function):
+    """
+    Returns the fastest of repeat runs of function in seconds, and the peak
+    memory in bytes allocated by a separate run traced with tracemalloc, so
+    the tracing doesn't slow down the timed runs. setup is called before
+    every run, outside of the measurements, and its result is passed to
+    function.
+    """
+    timings = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        function(state)
+        timings.append(time.perf_counter() - start)
+        del state
+
+    state = setup()
+    tracemalloc.start()
+    try:
+        function(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+def result(case, documents, size, seconds, peak):
+    """Returns the result of a case as a dict."""
+    return {
+        "case": case,
+        "documents": documents,
+        "bytes": size,
+        "seconds": seconds,
+        "docs_per_sec": documents / seconds,
+        "bytes_per_sec": size / seconds,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_documents(count, repeat):
+    """Returns the results of the Document and Payload cases for count documents."""
+    bodies = metadata_bodies(count)
+    index = Index("metadata")
+
+    def documents():
+        return [Document(index, i, Action.CREATE, body) for i, body in enumerate(bodies)]
+
+    def encoded_documents():
+        documents_out = documents()
+        for document in documents_out:
+            document.get_encoded()
+        return documents_out
+
+    def payload():
+        payload_out = Payload()
+        payload_out.add_documents(documents())
+        return payload_out
+
+    def update_body(documents_in):
+        # the new body is encoded again, as it is when the payload is built
+        for document, body in zip(documents_in, bodies):
+            document.update_body(dict(body, version="v999"))
+            document.get_encoded()
+
+    size = payload().size_in_bytes()
+    results = []
+
+    seconds, peak = measure(repeat, lambda: None, lambda state: documents())
+    results.append(result("document_construct", count, size, seconds, peak))
+
+    seconds, peak = measure(repeat, encoded_documents, update_body)
+    results.append(result("document_update_body", count, size, seconds, peak))
+
+    seconds, peak = measure(repeat, documents, lambda documents_in: Payload().add_documents(documents_in))
+    results.append(result("payload_add_documents", count, size, seconds, peak))
+
+    seconds, peak = measure(repeat, payload, lambda payload_in: payload_in.get_contents())
+    results.append(result("payload_get_contents", count, size, seconds, peak))
+    return results
+
+
+def large_config(count):
+    """Returns count file types, one per mission, level and instrument combination."""
+    filetypes = []
+    for i in range(count):
+        pattern = {"mission": "m{:03d}".format(i // (2 * len(INSTRUMENTS))), "level": "l{}".format(i % 2),
+                   "instrument": INSTRUMENTS[i // 2 % len(INSTRUMENTS)], "date": "*", "version": "*",
+                   "extension": "fits"}
+        filetypes.append({"product": "product-{}".format(i), "pattern": pattern})
+    return filetypes
+
+
+def bench_matching(filetype_count, count, repeat):
+    """Returns the results of classifying count filenames against filetype_count file types."""
+    filetypes = large_config(filetype_count)
+    rng = random.Random(0)
+    filenames = []
+    for _ in range(count):
+        pattern = rng.choice(filetypes)["pattern"]
+        filenames.append("{}_{}_{}_2025{:04d}_v{:03d}.fits".format(
+            pattern["mission"], pattern["level"], pattern["instrument"], rng.randrange(1231), rng.randrange(17)))
+    size = sum(len(filename.encode("utf-8")) for filename in filenames)
+
+    def scan(filenames_in):
+        # the linear scan over the configuration the handler used before the matcher
+        for filename in filenames_in:
+            for filetype in filetypes:
+                if indexer._check_for_matching_filetype(filetype["pattern"], filename) is not None:
+                    break
+
+    def match(filenames_in):
+        matcher = FiletypeMatcher(filetypes)
+        for filename in filenames_in:
+            matcher.match(filename)
+
+    case = "check_for_matching_filetype[{}]".format(filetype_count)
+    seconds, peak = measure(repeat, lambda: filenames, scan)
+    results = [result(case, count, size, seconds, peak)]
+
+    case = "matcher_match[{}]".format(filetype_count)
+    seconds, peak = measure(repeat, lambda: filenames, match)
+    results.append(result(case, count, size, seconds, peak))
+    return results
+
+
+def sqs_events(count, batch_size):
+    """Returns SQS events carrying count S3 notifications, batch_size messages each."""
+    events = []
+    for start in range(0, count, batch_size):
+        messages = []
+        for i in range(start, min(start + batch_size, count)):
+            key = "imap_l{}_{}_2025{:04d}_v{:03d}.fits".format(i % 2, INSTRUMENTS[i % len(INSTRUMENTS)], i // 17, i % 17)
+            notification = {"Records": [{"eventSource": "aws:s3", "eventName": "ObjectCreated:Put",
+                                         "s3": {"bucket": {"name": "IMAP-Data-Bucket"},
+                                                "object": {"key": key, "size": 2 * BLOCK_SIZE}}}]}
+            messages.append({"messageId": str(i), "eventSource": "aws:sqs", "body": json.dumps(notification)})
+        events.append({"Records": messages})
+    return events
+
+
+def bench_handler(count, batch_size, repeat):
+    """
+    Returns the result of indexing count new files with lambda_handler,
+    against a fresh stand-in cluster for every run. Logging is turned off
+    and the metric records are written to os.devnull while it runs, so the
+    numbers measure the indexing rather than stdout.
+    """
+    events = sqs_events(count, batch_size)
+    size = sum(len(json.dumps(event).encode("utf-8")) for event in events)
+
+    def setup():
+        cluster = LocalCluster()
+        return ContainerResources(indexer._load_allowed_filenames, lambda: Client(
+            hosts=[{"host": "localhost", "port": 9200}], http_auth=None, connnection_class=cluster.connection_class))
+
+    def handle(resources):
+        with mock.patch.object(indexer, "resources", resources), \
+                mock.patch.object(indexer, "header_reader", FitsHeaderReader(LocalBucket())), \
+                mock.patch.object(indexer, "_ready_indices", set()), \
+                mock.patch.dict(os.environ, {"OS_INDEX": "metadata"}), \
+                open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for event in events:
+                response = indexer.lambda_handler(event, None)
+                if response["batchItemFailures"]:
+                    raise RuntimeError("Failed to index {}".format(response["batchItemFailures"]))
+
+    logging.disable(logging.CRITICAL)
+    try:
+        seconds, peak = measure(repeat, setup, handle)
+    finally:
+        logging.disable(logging.NOTSET)
+    return [result("lambda_handler[batch={}]".format(batch_size), count, size, seconds, peak)]
+
+
+def run(sizes, filetypes, filenames, events, batch_size, repeat):
+    """Returns the results of every case."""
+    results = []
+    for count in sizes:
+        results.extend(bench_documents(count, repeat))
+    results.extend(bench_matching(filetypes, filenames, repeat))
+    results.extend(bench_handler(events, batch_size, repeat))
+    return results
+
+
+def get_commit():
+    """Returns the commit of the working tree, or None outside of a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="numbers of documents for the Document and Payload cases")
+    parser.add_argument("--filetypes", type=int, default=1000, help="number of file types in the large config")
+    parser.add_argument("--filenames", type=int, default=10000, help="number of filenames to classify")
+    parser.add_argument("--events", type=int, default=10000, help="number of files for the handler to index")
+    parser.add_argument("--batch-size", type=int, default=10, help="SQS messages per handler invocation")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--compare", help="results JSON of an earlier run to compare the docs/s against")
+    args = parser.parse_args()
+
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "results": run(args.sizes, args.filetypes, args.filenames, args.events, args.batch_size, args.repeat),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r["case"], r["documents"]): r for r in json.load(f)["results"]}
+
+    print("{:<38} {:>9} {:>14} {:>10} {:>10} {:>9}".format("case", "docs", "docs/s", "MB/s", "peak MB", "change"))
+    for r in report["results"]:
+        before = baseline.get((r["case"], r["documents"]))
+        change = "{:+.1%}".format(r["docs_per_sec"] / before["docs_per_sec"] - 1) if before else ""
+        print("{:<38} {:>9,} {:>14,.0f} {:>10,.1f} {:>10,.1f} {:>9}".format(
+            r["case"], r["documents"], r["docs_per_sec"], r["bytes_per_sec"] / 1e6,
+            r["peak_memory_bytes"] / 1e6, change))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares the serializer backends on metadata bodies like the ones the
+indexer builds from filenames.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_serializer [--documents N] [--repeat R]
+"""
+import argparse
+import json
+import time
+
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+from sds_in_a_box.SDSCode.opensearch_utils.serializer import available_serializers, get_serializer
+
+INSTRUMENTS = ["codice", "glows", "hit", "hi45", "hi90", "idex", "lo", "mag", "swapi", "swe", "ultra45", "ultra90"]
+
+
+def metadata_bodies(count):
+    """Returns count metadata bodies parsed from synthetic IMAP filenames."""
+    filetypes = indexer._load_allowed_filenames()
+    bodies = []
+    for i in range(count):
+        filename = "imap_l{}_{}_2025{:04d}_v{:03d}.fits".format(
+            i % 2, INSTRUMENTS[i % len(INSTRUMENTS)], i % 1231, i % 17)
+        for filetype in filetypes:
+            metadata = indexer._check_for_matching_filetype(filetype["pattern"], filename)
+            if metadata is not None:
+                bodies.append(metadata)
+                break
+    return bodies
+
+
+def best_of(repeat, function):
+    """Returns the fastest of repeat runs of function in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(documents, repeat):
+    """Returns the benchmark results for every installed backend."""
+    bodies = metadata_bodies(documents)
+    index = Index("metadata")
+    results = []
+
+    for name in available_serializers():
+        serializer = get_serializer(name)
+
+        def dumps():
+            for body in bodies:
+                serializer.dumps(body)
+
+        def payload():
+            payload = Payload()
+            payload.add_documents([Document(index, i, Action.CREATE, body, serializer=serializer)
+                                   for i, body in enumerate(bodies)])
+            for chunk in payload.get_chunks():
+                chunk.get_encoded()
+
+        dumps_seconds = best_of(repeat, dumps)
+        payload_seconds = best_of(repeat, payload)
+        results.append({
+            "serializer": name,
+            "documents": documents,
+            "dumps_docs_per_sec": documents / dumps_seconds,
+            "payload_docs_per_sec": documents / payload_seconds,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000, help="number of metadata bodies")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.documents, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("{:<10} {:>18} {:>20}".format("serializer", "dumps docs/s", "payload docs/s"))
+    for result in results:
+        print("{:<10} {:>18,.0f} {:>20,.0f}".format(
+            result["serializer"], result["dumps_docs_per_sec"], result["payload_docs_per_sec"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Rebuilds the metadata index from the files already in a data bucket.
+
+The keys are read page by page, either by listing the bucket or from an
+S3 Inventory report, every page is classified in one batch with the same
+FiletypeMatcher as the indexer Lambda, the FITS headers of the file types
+that have a "header" entry are read concurrently, and each page of
+matching keys is sent to OpenSearch as one Payload, so the documents get
+the same fields as the ones the Lambda writes. Progress is checkpointed to a local
+file after every page so an interrupted run resumes where it stopped.
+The keys of documents that failed to index are kept in the checkpoint and
+retried at the end of the run and when it is resumed.
+
+Run with:
+
+    python -m sds_in_a_box.SDSCode.backfill --bucket <bucket> --checkpoint backfill.json
+
+or, for large buckets, from the manifest of an inventory report:
+
+    python -m sds_in_a_box.SDSCode.backfill --inventory-manifest s3://<bucket>/<key>/manifest.json --checkpoint backfill.json
+
+Pass --bulk-load when building a new index that isn't serving searches
+yet, ex: before pointing an alias at it. It disables the refreshes and
+replicas of the index for the whole run, so searches don't see the new
+documents until it ends, and a killed run leaves the index that way until
+its settings are restored by hand.
+
+The OpenSearch connection is configured with the same environment
+variables as the indexer (OS_DOMAIN, OS_PORT, OS_ADMIN_USERNAME,
+OS_ADMIN_PASSWORD_LOCATION and OS_INDEX).
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+
+import boto3
+from botocore.config import Config
+
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.fits_header import FitsHeaderReader
+from sds_in_a_box.SDSCode.inventory import InventoryManifest
+from sds_in_a_box.SDSCode.matcher import FiletypeMatcher
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.mapping import IndexMapping
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint():
+    """
+    Class to represent the progress of a backfill, saved to a local JSON
+    file after every batch.
+
+    ...
+
+    Attributes
+    ----------
+    path: str
+        path of the checkpoint file.
+    position: str, dict, optional
+        position of the last batch that was indexed, ex: the last S3 key
+        listed or the inventory file and row. None if nothing has been
+        indexed yet.
+    counts: dict
+        running totals of the keys seen, skipped (no matching file type)
+        and of the document outcomes reported
+        by OpenSearch.
+    failed: set
+        keys that failed to index and are retried when the run resumes.
+
+    Methods
+    -------
+    update(position, keys, skipped, result):
+        records a finished batch and saves the checkpoint.
+    update_retried(keys, result):
+        records a retry of failed keys and saves the checkpoint.
+    save():
+        writes the checkpoint to its file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.position = None
+        self.counts = {"keys": 0, "skipped": 0}
+        self.failed = set()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.position = data["position"]
+            self.counts = data["counts"]
+            self.failed = set(data.get("failed", []))
+
+    def update(self, position, keys, skipped, result, failed=()):
+        """
+        Records a finished batch and saves the checkpoint. The keys of the
+        documents that failed are kept so the position can move past the
+        batch without leaving gaps in the index.
+
+        Parameters
+        ----------
+        position: str, dict
+            position of the last key in the batch.
+        keys: int
+            number of keys in the batch.
+        skipped: int
+            number of keys in the batch without a matching file type.
+        result: BulkResult
+            outcome of sending the batch to OpenSearch.
+        failed: list
+            keys of the batch that failed before they could be sent, ex:
+            their header couldn't be read from S3.
+        """
+        self.position = position
+        self.counts["keys"] += keys
+        self.counts["skipped"] += skipped
+        self.__add_outcomes(result)
+        self.failed.update(result.get_failed_identifiers())
+        self.failed.update(failed)
+        self.save()
+
+    def update_retried(self, keys, result, failed=()):
+        """
+        Records a retry of failed keys and saves the checkpoint. Keys that
+        failed again stay failed, the others are dropped.
+
+        Parameters
+        ----------
+        keys: list
+            failed keys that were retried.
+        result: BulkResult
+            outcome of sending them to OpenSearch.
+        failed: list
+            keys that failed again before they could be sent.
+        """
+        self.failed.difference_update(keys)
+        self.__add_outcomes(result)
+        self.failed.update(result.get_failed_identifiers())
+        self.failed.update(failed)
+        self.save()
+
+    def save(self):
+        """Writes the checkpoint to its file, replacing it atomically."""
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"position": self.position, "counts": self.counts, "failed": sorted(self.failed)}, f)
+        os.replace(temporary_path, self.path)
+
+    def __add_outcomes(self, result):
+        # a retried document is counted once per attempt
+        for outcome, count in result.get_counts().items():
+            self.counts[outcome] = self.counts.get(outcome, 0) + count
+
+    def __repr__(self):
+        return str({"position": self.position, "counts": self.counts, "failed": len(self.failed)})
+
+
+class Backfill():
+    """
+    Class to index existing files into OpenSearch in bulk.
+
+    ...
+
+    Attributes
+    ----------
+    client: Client
+        client used to send the payloads.
+    index: Index
+        index the documents are written to.
+    matcher: FiletypeMatcher
+        matcher used to classify the keys.
+    checkpoint: Checkpoint
+        progress of the backfill.
+    action: Action
+        action of the documents. INDEX by default so a rerun overwrites
+        documents instead of conflicting with them.
+    max_workers: int
+        number of bulk requests sent concurrently per batch.
+    mapping: IndexMapping, optional
+        mapping used to convert the metadata to the mapped types.
+    header_reader: FitsHeaderReader, optional
+        reader of the FITS headers of the file types with a "header"
+        entry. Without it the documents only get the filename fields, and
+        as INDEX replaces whole documents, a rerun would drop the header
+        fields the Lambda added.
+    header_workers: int
+        number of headers read from S3 at once.
+
+    Methods
+    -------
+    index_keys(keys, position, bucket):
+        indexes a batch of keys and checkpoints the position.
+    retry_failed(bucket):
+        indexes the keys that failed earlier in the run again.
+    run_listing(s3, bucket, prefix, page_size):
+        indexes every key of a bucket, resuming from the checkpoint.
+    run_inventory(s3, manifest, batch_size):
+        indexes every key of an inventory report, resuming from the checkpoint.
+    """
+    def __init__(self, client, index, matcher, checkpoint, action=Action.INDEX, max_workers=1, mapping=None,
+                 header_reader=None, header_workers=16):
+        self.client = client
+        self.index = Index.validate_index(index)
+        self.matcher = matcher
+        self.checkpoint = checkpoint
+        self.action = Action.validate_action(action)
+        self.max_workers = max_workers
+        self.mapping = mapping
+        self.header_reader = header_reader
+        self.header_workers = header_workers
+
+    def index_keys(self, keys, position, bucket=None):
+        """
+        Classifies a batch of keys, sends the matching ones as one Payload and
+        checkpoints the position once OpenSearch has accepted the batch.
+
+        Parameters
+        ----------
+        keys: list
+            S3 keys of the batch.
+        position: str, dict
+            position to resume after once the batch is indexed.
+        bucket: str, optional
+            bucket of the keys, to read their headers from.
+
+        Returns
+        -------
+        BulkResult
+            the outcome of sending the batch.
+        """
+        result, skipped, failed = self.__send(keys, bucket)
+        if result.get_failed_identifiers():
+            logger.warning("Failed to index {} documents, they are retried at the end of the run: {}".format(
+                len(result.get_failed_identifiers()), result.get_errors()))
+        self.checkpoint.update(position, len(keys), skipped, result, failed)
+        return result
+
+    def retry_failed(self, bucket=None):
+        """
+        Indexes the keys that failed earlier in the run again, in batches
+        of the listing page size. Keys that fail again stay in the
+        checkpoint for the next run.
+
+        Parameters
+        ----------
+        bucket: str, optional
+            bucket of the keys, to read their headers from.
+
+        Returns
+        -------
+        BulkResult
+            the outcome of the last batch, None if there was nothing to retry.
+        """
+        failed = sorted(self.checkpoint.failed)
+        result = None
+        for start in range(0, len(failed), 1000):
+            keys = failed[start:start + 1000]
+            logger.info("Retrying {} keys that failed to index".format(len(keys)))
+            result, _, failed_reads = self.__send(keys, bucket)
+            self.checkpoint.update_retried(keys, result, failed_reads)
+        if self.checkpoint.failed:
+            logger.warning("{} keys still fail to index: {}".format(
+                len(self.checkpoint.failed), sorted(self.checkpoint.failed)[:100]))
+        return result
+
+    def __send(self, keys, bucket):
+        """
+        Classifies keys, reads their headers and sends the matching ones as
+        one Payload. Returns the result, the number of keys skipped and the
+        keys whose header read failed and should be retried.
+        """
+        skipped = 0
+        failed = []
+        # keys are classified and identified the same way as in the indexer
+        matched = []
+        for key, match in zip(keys, self.matcher.match_batch(keys)):
+            if match is None:
+                skipped += 1
+            else:
+                matched.append((key, match[0], match[1]))
+
+        headers = {}
+        if self.header_reader is not None and bucket is not None:
+            positions = [position for position, (_, filetype, _) in enumerate(matched) if filetype.get("header")]
+            headers = dict(zip(positions, self.header_reader.read_many(
+                [(bucket, matched[position][0]) for position in positions], max_workers=self.header_workers)))
+
+        payload = Payload()
+        for position, (key, filetype, metadata) in enumerate(matched):
+            header = headers.get(position)
+            if isinstance(header, ValueError):
+                # not a FITS file, it is indexed with its filename metadata only, as by the indexer
+                logger.warning("Indexing {} without its header fields: {}".format(key, header))
+                header = None
+            if isinstance(header, Exception):
+                logger.warning("Failed to read the header of {}: {}".format(key, header))
+                failed.append(key)
+                continue
+            if header is not None:
+                metadata.update(header.get_fields(filetype["header"]))
+            if self.mapping is not None:
+                metadata = self.mapping.convert(metadata)
+            payload.add_documents(Document(self.index, key, self.action, metadata))
+
+        return self.client.send_payload(payload, max_workers=self.max_workers), skipped, failed
+
+    def run_listing(self, s3, bucket, prefix="", page_size=1000):
+        """
+        Lists the bucket and indexes every key, one listing page per batch.
+        S3 lists keys in lexicographic order, so the run resumes after the
+        last key of the last checkpointed page. Failed keys are retried
+        before and after the listing.
+
+        Parameters
+        ----------
+        s3:
+            boto3 S3 client.
+        bucket: str
+            name of the bucket to list.
+        prefix: str
+            only keys starting with the prefix are indexed.
+        page_size: int
+            number of keys per listing page, at most 1000.
+        """
+        kwargs = {"Bucket": bucket, "Prefix": prefix, "PaginationConfig": {"PageSize": page_size}}
+        if self.checkpoint.position is not None:
+            logger.info("Resuming after {}".format(self.checkpoint.position))
+            kwargs["StartAfter"] = self.checkpoint.position
+        self.retry_failed(bucket)
+
+        for page in s3.get_paginator("list_objects_v2").paginate(**kwargs):
+            keys = [item["Key"] for item in page.get("Contents", [])]
+            if not keys:
+                continue
+            self.index_keys(keys, keys[-1], bucket)
+            logger.info("Indexed through {}: {}".format(keys[-1], self.checkpoint.counts))
+        self.retry_failed(bucket)
+
+    def run_inventory(self, s3, manifest, batch_size=10000):
+        """
+        Reads the keys from the data files of an inventory report and
+        indexes them, one batch of rows at a time. The run resumes after
+        the last checkpointed row of the report. Failed keys are retried
+        before and after reading the report.
+
+        Parameters
+        ----------
+        s3:
+            boto3 S3 client.
+        manifest: InventoryManifest
+            manifest of the inventory report.
+        batch_size: int
+            maximum number of keys per batch.
+        """
+        start = self.checkpoint.position if isinstance(self.checkpoint.position, dict) else None
+        if start is not None:
+            logger.info("Resuming after {}".format(start))
+        if self.header_reader is not None and manifest.source_bucket is None:
+            logger.warning("The manifest has no source bucket, the FITS headers aren't read")
+        self.retry_failed(manifest.source_bucket)
+
+        for keys, position in manifest.iter_keys(s3, batch_size, start):
+            self.index_keys(keys, position, manifest.source_bucket)
+            logger.info("Indexed through {}: {}".format(position, self.checkpoint.counts))
+        self.retry_failed(manifest.source_bucket)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bucket", help="data bucket to list and index")
+    parser.add_argument("--inventory-manifest", help="s3:// url of an inventory manifest.json to index instead of listing")
+    parser.add_argument("--prefix", default="", help="only list keys starting with this prefix")
+    parser.add_argument("--checkpoint", required=True, help="local file used to save and resume progress")
+    parser.add_argument("--index", default=os.environ.get("OS_INDEX"), help="OpenSearch index, defaults to $OS_INDEX")
+    parser.add_argument("--page-size", type=int, default=None,
+                        help="keys per payload, 1000 when listing and 10000 from an inventory")
+    parser.add_argument("--max-workers", type=int, default=1, help="concurrent bulk requests")
+    parser.add_argument("--header-workers", type=int, default=16, help="concurrent FITS header reads")
+    parser.add_argument("--bulk-load", action="store_true",
+                        help="disable refreshes and replicas during the run, only for an index not serving searches")
+    args = parser.parse_args(argv)
+    if (args.bucket is None) == (args.inventory_manifest is None):
+        parser.error("one of --bucket or --inventory-manifest is required")
+
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    s3 = boto3.client("s3", config=Config(max_pool_connections=args.header_workers))
+    filetypes = indexer._load_allowed_filenames()
+    mapping = IndexMapping.from_filetypes(filetypes)
+    index = Index(args.index, mapping.get_index_body())
+    client = indexer._create_open_search_client()
+    try:
+        # indices recreated later, ex: by the indexer after a delete, get the same mapping
+        client.put_index_template(args.index, mapping.get_template([args.index]))
+        indexer._ensure_index(client, index)
+        backfill = Backfill(client, index, FiletypeMatcher(filetypes), Checkpoint(args.checkpoint),
+                            max_workers=args.max_workers, mapping=mapping,
+                            header_reader=FitsHeaderReader(s3), header_workers=args.header_workers)
+        # refreshes and replica writes are paused until the whole run is loaded
+        with client.bulk_load(index) if args.bulk_load else contextlib.nullcontext():
+            if args.inventory_manifest is not None:
+                manifest = InventoryManifest.from_url(s3, args.inventory_manifest)
+                backfill.run_inventory(s3, manifest, args.page_size or 10000)
+            else:
+                backfill.run_listing(s3, args.bucket, args.prefix, args.page_size or 1000)
+    finally:
+        client.close()
+    logger.info("Backfill finished: {}".format(backfill.checkpoint.counts))
+
+
+if __name__ == "__main__":
+    main()
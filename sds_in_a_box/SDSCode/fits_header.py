@@ -0,0 +1,273 @@
+"""
+Reads the primary header of FITS files stored in S3.
+
+A FITS header is a series of 2880 byte blocks of 80 character cards that
+ends with an END card, followed by the data. Only the header blocks are
+fetched, with ranged GETs, so reading the header of a large science file
+costs a few kilobytes of I/O instead of the whole object. Gzip compressed
+files are decompressed as they stream in, up to the END card. Files that
+turn out not to be FITS, including empty objects and corrupt gzip files,
+raise a ValueError.
+"""
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+
+class FitsHeader():
+    """
+    Class to represent a FITS header as its blocks are read.
+
+    ...
+
+    Attributes
+    ----------
+    cards: dict
+        values of the keyword cards read so far, keyed by keyword. String,
+        logical, integer and float values are converted to their python
+        type; COMMENT, HISTORY and blank cards are not kept.
+    complete: bool
+        whether the END card has been read.
+    blocks: int
+        number of blocks read.
+
+    Methods
+    -------
+    add_block(block):
+        parses the cards of the next header block.
+    get_fields(keywords):
+        returns the values of the given keywords as document fields.
+    """
+    def __init__(self):
+        self.cards = {}
+        self.complete = False
+        self.blocks = 0
+
+    def add_block(self, block):
+        """
+        Parses the cards of the next header block.
+
+        Parameters
+        ----------
+        block: bytes
+            the next BLOCK_SIZE bytes of the file.
+
+        Returns
+        -------
+        bool
+            whether the block contained the END card.
+        """
+        if self.complete:
+            raise ValueError("The header is already complete")
+        if len(block) != BLOCK_SIZE:
+            raise ValueError("Header block is {} bytes, but must be {}, the file ends before the END card".format(
+                len(block), BLOCK_SIZE))
+
+        text = block.decode("ascii", errors="replace")
+        if self.blocks == 0 and not text.startswith(("SIMPLE  =", "XTENSION=")):
+            raise ValueError("Not a FITS file, the header doesn't start with SIMPLE")
+        self.blocks += 1
+
+        for start in range(0, BLOCK_SIZE, CARD_SIZE):
+            card = text[start:start + CARD_SIZE]
+            keyword = card[:8].rstrip()
+            if keyword == "END":
+                self.complete = True
+                break
+            # cards without a value indicator are commentary
+            if card[8:10] == "= " and keyword not in self.cards:
+                self.cards[keyword] = _parse_value(card[10:])
+        return self.complete
+
+    def get_fields(self, keywords):
+        """
+        Returns the values of the given keywords as document fields. Field
+        names are the keywords in lower case with "-" replaced by "_",
+        ex: DATE-OBS is returned as date_obs. Keywords missing from the
+        header are left out.
+
+        Parameters
+        ----------
+        keywords: list
+            header keywords to return, ex: ["DATE-OBS", "INSTRUME"].
+
+        Returns
+        -------
+        dict
+            the document fields.
+        """
+        return {keyword.lower().replace("-", "_"): self.cards[keyword]
+                for keyword in keywords if keyword in self.cards}
+
+    def __repr__(self):
+        return str(self.cards)
+
+
+def _parse_value(field):
+    """Converts the value field of a card, after the "= " indicator, to a python value."""
+    field = field.strip()
+    if field.startswith("'"):
+        # strings are quoted, with '' standing for a quote, and trailing spaces aren't significant
+        value = []
+        i = 1
+        while i < len(field):
+            if field[i] == "'":
+                if field[i + 1:i + 2] != "'":
+                    break
+                i += 1
+            value.append(field[i])
+            i += 1
+        return "".join(value).rstrip()
+
+    value = field.split("/", 1)[0].strip()
+    if value == "":
+        return None
+    if value == "T":
+        return True
+    if value == "F":
+        return False
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value.replace("D", "E"))
+    except ValueError:
+        return value
+
+
+class FitsHeaderReader():
+    """
+    Class to read the primary header of FITS files in S3 with ranged GETs.
+
+    The first request fetches a single block, and each following request
+    fetches twice as many bytes as the last, so a header of n blocks
+    costs about log2(n) requests and never more than twice its size.
+    Gzip compressed files (.gz) are decompressed as the ranges arrive and
+    reading stops at the END card, so only the compressed bytes of the
+    header are fetched.
+
+    ...
+
+    Attributes
+    ----------
+    s3:
+        boto3 S3 client.
+    max_blocks: int
+        maximum number of blocks read before giving up on finding the END
+        card.
+
+    Methods
+    -------
+    read(bucket, key):
+        reads the primary header of a file.
+    read_many(objects, max_workers):
+        reads the primary headers of several files concurrently.
+    """
+    def __init__(self, s3, max_blocks=100):
+        self.s3 = s3
+        self.max_blocks = max_blocks
+
+    def read(self, bucket, key):
+        """
+        Reads the primary header of a file.
+
+        Parameters
+        ----------
+        bucket: str
+            bucket of the file.
+        key: str
+            key of the file, files ending in .gz are read as gzip.
+
+        Returns
+        -------
+        FitsHeader
+            the complete header.
+        """
+        stream = self.__ranges(bucket, key)
+        if key.endswith(".gz"):
+            stream = _decompress(stream)
+
+        header = FitsHeader()
+        buffer = b""
+        try:
+            for data in stream:
+                buffer += data
+                while len(buffer) >= BLOCK_SIZE and not header.complete:
+                    if header.blocks >= self.max_blocks:
+                        raise ValueError("No END card in the first {} blocks of {}".format(self.max_blocks, key))
+                    header.add_block(buffer[:BLOCK_SIZE])
+                    buffer = buffer[BLOCK_SIZE:]
+                if header.complete:
+                    break
+            else:
+                raise ValueError("{} ends before the END card".format(key))
+        except zlib.error as e:
+            raise ValueError("{} isn't a valid gzip file: {}".format(key, e)) from e
+
+        logger.debug("Read {} header blocks of {}".format(header.blocks, key))
+        return header
+
+    def read_many(self, objects, max_workers=16):
+        """
+        Reads the primary headers of several files concurrently, since each
+        read spends most of its time waiting on S3.
+
+        Parameters
+        ----------
+        objects: list
+            (bucket, key) of each file.
+        max_workers: int
+            maximum number of headers read at once.
+
+        Returns
+        -------
+        list
+            the FitsHeader of each file, or the exception raised reading
+            it, in the order of objects.
+        """
+        def read(bucket_key):
+            try:
+                return self.read(*bucket_key)
+            except Exception as e:
+                return e
+
+        if len(objects) <= 1 or max_workers <= 1:
+            return [read(bucket_key) for bucket_key in objects]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(objects))) as executor:
+            return list(executor.map(read, objects))
+
+    def __ranges(self, bucket, key):
+        """Yields the bytes of an object with ranged GETs of doubling size, until the object ends."""
+        start = 0
+        size = BLOCK_SIZE
+        while True:
+            try:
+                data = self.s3.get_object(Bucket=bucket, Key=key,
+                                          Range="bytes={}-{}".format(start, start + size - 1))["Body"].read()
+            except ClientError as e:
+                # S3 answers a range starting at or past the end, ex: of an empty object, with a 416
+                if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                    return
+                raise
+            yield data
+            if len(data) < size:
+                return
+            start += size
+            size *= 2
+
+
+def _decompress(stream):
+    """Yields the decompressed bytes of a gzip stream as its compressed bytes arrive."""
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    for data in stream:
+        yield decompressor.decompress(data)
+        if decompressor.eof:
+            return
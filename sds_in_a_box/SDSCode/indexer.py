@@ -1,21 +1,33 @@
 import json
 import urllib.parse
 import boto3
+from botocore.config import Config
 import logging 
 import os 
+import random
 import sys
 from sds_in_a_box.SDSCode.opensearch_utils.document import Document
 from sds_in_a_box.SDSCode.opensearch_utils.index import Index
 from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
 from sds_in_a_box.SDSCode.opensearch_utils.action import Action
 from sds_in_a_box.SDSCode.opensearch_utils.client import Client
-from opensearchpy import OpenSearch, RequestsHttpConnection
+from sds_in_a_box.SDSCode.lifecycle import ContainerResources
+from sds_in_a_box.SDSCode.fits_header import FitsHeaderReader
+from sds_in_a_box.SDSCode.metrics import InvocationMetrics
+from sds_in_a_box.SDSCode.profiling import InvocationProfiler
+from opensearchpy import OpenSearch, RequestsHttpConnection, RequestError
 
 logger=logging.getLogger()
 logger.setLevel(logging.INFO)
 logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
 
-s3 = boto3.client('s3')
+# number of FITS headers of a batch read from S3 at once
+HEADER_READ_WORKERS = int(os.environ.get("HEADER_READ_WORKERS", 16))
+
+# one pooled connection per header read worker
+s3 = boto3.client('s3', config=Config(max_pool_connections=HEADER_READ_WORKERS))
+# reads only the header blocks of the FITS files with ranged GETs
+header_reader = FitsHeaderReader(s3)
 
 def _load_allowed_filenames():
     # Rather than storing the configuration locally, we should store the configuration somewhere where things can be changed on the fly.  
@@ -31,69 +43,234 @@ def _check_for_matching_filetype(pattern, filename):
     
     split_filename = filename.replace("_", ".").split(".")
 
-    if len(split_filename) != len(pattern):
+    # a literal such as "fits.gz" spans one filename field per segment
+    widths = [1 if value == '*' else len(value.replace("_", ".").split(".")) for value in pattern.values()]
+    if len(split_filename) != sum(widths):
         return None
     
     i = 0
     file_dictionary = {}
-    for field in pattern:
+    for field, width in zip(pattern, widths):
+        value = ".".join(split_filename[i:i + width])
         if pattern[field] == '*':
-            file_dictionary[field] = split_filename[i]
-        elif pattern[field] == split_filename[i]:
-            file_dictionary[field] = split_filename[i]
+            file_dictionary[field] = value
+        elif pattern[field].replace("_", ".") == value:
+            file_dictionary[field] = value
         else:
             return None
-        i += 1
+        i += width
     
     return file_dictionary
 
+def _extract_s3_records(event):
+    """
+    Returns the S3 event records contained in a Lambda event as a list of
+    (message id, record) pairs. The event can be an S3 notification, whose
+    records have no message id, or a batch of SQS messages that each wrap
+    an S3 notification when uploads are buffered in a queue.
+    """
+    s3_records = []
+    for record in event['Records']:
+        if record.get('eventSource') == 'aws:sqs':
+            try:
+                body = json.loads(record['body'])
+            except ValueError:
+                # pass the message through as is, it is reported as a failure when processed
+                s3_records.append((record['messageId'], record))
+                continue
+            # S3 sends an s3:TestEvent without Records when the notification is set up
+            for s3_record in body.get('Records', []):
+                s3_records.append((record['messageId'], s3_record))
+        else:
+            s3_records.append((None, record))
+    return s3_records
+
 def _create_open_search_client():
     hosts = [{"host":os.environ["OS_DOMAIN"], "port":int(os.environ["OS_PORT"])}]
     auth = (os.environ["OS_ADMIN_USERNAME"], os.environ["OS_ADMIN_PASSWORD_LOCATION"])
     return Client(hosts=hosts, http_auth=auth, use_ssl=True, verify_certs=True, connnection_class=RequestsHttpConnection)
 
+def _ensure_index(client, index):
+    """
+    Creates the index with its explicit mapping the first time the container
+    sees it, instead of letting the first document create it with dynamic
+    mapping. Indices that already exist are left as they are.
+    """
+    if index.get_name() in _ready_indices:
+        return
+    if not client.index_exists(index):
+        try:
+            client.create_index(index)
+        except RequestError as e:
+            # another container created it first
+            if e.error != "resource_already_exists_exception":
+                raise
+    _ready_indices.add(index.get_name())
+
+# names of the indices known to exist
+_ready_indices = set()
+
+# The configuration and the OpenSearch client live outside the handler so that
+# a warm container reuses them instead of paying for a new file read and TLS
+# handshake on every event.
+resources = ContainerResources(_load_allowed_filenames, _create_open_search_client,
+                               ttl=float(os.environ.get("RESOURCE_TTL_SECONDS", 900)))
+
+# Fraction of the events dumped to the log in full. The dumps dominate the
+# log volume at high event rates, so by default only a sample is kept.
+EVENT_LOG_SAMPLE_RATE = float(os.environ.get("EVENT_LOG_SAMPLE_RATE", 0.01))
+
+# Profiles a PROFILE_SAMPLE_RATE fraction of the invocations (none by default)
+# with cProfile and tracemalloc, see InvocationProfiler.from_env.
+profiler = InvocationProfiler.from_env(s3)
+
 def lambda_handler(event, context):
-    logger.info("Received event: " + json.dumps(event, indent=2))
+    # per stage timings and counts, emitted as a CloudWatch embedded metric record
+    metrics = InvocationMetrics(namespace=os.environ.get("METRICS_NAMESPACE", "SDS/Indexer"),
+                                dimensions={"Index": os.environ["OS_INDEX"]})
+    try:
+        with profiler.profile(getattr(context, "aws_request_id", None)):
+            return _handle_event(event, metrics)
+    finally:
+        metrics.emit()
 
-    # Retrieve a list of allowed file types
-    filetypes = _load_allowed_filenames()
-    logger.info("Allowed file types: " + str(filetypes))
+def _handle_event(event, metrics):
+    """
+    Indexes the files of an event, recording the time spent in each stage
+    and the counts of the invocation in metrics.
+    """
+    logger.info(f"Received event with {len(event.get('Records', []))} records")
+    if random.random() < EVENT_LOG_SAMPLE_RATE:
+        logger.info("Sampled event: " + json.dumps(event))
 
-    # create opensearch client
-    client = _create_open_search_client()
-    # create an index
-    index = Index(os.environ["OS_INDEX"])
+    with metrics.stage("config"):
+        # Retrieve a list of allowed file types
+        filetypes = resources.get_filetypes()
+        logger.debug("Allowed file types: %s", filetypes)
+        matcher = resources.get_matcher()
+        mapping = resources.get_mapping()
+
+    with metrics.stage("client"):
+        # create opensearch client
+        client = resources.get_client()
+        # create an index
+        index = Index(os.environ["OS_INDEX"], mapping.get_index_body())
+        _ensure_index(client, index)
     # create a payload
     document_payload = Payload()
 
-    # We're only expecting one record, but for some reason the Records are a list object
-    for record in event['Records']:
-        
-        # Retrieve the Object name
-        logger.info(f'Record Received: {record}')
-        bucket = record['s3']['bucket']['name']
-        filename = record['s3']['object']['key']
-
-        logger.info(f"Attempting to insert {filename} into database")
-
-        # Look for matching file types in the configuration
-        for filetype in filetypes:
-            metadata = _check_for_matching_filetype(filetype['pattern'], filename)
-            if metadata is not None:
-                break
-        
-        #Found nothing.  This should probably send out an error notification to the team, because how did it make its way onto the SDC?
-        if metadata is None:
-            logger.info(f"Found no matching file types to index this file against.")
-            return None
-        
-        # Rather than returning the metadata, we should insert it into the DB
-        logger.info("Found the following metadata to index: " + str(metadata))
+    # message ids of the records that could not be indexed but may be on a retry, ex: S3 or
+    # OpenSearch errors. Records that can never be indexed, ex: files matching no file type,
+    # are logged and skipped instead, a retry would fail the same way.
+    failures = set()
+    # message ids of the records behind each document in the payload
+    message_ids = {}
 
-        # create a document for the metadata and add it to the payload
-        opensearch_doc = Document(index, filename, Action.CREATE, metadata)
-        document_payload.add_documents(opensearch_doc)
+    # (message id, bucket, filename, file type, metadata) of the records that matched a file type
+    matched = []
+
+    # Records arrive either straight from S3 or batched through the SQS queue,
+    # every record is handled on its own so one bad file doesn't hold back the
+    # rest of the batch, and the good ones are indexed with a single payload
+    s3_records = _extract_s3_records(event)
+    metrics.add("records", len(s3_records))
+    for message_id, record in s3_records:
+        try:
+            # Retrieve the Object name
+            # the whole records are only logged at debug, or with the sampled event dumps
+            logger.debug('Record Received: %s', record)
+            bucket = record['s3']['bucket']['name']
+            # object keys in S3 notifications are url encoded
+            filename = urllib.parse.unquote_plus(record['s3']['object']['key'])
+
+            logger.info(f"Attempting to insert {filename} into database")
+
+            # Look for matching file types in the configuration
+            with metrics.stage("match"):
+                match = matcher.match(filename)
+
+            #Found nothing.  This should probably send out an error notification to the team, because how did it make its way onto the SDC?
+            if match is None:
+                logger.error(f"Skipping {filename}, found no matching file types to index it against.")
+                metrics.add("skipped", 1)
+                continue
+
+            filetype, metadata = match
+            matched.append((message_id, bucket, filename, filetype, metadata))
+        except Exception:
+            # the record itself is malformed, ex: a message that isn't an S3 notification
+            logger.exception(f"Skipping record {record}, it can't be processed")
+            metrics.add("skipped", 1)
+
+    # the headers of the whole batch are read concurrently, each read is one or more S3 round trips
+    with metrics.stage("header"):
+        positions = [position for position, entry in enumerate(matched) if entry[3].get("header")]
+        headers = header_reader.read_many([matched[position][1:3] for position in positions],
+                                          max_workers=HEADER_READ_WORKERS)
+        headers = dict(zip(positions, headers))
+
+    for position, (message_id, bucket, filename, filetype, metadata) in enumerate(matched):
+        try:
+            # add the header keywords configured for the file type to the metadata
+            header = headers.get(position)
+            if isinstance(header, ValueError):
+                # not a FITS file, ex: empty or corrupt, the filename metadata is still indexed
+                logger.warning(f"Indexing {filename} without its header fields: {header}")
+                metrics.add("headers_unreadable", 1)
+            elif isinstance(header, Exception):
+                raise header
+            elif header is not None:
+                metadata.update(header.get_fields(filetype["header"]))
+
+            with metrics.stage("document"):
+                # convert the values parsed from the filename to the mapped types
+                metadata = mapping.convert(metadata)
+                # create a document for the metadata
+                opensearch_doc = Document(index, filename, Action.CREATE, metadata)
+
+            # Rather than returning the metadata, we should insert it into the DB
+            logger.debug("Found the following metadata to index: %s", metadata)
+
+            # add the document to the payload
+            with metrics.stage("payload"):
+                document_payload.add_documents(opensearch_doc)
+            message_ids.setdefault(opensearch_doc.get_identifier(), []).append(message_id)
+        except ValueError:
+            # the metadata can't be made into a document
+            logger.exception(f"Skipping {filename} from {bucket}, it can't be indexed")
+            metrics.add("skipped", 1)
+        except Exception:
+            # without a message id the failure can only be reported by raising, as for the send
+            if message_id is None:
+                raise
+            logger.exception(f"Failed to process {filename} from {bucket}")
+            failures.add(message_id)
 
     # send the paylaod to the opensearch instance
-    client.send_payload(document_payload)
-    client.close()
\ No newline at end of file
+    try:
+        with metrics.stage("send"):
+            result = client.send_payload(document_payload)
+        # the bytes of every bulk request, including the retries of rejected items
+        metrics.add("bytes_sent", result.size_in_bytes(), "Bytes")
+        counts = result.get_counts()
+        metrics.add("bulk_items_failed", counts["failed"])
+        metrics.add("bulk_items_conflicted", counts["conflicted"])
+        # documents that already exist (conflicts) don't need to be retried
+        for identifier in result.get_failed_identifiers():
+            logger.info(f"Failed to index {identifier}: {result.get_errors()[identifier]}")
+            failures.update(message_ids[identifier])
+    except Exception:
+        # start the next invocation from a fresh client and configuration
+        resources.invalidate()
+        # without message ids the failure can only be reported by raising
+        if any(None in ids for ids in message_ids.values()):
+            raise
+        logger.exception("Failed to send the payload to OpenSearch")
+        failures.update(message_id for ids in message_ids.values() for message_id in ids)
+    finally:
+        logger.info("Container resource stats: " + str(resources.get_stats()))
+
+    # Report only the failed messages back to SQS so the rest of the batch isn't retried
+    failures.discard(None)
+    metrics.add("failures", len(failures))
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in sorted(failures)]}
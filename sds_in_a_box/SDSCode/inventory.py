@@ -0,0 +1,187 @@
+"""
+Reads the keys of a data bucket from an S3 Inventory report.
+
+An inventory report is a manifest.json listing the data files of the
+report, each holding one row per object. Reading them is much cheaper
+than listing a large bucket, since one GET returns millions of keys.
+CSV (gzipped) and Parquet reports are supported; Parquet requires
+pyarrow.
+"""
+import csv
+import gzip
+import io
+import json
+from urllib.parse import unquote_plus, urlparse
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pc = None
+    pq = None
+
+
+class InventoryManifest():
+    """
+    Class to represent the manifest.json of an S3 Inventory report.
+
+    ...
+
+    Attributes
+    ----------
+    bucket: str
+        bucket the data files are stored in (the inventory destination).
+    file_format: str
+        format of the data files, CSV or Parquet.
+    file_schema: str
+        comma separated fields of a CSV row, ex: "Bucket, Key, Size".
+        For Parquet files this is the message schema and isn't used.
+    files: list
+        keys of the data files.
+    source_bucket: str, optional
+        bucket the report lists the objects of.
+
+    Methods
+    -------
+    from_json(manifest):
+        creates a manifest from the contents of a manifest.json.
+    from_s3(s3, bucket, key):
+        reads a manifest from S3.
+    from_url(s3, url):
+        reads a manifest from an s3:// url.
+    iter_keys(s3, batch_size, start):
+        yields the object keys of the report in batches.
+    """
+    FORMATS = ("CSV", "Parquet")
+
+    def __init__(self, bucket, file_format, file_schema, files, source_bucket=None):
+        if file_format not in self.FORMATS:
+            raise ValueError("Inventory format is {}, but must be one of {}".format(file_format, self.FORMATS))
+        if file_format == "Parquet" and pq is None:
+            raise ImportError("Parquet inventories require pyarrow, install it with: pip install pyarrow")
+        self.bucket = bucket
+        self.file_format = file_format
+        self.file_schema = file_schema
+        self.files = files
+        self.source_bucket = source_bucket
+
+    @classmethod
+    def from_json(cls, manifest):
+        """
+        Creates a manifest from the parsed contents of a manifest.json.
+
+        Parameters
+        ----------
+        manifest: dict
+            contents of the manifest.json.
+        """
+        # the destination bucket is an ARN, ex: arn:aws:s3:::inventory-bucket
+        bucket = manifest["destinationBucket"].split(":::")[-1]
+        return cls(bucket, manifest["fileFormat"], manifest.get("fileSchema", ""),
+                   [file["key"] for file in manifest["files"]], manifest.get("sourceBucket"))
+
+    @classmethod
+    def from_s3(cls, s3, bucket, key):
+        """
+        Reads a manifest.json from S3.
+
+        Parameters
+        ----------
+        s3:
+            boto3 S3 client.
+        bucket: str
+            bucket of the manifest.
+        key: str
+            key of the manifest, ex: <prefix>/<bucket>/<config>/<date>/manifest.json
+        """
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        return cls.from_json(json.loads(body))
+
+    @classmethod
+    def from_url(cls, s3, url):
+        """Reads a manifest.json from an s3://bucket/key url."""
+        parsed = urlparse(url)
+        if parsed.scheme != "s3":
+            raise ValueError("Manifest url is {}, but must start with s3://".format(url))
+        return cls.from_s3(s3, parsed.netloc, parsed.path.lstrip("/"))
+
+    def iter_keys(self, s3, batch_size=10000, start=None):
+        """
+        Yields the keys of the current objects in the report, skipping
+        delete markers and noncurrent versions when the report includes
+        them.
+
+        Parameters
+        ----------
+        s3:
+            boto3 S3 client.
+        batch_size: int
+            maximum number of keys per batch.
+        start: dict, optional
+            position to resume after, as yielded by a previous call.
+
+        Yields
+        ------
+        tuple
+            (keys, position) where position is {"file": i, "rows": n}, the
+            data file and the number of its rows read so far.
+        """
+        start = start or {"file": 0, "rows": 0}
+        for number, file_key in enumerate(self.files):
+            if number < start["file"]:
+                continue
+            skip = start["rows"] if number == start["file"] else 0
+
+            body = s3.get_object(Bucket=self.bucket, Key=file_key)["Body"]
+            if self.file_format == "CSV":
+                batches = self.__read_csv(body, batch_size, skip)
+            else:
+                batches = self.__read_parquet(body, batch_size, skip)
+
+            for keys, rows in batches:
+                yield keys, {"file": number, "rows": rows}
+
+    def __read_csv(self, body, batch_size, skip):
+        fields = [field.strip() for field in self.file_schema.split(",")]
+        key_column = fields.index("Key")
+        latest_column = fields.index("IsLatest") if "IsLatest" in fields else None
+        marker_column = fields.index("IsDeleteMarker") if "IsDeleteMarker" in fields else None
+
+        with gzip.GzipFile(fileobj=body) as f:
+            rows = yielded = 0
+            keys = []
+            for row in csv.reader(io.TextIOWrapper(f, encoding="utf-8", newline="")):
+                rows += 1
+                if rows <= skip:
+                    continue
+                if latest_column is not None and row[latest_column] != "true":
+                    continue
+                if marker_column is not None and row[marker_column] == "true":
+                    continue
+                # keys in CSV reports are url encoded
+                keys.append(unquote_plus(row[key_column]))
+                if len(keys) == batch_size:
+                    yield keys, rows
+                    keys = []
+                    yielded = rows
+            if rows > max(skip, yielded):
+                yield keys, rows
+
+    def __read_parquet(self, body, batch_size, skip):
+        parquet_file = pq.ParquetFile(io.BytesIO(body.read()))
+        flags = [name for name in ("is_latest", "is_delete_marker") if name in parquet_file.schema_arrow.names]
+
+        rows = 0
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=["key"] + flags):
+            rows += batch.num_rows
+            if rows <= skip:
+                continue
+            batch = batch.slice(max(0, skip - (rows - batch.num_rows)))
+            if "is_latest" in flags:
+                batch = batch.filter(pc.fill_null(batch.column("is_latest"), True))
+            if "is_delete_marker" in flags:
+                batch = batch.filter(pc.invert(pc.fill_null(batch.column("is_delete_marker"), False)))
+            yield batch.column("key").to_pylist(), rows
+
+    def __repr__(self):
+        return str({"bucket": self.bucket, "format": self.file_format, "files": len(self.files)})
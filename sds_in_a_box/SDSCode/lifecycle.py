@@ -0,0 +1,148 @@
+import logging
+import time
+
+from sds_in_a_box.SDSCode.matcher import FiletypeMatcher
+from sds_in_a_box.SDSCode.opensearch_utils.mapping import IndexMapping
+
+logger = logging.getLogger(__name__)
+
+
+class ContainerResources():
+    """
+    Class to hold the resources the indexer needs that are expensive to
+    create (the file type configuration, its compiled matcher and index
+    mapping, and the OpenSearch client) so a warm Lambda container can reuse them across
+    invocations instead of rebuilding them for every event.
+
+    Resources are created on first use, rebuilt once they are older than
+    the ttl, and dropped by invalidate() so that the next invocation after
+    an error starts from a fresh client. A warm client that has been idle
+    longer than idle_check is pinged before reuse, since the connections
+    of a frozen container may have been closed by the cluster.
+
+    ...
+
+    Attributes
+    ----------
+    load_filetypes: callable
+        function returning the list of allowed file types.
+    create_client: callable
+        function returning a new Client.
+    ttl: float
+        seconds after which a resource is rebuilt.
+    idle_check: float
+        seconds a client can sit unused before it is health checked.
+    clock: callable
+        function returning the current time in seconds.
+
+    Methods
+    -------
+    get_filetypes():
+        returns the cached list of allowed file types.
+    get_matcher():
+        returns the cached FiletypeMatcher for the allowed file types.
+    get_mapping():
+        returns the cached IndexMapping for the allowed file types.
+    get_client():
+        returns the cached Client, creating a new one if needed.
+    invalidate():
+        closes the client and drops every cached resource.
+    get_stats():
+        returns the warm hit and cold init counts of each resource.
+    """
+    RESOURCES = ("config", "client")
+
+    def __init__(self, load_filetypes, create_client, ttl=900, idle_check=60, clock=time.monotonic):
+        self.load_filetypes = load_filetypes
+        self.create_client = create_client
+        self.ttl = ttl
+        self.idle_check = idle_check
+        self.clock = clock
+
+        self.__filetypes = None
+        self.__matcher = None
+        self.__mapping = None
+        self.__client = None
+        self.__created = {}
+        self.__last_used = None
+        self.stats = {name: {"warm_hits": 0, "cold_inits": 0} for name in self.RESOURCES}
+        self.stats["client"]["health_check_failures"] = 0
+
+    def get_filetypes(self):
+        """Returns the list of allowed file types, loading it if needed."""
+        if self.__filetypes is None or self.__is_expired("config"):
+            self.__filetypes = self.load_filetypes()
+            self.__matcher = FiletypeMatcher(self.__filetypes)
+            self.__mapping = IndexMapping.from_filetypes(self.__filetypes)
+            self.__record_cold_init("config")
+        else:
+            self.stats["config"]["warm_hits"] += 1
+        return self.__filetypes
+
+    def get_matcher(self):
+        """Returns the FiletypeMatcher compiled from the allowed file types."""
+        if self.__matcher is None or self.__is_expired("config"):
+            self.get_filetypes()
+        return self.__matcher
+
+    def get_mapping(self):
+        """Returns the IndexMapping generated from the allowed file types."""
+        if self.__mapping is None or self.__is_expired("config"):
+            self.get_filetypes()
+        return self.__mapping
+
+    def get_client(self):
+        """Returns the OpenSearch client, creating a new one if needed."""
+        now = self.clock()
+
+        if self.__client is not None and self.__is_expired("client"):
+            self.__close_client()
+        elif self.__client is not None and now - self.__last_used > self.idle_check:
+            if not self.__client.ping():
+                logger.info("Cached OpenSearch client failed its health check, reconnecting.")
+                self.stats["client"]["health_check_failures"] += 1
+                self.__close_client()
+
+        if self.__client is None:
+            self.__client = self.create_client()
+            self.__record_cold_init("client")
+        else:
+            self.stats["client"]["warm_hits"] += 1
+
+        self.__last_used = now
+        return self.__client
+
+    def invalidate(self):
+        """
+        Closes the cached client and drops every cached resource so they are
+        recreated on next use. Call this after an error that may have left
+        the client or configuration in a bad state.
+        """
+        self.__close_client()
+        self.__filetypes = None
+        self.__matcher = None
+        self.__mapping = None
+        self.__created = {}
+
+    def get_stats(self):
+        """Returns the warm hit and cold init counts of each resource as a dict."""
+        return {name: dict(counts) for name, counts in self.stats.items()}
+
+    def __record_cold_init(self, name):
+        self.__created[name] = self.clock()
+        self.stats[name]["cold_inits"] += 1
+
+    def __is_expired(self, name):
+        return self.clock() - self.__created.get(name, float("-inf")) > self.ttl
+
+    def __close_client(self):
+        if self.__client is not None:
+            try:
+                self.__client.close()
+            except Exception:
+                logger.exception("Failed to close the cached OpenSearch client.")
+        self.__client = None
+        self.__created.pop("client", None)
+
+    def __repr__(self):
+        return str(self.get_stats())
@@ -0,0 +1,214 @@
+try:
+    # classifying large batches of filenames is vectorized when pyarrow is installed
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+
+class _Node():
+    """A single level of the compiled filename pattern trie."""
+    __slots__ = ("literals", "wildcard", "terminal", "min_priority")
+
+    def __init__(self):
+        self.literals = {}
+        self.wildcard = None
+        self.terminal = None
+        self.min_priority = None
+
+
+class FiletypeMatcher():
+    """
+    Class to classify filenames against the file types in config.json.
+
+    The patterns are compiled once into a trie keyed on the number of
+    filename fields, with one level per field. Literal fields (mission,
+    level, extension, ...) are dictionary lookups and "*" fields follow a
+    wildcard branch, so classifying a filename costs the same no matter
+    how many products are configured. A literal may span several fields
+    of the filename, ex: a compound extension such as "fits.gz".
+
+    ...
+
+    Attributes
+    ----------
+    filetypes: list
+        list of file type dicts as loaded from config.json. Each dict must
+        contain a "pattern" mapping field names to a literal value or "*".
+
+    Methods
+    -------
+    match(filename):
+        returns the matching file type and the metadata parsed from the
+        filename, or None if no file type matches.
+    match_batch(filenames):
+        returns the result of match for every filename in a batch.
+    """
+    WILDCARD = "*"
+
+    def __init__(self, filetypes):
+        self.filetypes = filetypes
+        self.__roots = {}
+        # positions that are a literal in at least one pattern, per field count
+        self.__literal_positions = {}
+
+        for priority, filetype in enumerate(filetypes):
+            self.__insert(priority, filetype)
+
+    def match(self, filename):
+        """
+        Classifies a filename against the compiled file type patterns. When
+        more than one file type matches, the one listed first in the
+        configuration wins.
+
+        Parameters
+        ----------
+        filename: str
+            name of the file to classify, ex: imap_l0_instrument_date_version.fits
+
+        Returns
+        -------
+        tuple, None
+            (filetype, metadata) where metadata is a dict of the pattern's
+            fields to the values found in the filename, or None if no
+            file type matches.
+        """
+        split_filename = filename.replace("_", ".").split(".")
+
+        root = self.__roots.get(len(split_filename))
+        if root is None:
+            return None
+
+        terminal = self.__search(root, split_filename, 0, None)
+        if terminal is None:
+            return None
+
+        priority, spans = terminal
+        return self.filetypes[priority], self.__metadata(spans, split_filename)
+
+    def match_batch(self, filenames):
+        """
+        Classifies a batch of filenames. With pyarrow installed the filenames
+        are split and grouped with vectorized string kernels, and only the
+        distinct combinations of the fields the patterns compare (mission,
+        level, extension, ...) are looked up in the trie. Otherwise every
+        filename goes through match.
+
+        Parameters
+        ----------
+        filenames: list, pyarrow.Array
+            names of the files to classify.
+
+        Returns
+        -------
+        list
+            the result of match for each filename, in the same order.
+        """
+        if pa is None:
+            return [self.match(filename) for filename in filenames]
+
+        if isinstance(filenames, pa.ChunkedArray):
+            filenames = filenames.combine_chunks()
+        elif not isinstance(filenames, pa.Array):
+            filenames = pa.array(filenames, type=pa.string())
+        results = [None] * len(filenames)
+        parts = pc.split_pattern(pc.replace_substring(filenames, "_", "."), ".")
+        lengths = pc.list_value_length(parts)
+        row_numbers = pa.array(range(len(filenames)), type=pa.int64())
+
+        for length, positions in self.__literal_positions.items():
+            mask = pc.fill_null(pc.equal(lengths, length), False)
+            rows = pc.filter(row_numbers, mask).to_pylist()
+            if not rows:
+                continue
+            length_parts = pc.filter(parts, mask)
+
+            # one signature per filename made of the fields the patterns compare,
+            # the other fields are wildcards in every pattern and can't change the match
+            columns = [pc.list_element(length_parts, position) for position in positions]
+            if len(columns) == 0:
+                signatures = pa.nulls(len(rows), pa.string()).fill_null("")
+            elif len(columns) == 1:
+                signatures = columns[0]
+            else:
+                signatures = pc.binary_join_element_wise(*columns, "\x00")
+            encoded = signatures.dictionary_encode()
+
+            terminals = []
+            for signature in encoded.dictionary.to_pylist():
+                split_filename = [""] * length
+                for position, value in zip(positions, signature.split("\x00") if positions else []):
+                    split_filename[position] = value
+                terminals.append(self.__search(self.__roots[length], split_filename, 0, None))
+
+            if not any(terminals):
+                continue
+            for row, signature, split_filename in zip(rows, encoded.indices.to_pylist(), length_parts.to_pylist()):
+                terminal = terminals[signature]
+                if terminal is not None:
+                    priority, spans = terminal
+                    results[row] = (self.filetypes[priority], self.__metadata(spans, split_filename))
+
+        return results
+
+    def __insert(self, priority, filetype):
+        pattern = filetype["pattern"]
+
+        # a literal containing "." spans one filename field per segment,
+        # each pattern field is kept with the fields it spans
+        values = []
+        spans = []
+        for field, value in pattern.items():
+            segments = [value] if value == self.WILDCARD else value.replace("_", ".").split(".")
+            spans.append((field, len(values), len(values) + len(segments)))
+            values.extend(segments)
+
+        literal_positions = self.__literal_positions.setdefault(len(values), [])
+        for position, value in enumerate(values):
+            if value != self.WILDCARD and position not in literal_positions:
+                literal_positions.append(position)
+        literal_positions.sort()
+
+        node = self.__roots.setdefault(len(values), _Node())
+        path = [node]
+        for value in values:
+            if value == self.WILDCARD:
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                node = node.literals.setdefault(value, _Node())
+            path.append(node)
+
+        # an identical pattern listed earlier in the config already wins
+        if node.terminal is None:
+            node.terminal = (priority, tuple(spans))
+
+        for visited in path:
+            if visited.min_priority is None:
+                visited.min_priority = priority
+
+    @staticmethod
+    def __metadata(spans, split_filename):
+        return {field: ".".join(split_filename[start:stop]) for field, start, stop in spans}
+
+    def __search(self, node, split_filename, depth, best):
+        # skip branches that can't beat a match that was already found
+        if best is not None and node.min_priority >= best[0]:
+            return best
+
+        if depth == len(split_filename):
+            return node.terminal
+
+        literal = node.literals.get(split_filename[depth])
+        if literal is not None:
+            best = self.__search(literal, split_filename, depth + 1, best) or best
+
+        if node.wildcard is not None:
+            best = self.__search(node.wildcard, split_filename, depth + 1, best) or best
+
+        return best
+
+    def __repr__(self):
+        return str([filetype["product"] for filetype in self.filetypes])
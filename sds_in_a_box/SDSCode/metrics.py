@@ -0,0 +1,126 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+
+class InvocationMetrics():
+    """
+    Class to collect the time spent in each stage of an invocation and its
+    counts, and to emit them as a CloudWatch Embedded Metric Format (EMF)
+    record. Lambda sends every line written to stdout to CloudWatch Logs,
+    which extracts the metrics of an EMF record without any API calls, so
+    the cost of the instrumentation is a clock read per stage and one log
+    line per invocation.
+
+    A stage entered several times, ex: matching once per record, adds up
+    to a single metric.
+
+    ...
+
+    Attributes
+    ----------
+    namespace: str
+        CloudWatch namespace of the metrics.
+    dimensions: dict
+        dimension names and values the metrics are published under.
+    clock: callable
+        function returning the current time in seconds.
+    stages: dict
+        milliseconds spent in each stage.
+    counts: dict
+        value and unit of each count.
+
+    Methods
+    -------
+    stage(name):
+        context manager adding the time spent in its block to a stage.
+    add(name, value, unit="Count"):
+        adds value to a count.
+    get_record(timestamp=None):
+        returns the EMF record of the collected metrics.
+    emit(stream=None):
+        writes the EMF record as a single line to stream, stdout by default.
+    """
+    def __init__(self, namespace="SDS/Indexer", dimensions=None, clock=time.perf_counter):
+        self.namespace = namespace
+        self.dimensions = dimensions or {}
+        self.clock = clock
+        self.stages = {}
+        self.counts = {}
+        self.__start = clock()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Adds the time spent in the block to a stage.
+
+        Parameters
+        ----------
+        name: str
+            name of the stage, ex: "match".
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (self.clock() - start) * 1000
+
+    def add(self, name, value, unit="Count"):
+        """
+        Adds value to a count.
+
+        Parameters
+        ----------
+        name: str
+            name of the count, ex: "records".
+        value: int, float
+            amount to add.
+        unit: str
+            CloudWatch unit of the count, ex: "Count" or "Bytes".
+        """
+        current = self.counts.get(name, (0, unit))[0]
+        self.counts[name] = (current + value, unit)
+
+    def get_record(self, timestamp=None):
+        """
+        Returns the EMF record of the collected metrics as a dict. Stages
+        are published as "<stage>_ms" and the whole invocation as
+        "duration_ms".
+
+        Parameters
+        ----------
+        timestamp: float, optional
+            time of the record in seconds since the epoch, now if None.
+        """
+        values = {name + "_ms": (milliseconds, "Milliseconds") for name, milliseconds in self.stages.items()}
+        values["duration_ms"] = ((self.clock() - self.__start) * 1000, "Milliseconds")
+        values.update(self.counts)
+
+        record = {
+            "_aws": {
+                "Timestamp": int((time.time() if timestamp is None else timestamp) * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [list(self.dimensions)],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in values.items()],
+                }],
+            },
+        }
+        record.update(self.dimensions)
+        record.update({name: value for name, (value, _) in values.items()})
+        return record
+
+    def emit(self, stream=None):
+        """
+        Writes the EMF record as a single line.
+
+        Parameters
+        ----------
+        stream: file, optional
+            stream to write to, stdout if None.
+        """
+        print(json.dumps(self.get_record(), separators=(",", ":")), file=stream or sys.stdout, flush=True)
+
+    def __repr__(self):
+        return str(self.get_record())
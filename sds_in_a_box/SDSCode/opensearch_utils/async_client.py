@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import time
+
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.bulk_result import BulkResult
+from sds_in_a_box.SDSCode.opensearch_utils.retry import ChunkRetry, RetryPolicy
+from opensearchpy import ConflictError, TransportError
+
+try:
+    # the async transport is only available when aiohttp is installed
+    from opensearchpy import AsyncOpenSearch, AIOHttpConnection
+except ImportError:
+    AsyncOpenSearch = None
+    AIOHttpConnection = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncClient():
+    """
+    Class to represent an asyncio connection with the OpenSearch cluster.
+    It mirrors Client, but every method that talks to the cluster is a
+    coroutine, so many document operations and bulk chunks can be in
+    flight from a single thread. Requires opensearch-py[async].
+
+    ...
+
+    Attributes
+    ----------
+    hosts: list
+        list of dicts containing the host and port.
+        ex: [{'host': host, 'port': port}]
+    http_auth: tuple
+        tuple containing the authentication username and password for the
+        OpenSearch cluster.
+    use_ssl: boolean
+        turn on / off SSL.
+    verify_certs: boolean
+        turn on / off verification of SSL certificates.
+    connection_class:
+        async connection class used by the transport.
+    retry_policy: RetryPolicy
+        how bulk items rejected by an overloaded cluster are retried.
+
+    Methods
+    -------
+    create_index(index):
+        creates an index in the OpenSearch cluster.
+    delete_index(index):
+        deletes an index in the OpenSearch cluster.
+    index_exists(index):
+        checks whether a particular index exists in the OpenSearch cluster.
+    put_index_template(name, template):
+        creates or replaces an index template in the OpenSearch cluster.
+    document_exists(document):
+        checks whether a particular document exists in the OpenSearch cluster.
+    send_document(document):
+        sends a document to the OpenSearch cluster with its associated action.
+    send_payload(payload):
+        Sends a bulk payload of documents to the OpenSearch cluster.
+    get_document(document):
+        returns the specified document.
+    search(index, query):
+        searches an index in the OpenSearch cluster.
+    close():
+        closes the transport and all internal connections.
+    """
+    def __init__(self, hosts, http_auth, use_ssl=True, verify_certs=True, connection_class=None, retry_policy=None):
+        if AsyncOpenSearch is None:
+            raise ImportError("AsyncClient requires aiohttp, install it with: pip install opensearch-py[async]")
+
+        self.hosts = hosts
+        self.http_auth = http_auth
+        self.use_ssl = use_ssl
+        self.verify_certs = verify_certs
+        self.connection_class = connection_class or AIOHttpConnection
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.client = AsyncOpenSearch(hosts=self.hosts, http_auth=self.http_auth,
+        use_ssl=self.use_ssl, verify_certs=self.verify_certs, connection_class=self.connection_class)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def create_index(self, index):
+        """
+        Creates an index in the OpenSearch cluster.
+
+        Parameters
+        ----------
+        index: Index
+            index to be created in the OpenSearch cluster.
+
+        """
+        await self.client.indices.create(index=index.get_name(), body=index.get_body())
+
+    async def delete_index(self, index):
+        """
+        Deletes an index in the OpenSearch cluster.
+
+        Parameters
+        ----------
+        index: Index
+            index to be deleted in the OpenSearch cluster.
+
+        """
+        await self.client.indices.delete(index=index.get_name())
+
+    async def index_exists(self, index):
+        """
+        Returns an boolean indicating whether particular index exists.
+
+        Parameters
+        ----------
+        index: Index
+            index to check if it exists in the OpenSearch cluster.
+        """
+        return await self.client.indices.exists(index=index.get_name())
+
+    async def put_index_template(self, name, template):
+        """
+        Creates or replaces a composable index template, applied to the
+        indices created afterwards whose names match its patterns.
+
+        Parameters
+        ----------
+        name: str
+            name of the template.
+        template: dict
+            body of the template, ex: IndexMapping.get_template(["metadata*"]).
+        """
+        await self.client.indices.put_index_template(name=name, body=template)
+
+    async def document_exists(self, document):
+        """
+        Returns an boolean indicating whether the document exists in the index.
+
+        Parameters
+        ----------
+        document: Document
+            document to check if it exists in the OpenSearch cluster.
+        """
+        return await self.client.exists(index=document.get_index(), id=document.get_identifier())
+
+    async def send_document(self, document, action_override=None):
+        """
+        Sends the document to OpenSearch using the action associated with
+        the document.
+
+        Parameters
+        ----------
+        document: Document
+            document to be sent to the OpenSearch cluster.
+        action_override: Action, optional
+            action to perform instead of the document's action.
+
+        Returns
+        -------
+        BulkResult
+            the outcome of the request. A version conflict (409) is
+            recorded as a conflicted document rather than raised.
+        """
+        result = BulkResult()
+        action = action_override if Action.is_action(action_override) else document.get_action()
+        index = document.get_index()
+        identifier = document.get_identifier()
+        # the body is serialized once, to send it and to report its size
+        encoded = document.get_request_body(action)
+        size = len(encoded) if encoded is not None else 0
+
+        start = time.perf_counter()
+        try:
+            if action == Action.CREATE:
+                response = await self.client.create(index=index, id=identifier, body=encoded)
+            elif action == Action.DELETE:
+                response = await self.client.delete(index=index, id=identifier)
+            elif action == Action.UPDATE:
+                response = await self.client.update(index=index, id=identifier, body=encoded)
+            elif action == Action.INDEX:
+                response = await self.client.index(index=index, id=identifier, body=encoded)
+        except ConflictError as e:
+            result.add_conflict(document, str(e.error), time.perf_counter() - start, size)
+            return result
+
+        result.add_document(document, response, time.perf_counter() - start, size)
+        return result
+
+    async def send_payload(self, payload, request_timeout=120, max_concurrency=1):
+        """
+        Sends a bulk payload of documents to the OpenSearch cluster, one
+        bulk request per payload chunk. Up to max_concurrency chunks are in
+        flight at once and the results are collected in payload order.
+
+        Items rejected because the cluster is overloaded (429 / 503) are
+        resent on their own following the client's retry_policy, as by
+        Client.send_payload; items that were accepted are never resent.
+
+        Parameters
+        ----------
+        payload: Payload
+            payload containing bulk documents to be sent to the OpenSearch cluster.
+        request_timeout: int, float
+            timeout in seconds for each bulk request.
+        max_concurrency: int
+            maximum number of bulk requests in flight at once.
+
+        Returns
+        -------
+        BulkResult
+            the per document outcomes and per chunk timings of the bulk requests.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        budget = self.retry_policy.new_budget()
+
+        async def send(chunk):
+            async with semaphore:
+                return await self.__send_chunk(chunk, request_timeout, budget)
+
+        chunks = payload.get_chunks()
+        responses = await asyncio.gather(*(send(chunk) for chunk in chunks))
+
+        result = BulkResult()
+        for chunk, (response, seconds) in zip(chunks, responses):
+            result.add_chunk(chunk, response, seconds)
+
+            if result.get_chunks()[-1]["errors"] > 0:
+                logger.warning("{} of {} documents in bulk request failed".format(
+                    result.get_chunks()[-1]["errors"], len(chunk)))
+        return result
+
+    async def __send_chunk(self, chunk, request_timeout, budget):
+        """
+        Sends a single payload chunk as a bulk request, resending only the
+        items rejected with a retryable status until they are accepted or
+        the retries run out. Returns the bulk response and the client wall
+        time in seconds.
+        """
+        start = time.perf_counter()
+        retry = ChunkRetry(chunk, self.retry_policy, budget)
+        while True:
+            body, _ = retry.get_request()
+            try:
+                response = await self.client.bulk(body=body, params={"request_timeout":request_timeout})
+            except TransportError as e:
+                # the whole request was rejected, so every pending item is resent
+                if not retry.add_error(e):
+                    raise
+            else:
+                if not retry.add_response(response):
+                    break
+            # the backoff is awaited so the other chunks keep going
+            await asyncio.sleep(retry.next_backoff())
+        return retry.get_response(), time.perf_counter() - start
+
+    async def get_document(self, document):
+        """Returns the specified document"""
+        return await self.client.get(index=document.get_index(), id=document.get_identifier())
+
+    async def search(self, index, query=None, size=10):
+        """
+        Searches an index in the OpenSearch cluster.
+
+        Parameters
+        ----------
+        index: Index
+            index to be searched.
+        query: dict, optional
+            OpenSearch query DSL, ex: {"term": {"level": "l0"}}. Matches
+            all documents if None.
+        size: int
+            maximum number of hits to return.
+
+        Returns
+        -------
+        dict
+            the search response.
+        """
+        body = {"query": query if query is not None else {"match_all": {}}, "size": size}
+        return await self.client.search(index=Index.validate_index(index).get_name(), body=body)
+
+    async def close(self):
+        """Close the Transport and all internal connections"""
+        await self.client.close()
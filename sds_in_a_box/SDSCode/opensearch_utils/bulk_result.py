@@ -0,0 +1,210 @@
+class BulkResult():
+    """
+    Class to represent the outcome of sending documents to OpenSearch,
+    either a Payload sent as a series of bulk requests (one per
+    PayloadChunk) or a single Document.
+
+    ...
+
+    Attributes
+    ----------
+    counts: dict
+        number of documents that were created, updated, deleted,
+        conflicted (409) and failed.
+    errors: dict
+        error reason of every conflicted or failed document, keyed by the
+        document identifier.
+    failed: list
+        identifiers of the documents that failed for a reason other than
+        a version conflict.
+    chunks: list
+        list of dicts, one per request sent, containing the number of
+        documents, the bytes sent, the server "took" time in milliseconds,
+        the client wall time in seconds, the number of items with an error
+        and the number of retries made for rejected items.
+
+    Methods
+    -------
+    add_chunk(chunk, response, seconds):
+        records the response to the bulk request for a chunk.
+    add_document(document, response, seconds, size=0):
+        records the response to a single document request.
+    add_conflict(document, reason, seconds, size=0):
+        records a single document request that was rejected with a 409.
+    get_counts():
+        returns the number of documents per outcome.
+    get_errors():
+        returns the error reasons keyed by document identifier.
+    get_failed_identifiers():
+        returns the identifiers of the failed documents.
+    get_chunks():
+        returns the per request results.
+    has_errors():
+        returns whether any document conflicted or failed.
+    document_count():
+        returns the number of documents sent.
+    size_in_bytes():
+        returns the number of bytes sent, including retries.
+    took():
+        returns the total server side time in milliseconds.
+    wall_time():
+        returns the total client wall time in seconds.
+    """
+    OUTCOMES = ("created", "updated", "deleted", "conflicted", "failed")
+
+    def __init__(self):
+        self.counts = {outcome: 0 for outcome in self.OUTCOMES}
+        self.errors = {}
+        self.failed = []
+        self.chunks = []
+
+    def add_chunk(self, chunk, response, seconds):
+        """
+        Records the response to the bulk request for a chunk.
+
+        Parameters
+        ----------
+        chunk: PayloadChunk
+            chunk that was sent.
+        response: dict
+            response body returned by the bulk API. Its items are in the
+            same order as the documents of the chunk.
+        seconds: float
+            client wall time of the request in seconds.
+        """
+        errors = 0
+        for document, item in zip(chunk.get_documents(), response.get("items", [])):
+            if not self.__add_item(document.get_identifier(), next(iter(item.values()))):
+                errors += 1
+
+        self.chunks.append({
+            "documents": len(chunk),
+            "bytes": response.get("bytes_sent", chunk.size_in_bytes()),
+            "took": response.get("took", 0),
+            "seconds": seconds,
+            "errors": errors,
+            "retries": response.get("retries", 0),
+        })
+
+    def add_document(self, document, response, seconds, size=0):
+        """
+        Records the response to a single document request.
+
+        Parameters
+        ----------
+        document: Document
+            document that was sent.
+        response: dict
+            response body returned by the document API.
+        seconds: float
+            client wall time of the request in seconds.
+        size: int
+            size in bytes of the request body sent, 0 for a request
+            without one, ex: a delete.
+        """
+        succeeded = self.__add_item(document.get_identifier(), response)
+        self.__add_request(response.get("took", 0), seconds, succeeded, size)
+
+    def add_conflict(self, document, reason, seconds, size=0):
+        """
+        Records a single document request that was rejected because of a
+        version conflict, ex: creating a document that already exists.
+
+        Parameters
+        ----------
+        document: Document
+            document that was sent.
+        reason: str
+            reason given by OpenSearch for the conflict.
+        seconds: float
+            client wall time of the request in seconds.
+        size: int
+            size in bytes of the request body sent.
+        """
+        self.counts["conflicted"] += 1
+        self.errors[document.get_identifier()] = reason
+        self.__add_request(0, seconds, False, size)
+
+    def get_counts(self):
+        """Returns the number of documents per outcome as a dict."""
+        return dict(self.counts)
+
+    def get_errors(self):
+        """Returns the error reasons of conflicted and failed documents keyed by identifier."""
+        return self.errors
+
+    def get_failed_identifiers(self):
+        """Returns the identifiers of the documents that failed, excluding conflicts."""
+        return self.failed
+
+    def get_chunks(self):
+        """Returns the list of per request results."""
+        return self.chunks
+
+    def has_errors(self):
+        """Returns a boolean indicating whether any document conflicted or failed."""
+        return self.counts["conflicted"] > 0 or self.counts["failed"] > 0
+
+    def document_count(self):
+        """Returns the number of documents sent."""
+        return sum(chunk["documents"] for chunk in self.chunks)
+
+    def size_in_bytes(self):
+        """Returns the number of bytes sent, including retries."""
+        return sum(chunk["bytes"] for chunk in self.chunks)
+
+    def took(self):
+        """Returns the total server side "took" time in milliseconds."""
+        return sum(chunk["took"] for chunk in self.chunks)
+
+    def wall_time(self):
+        """Returns the total client wall time of the requests in seconds."""
+        return sum(chunk["seconds"] for chunk in self.chunks)
+
+    def __add_item(self, identifier, item):
+        """
+        Counts the outcome of one document and records its error reason.
+        Returns whether the document succeeded.
+        """
+        if "error" in item:
+            if item.get("status") == 409:
+                self.counts["conflicted"] += 1
+            else:
+                self.counts["failed"] += 1
+                self.failed.append(identifier)
+            self.errors[identifier] = self.__error_reason(item["error"])
+            return False
+
+        result = item.get("result")
+        if result == "created":
+            self.counts["created"] += 1
+        elif result in ("updated", "noop"):
+            self.counts["updated"] += 1
+        elif result == "deleted":
+            self.counts["deleted"] += 1
+        else:
+            self.counts["failed"] += 1
+            self.failed.append(identifier)
+            self.errors[identifier] = str(result)
+            return False
+        return True
+
+    def __add_request(self, took, seconds, succeeded, size):
+        self.chunks.append({
+            "documents": 1,
+            "bytes": size,
+            "took": took,
+            "seconds": seconds,
+            "errors": 0 if succeeded else 1,
+            "retries": 0,
+        })
+
+    @staticmethod
+    def __error_reason(error):
+        if isinstance(error, dict):
+            return error.get("reason") or error.get("type") or str(error)
+        return str(error)
+
+    def __repr__(self):
+        return str({"counts": self.counts, "errors": self.errors, "took": self.took(),
+                    "wall_time": self.wall_time(), "bytes": self.size_in_bytes()})
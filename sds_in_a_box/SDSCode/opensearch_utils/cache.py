@@ -0,0 +1,281 @@
+import copy
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache():
+    """
+    Class to represent a least recently used cache of read results, with
+    entries that expire after a time to live.
+
+    Document reads are keyed by index and document id, and searches by
+    index and the query normalized to JSON with sorted keys, so the same
+    question asked with its keys in a different order is a hit. Writes
+    made through the owning Client invalidate the entries of the documents
+    they touch and every search of their index. Writes made by other
+    processes are only picked up once the entries expire.
+
+    Document reads are real time, but searches only see a write once the
+    index has refreshed. So searches of an index aren't cached for
+    refresh_interval seconds after a write through the owning Client,
+    nor while search caching is suspended for the index, ex: while it is
+    bulk loaded with refreshes disabled. A search of an alias is
+    registered under the indices it resolves to, so writes to them
+    invalidate it.
+
+    The cache is safe to use from several threads.
+
+    ...
+
+    Attributes
+    ----------
+    max_entries: int
+        maximum number of entries, the least recently used entry is
+        evicted when a new one doesn't fit.
+    ttl: float
+        seconds an entry is served for.
+    refresh_interval: float
+        seconds after a write before searches of its index are cached
+        again, the refresh interval of the indices.
+    clock: callable
+        function returning the current time in seconds.
+
+    Methods
+    -------
+    get_document(kind, index, identifier, fetch):
+        returns a cached document read, calling fetch on a miss.
+    get_search(index, body, fetch, indices=None):
+        returns a cached search, calling fetch on a miss.
+    get_resolved(index, fetch):
+        returns the cached names of the indices an alias resolves to.
+    suspend_searches(index):
+        stops caching the searches of an index until resume_searches.
+    resume_searches(index):
+        drops the cached searches of an index and caches them again.
+    invalidate_documents(index, identifiers):
+        drops the entries of documents and the searches of their index.
+    invalidate_index(index):
+        drops every entry of an index.
+    clear():
+        drops every entry.
+    get_stats():
+        returns the hit, miss, eviction and invalidation counts and the
+        hit rate.
+    """
+    def __init__(self, max_entries=1024, ttl=60, refresh_interval=1.0, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries is {}, but must be at least 1".format(max_entries))
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+
+        self.__entries = OrderedDict()
+        # keys of the cached entries of each index, to invalidate them together
+        self.__keys_by_index = {}
+        # bumped by every invalidation of an index, so a read that raced a
+        # write isn't cached after the write invalidated it
+        self.__generations = {}
+        # bumped by clear(), which invalidates every index
+        self.__epoch = 0
+        # time of the last write to each index, its searches only see it after a refresh
+        self.__last_writes = {}
+        # indices whose searches aren't cached, ex: while they don't refresh
+        self.__suspended = set()
+        self.__lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get_document(self, kind, index, identifier, fetch):
+        """
+        Returns a cached document read, calling fetch on a miss.
+
+        Parameters
+        ----------
+        kind: str
+            kind of read, ex: "get" or "exists".
+        index: str
+            name of the document's index.
+        identifier: str
+            id of the document.
+        fetch: callable
+            function reading the result from OpenSearch.
+        """
+        return self.__get((index, kind, str(identifier)), fetch, [index])
+
+    def get_search(self, index, body, fetch, indices=None):
+        """
+        Returns a cached search, calling fetch on a miss. The search isn't
+        cached while any of its indices may not have refreshed since a
+        write.
+
+        Parameters
+        ----------
+        index: str
+            name of the searched index or alias.
+        body: dict
+            body of the search request.
+        fetch: callable
+            function running the search in OpenSearch.
+        indices: list, optional
+            names of the indices the search reads, ex: the indices of an
+            alias. Just index if None.
+        """
+        indices = sorted(set(indices if indices is not None else [index]))
+        now = self.clock()
+        with self.__lock:
+            unrefreshed = any(name in self.__suspended or now - self.__last_writes.get(name, -math.inf) < self.refresh_interval
+                              for name in indices)
+        if unrefreshed:
+            with self.__lock:
+                self.stats["misses"] += 1
+            return fetch()
+        return self.__get((index, "search", json.dumps(body, sort_keys=True)), fetch, indices)
+
+    def get_resolved(self, index, fetch):
+        """
+        Returns the cached names of the indices an index name or alias
+        resolves to, calling fetch on a miss. The entry expires with the
+        ttl and is dropped when the index is invalidated.
+
+        Parameters
+        ----------
+        index: str
+            name of an index or alias.
+        fetch: callable
+            function returning the list of index names from OpenSearch.
+        """
+        return self.__get((index, "resolve", ""), fetch, [index])
+
+    def suspend_searches(self, index):
+        """
+        Stops caching the searches of an index, ex: while refreshes are
+        disabled and searches don't see the writes.
+
+        Parameters
+        ----------
+        index: str
+            name of the index.
+        """
+        with self.__lock:
+            self.__suspended.add(index)
+            self.__invalidate_searches(index)
+
+    def resume_searches(self, index):
+        """
+        Drops the cached searches of an index and caches them again, once
+        the index has refreshed.
+
+        Parameters
+        ----------
+        index: str
+            name of the index.
+        """
+        with self.__lock:
+            self.__suspended.discard(index)
+            self.__invalidate_searches(index)
+
+    def invalidate_documents(self, index, identifiers):
+        """
+        Drops the cached reads of written documents and every cached search
+        of their index, since the writes may change which documents they
+        match.
+
+        Parameters
+        ----------
+        index: str
+            name of the documents' index.
+        identifiers: list
+            ids of the documents.
+        """
+        identifiers = set(str(identifier) for identifier in identifiers)
+        now = self.clock()
+        with self.__lock:
+            keys = [key for key in self.__keys_by_index.get(index, ())
+                    if key[1] == "search" or (key[1] != "resolve" and key[2] in identifiers)]
+            for key in keys:
+                self.__remove(key)
+            self.stats["invalidations"] += len(keys)
+            self.__generations[index] = self.__generations.get(index, 0) + 1
+            self.__last_writes[index] = now
+
+    def invalidate_index(self, index):
+        """Drops every cached entry of an index."""
+        with self.__lock:
+            keys = list(self.__keys_by_index.get(index, ()))
+            for key in keys:
+                self.__remove(key)
+            self.stats["invalidations"] += len(keys)
+            self.__generations[index] = self.__generations.get(index, 0) + 1
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__keys_by_index.clear()
+            # reads in flight don't store their results
+            self.__epoch += 1
+
+    def get_stats(self):
+        """Returns the hit, miss, eviction and invalidation counts and the hit rate as a dict."""
+        with self.__lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.__entries)
+        reads = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / reads if reads else 0.0
+        return stats
+
+    def __get(self, key, fetch, indices):
+        now = self.clock()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self.__entries.move_to_end(key)
+                self.stats["hits"] += 1
+                # callers get their own copy so they can't change the cached value
+                return copy.deepcopy(entry[2])
+            self.stats["misses"] += 1
+            generation = self.__generation(indices)
+
+        # the read is made without the lock so other reads aren't held up
+        value = fetch()
+
+        with self.__lock:
+            if self.__generation(indices) != generation:
+                return value
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (now, indices, value)
+            for index in indices:
+                self.__keys_by_index.setdefault(index, set()).add(key)
+            while len(self.__entries) > self.max_entries:
+                self.__remove(next(iter(self.__entries)))
+                self.stats["evictions"] += 1
+        return copy.deepcopy(value)
+
+    def __generation(self, indices):
+        return self.__epoch, tuple(self.__generations.get(index, 0) for index in indices)
+
+    def __invalidate_searches(self, index):
+        keys = [key for key in self.__keys_by_index.get(index, ()) if key[1] == "search"]
+        for key in keys:
+            self.__remove(key)
+        self.stats["invalidations"] += len(keys)
+        self.__generations[index] = self.__generations.get(index, 0) + 1
+
+    def __remove(self, key):
+        entry = self.__entries.pop(key, None)
+        if entry is None:
+            return
+        # an entry is registered under every index it reads
+        for index in entry[1]:
+            keys = self.__keys_by_index.get(index)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__keys_by_index[index]
+
+    def __repr__(self):
+        return str(self.get_stats())
@@ -1,7 +1,19 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 from sds_in_a_box.SDSCode.opensearch_utils.index import Index
 from sds_in_a_box.SDSCode.opensearch_utils.document import Document
 from sds_in_a_box.SDSCode.opensearch_utils.action import Action
-from opensearchpy import OpenSearch, RequestsHttpConnection
+from sds_in_a_box.SDSCode.opensearch_utils.bulk_result import BulkResult
+from sds_in_a_box.SDSCode.opensearch_utils.retry import ChunkRetry, RetryPolicy
+from sds_in_a_box.SDSCode.opensearch_utils.serializer import get_serializer
+from sds_in_a_box.SDSCode.opensearch_utils.tracing import RequestTrace
+from opensearchpy import OpenSearch, RequestsHttpConnection, TransportError, ConflictError, NotFoundError
+
+logger = logging.getLogger(__name__)
 
 
 class Client():
@@ -24,6 +36,15 @@ class Client():
         turn on / off verification of SSL certificates.
     connection_class: 
         
+    retry_policy: RetryPolicy
+        how bulk items rejected by an overloaded cluster are retried.
+    cache: QueryCache, optional
+        cache of get_document, document_exists and search results, the
+        entries are invalidated by the writes made through this client.
+        Reads aren't cached if None.
+    hooks: list
+        RequestHooks called before and after every request made to the
+        cluster, ex: to record latency histograms or tracing spans.
 
 
     Methods
@@ -34,21 +55,41 @@ class Client():
         deletes an index in the OpenSearch cluster.
     index_exists(index):
         checks whether a particular index exists in the OpenSearch cluster.
+    put_index_template(name, template):
+        creates or replaces an index template in the OpenSearch cluster.
     document_exists(document):
         checks whether a particular document exists in the OpenSearch cluster.
     send_document(document):
         sends a document to the OpenSearch cluster with its associated action.
     send_payload(payload):
         Sends a bulk payload of documents to the OpenSearch cluster.
+    get_document(document):
+        returns the specified document.
+    search(index, query, size, source):
+        returns one page of the documents matching a query.
+    iter_search(index, query, page_size, source):
+        yields every document matching a query, one page at a time.
+    supports_point_in_time():
+        checks whether the cluster supports point in time searches.
+    ping():
+        checks whether the OpenSearch cluster can be reached.
+    bulk_load(index):
+        context manager switching an index to bulk friendly settings.
 
 
     """
-    def __init__(self, hosts, http_auth, use_ssl=True, verify_certs=True, connnection_class=RequestsHttpConnection):
+    def __init__(self, hosts, http_auth, use_ssl=True, verify_certs=True, connnection_class=RequestsHttpConnection, retry_policy=None,
+                 cache=None, hooks=None):
         self.hosts = hosts
         self.http_auth = http_auth
         self.use_ssl = use_ssl
         self.verify_certs = verify_certs
         self.connnection_class = connnection_class
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.hooks = list(hooks or [])
+        # whether the cluster supports point in time, read from its version on first use
+        self.__point_in_time = None
         self.client = OpenSearch(hosts=self.hosts, http_auth=self.http_auth, 
         use_ssl=self.use_ssl, verify_certs=self.verify_certs, connection_class=self.connnection_class)
 
@@ -62,7 +103,9 @@ class Client():
             index to be created in the OpenSearch cluster.
 
         """
-        response = self.client.indices.create(index=index.get_name(), body=index.get_body()) 
+        self.__request("indices.create", index.get_name(),
+                       lambda: self.client.indices.create(index=index.get_name(), body=index.get_body()),
+                       index.get_body())
 
     def delete_index(self, index):
         """
@@ -74,7 +117,9 @@ class Client():
             index to be deleted in the OpenSearch cluster.
 
         """
-        self.client.indices.delete(index=index.get_name())
+        self.__request("indices.delete", index.get_name(), lambda: self.client.indices.delete(index=index.get_name()))
+        if self.cache is not None:
+            self.cache.invalidate_index(index.get_name())
         
     def index_exists(self, index):
         """
@@ -85,7 +130,23 @@ class Client():
         index: Index, list
             index or list of indicies.
         """
-        return self.client.indices.exists(index.get_name())
+        return self.__request("indices.exists", index.get_name(),
+                              lambda: self.client.indices.exists(index=index.get_name()))
+
+    def put_index_template(self, name, template):
+        """
+        Creates or replaces a composable index template, applied to the
+        indices created afterwards whose names match its patterns.
+
+        Parameters
+        ----------
+        name: str
+            name of the template.
+        template: dict
+            body of the template, ex: IndexMapping.get_template(["metadata*"]).
+        """
+        self.__request("indices.put_index_template", None,
+                       lambda: self.client.indices.put_index_template(name=name, body=template), template)
 
     def document_exists(self, document):
         """
@@ -96,7 +157,13 @@ class Client():
         document: Document
             document to check if it exists in the OpenSearch cluster.
         """
-        return self.client.exists(index=document.get_index(), id=document.get_identifier())
+        def fetch():
+            return self.__request("exists", document.get_index(),
+                                  lambda: self.client.exists(index=document.get_index(), id=document.get_identifier()))
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_document("exists", document.get_index(), document.get_identifier(), fetch)
 
     def send_document(self, document, action_override=None):
         """
@@ -107,45 +174,468 @@ class Client():
         ----------
         document: Document
             document to be sent to the OpenSearch cluster.
+
+        Returns
+        -------
+        BulkResult
+            the outcome of the request. A version conflict (409) is
+            recorded as a conflicted document rather than raised.
         """
+        result = BulkResult()
 
         # override the action if specified
         action = self.__override_action(document, action_override)
+        # the body is serialized once, to send it and to report its size
+        encoded = document.get_request_body(action)
+        size = len(encoded) if encoded is not None else 0
+
+        start = time.perf_counter()
+        try:
+            if action == Action.CREATE:
+                response = self.__create_document(document, encoded)
+            elif action == Action.DELETE:
+                response = self.__delete_document(document)
+            elif action == Action.UPDATE:
+                response = self.__update_document(document, encoded)
+            elif action == Action.INDEX:
+                response = self.__index_document(document, encoded)
+        except ConflictError as e:
+            result.add_conflict(document, str(e.error), time.perf_counter() - start, size)
+            return result
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate_documents(document.get_index(), [document.get_identifier()])
+
+        result.add_document(document, response, time.perf_counter() - start, size)
+        return result
+
+    def send_payload(self, payload, request_timeout=120, max_workers=1, max_inflight_bytes=None):
+        """
+        Sends a bulk payload of documents to the OpenSearch cluster. Each
+        chunk of the payload is sent as its own bulk request.
 
-        if action == Action.CREATE:
-            self.__create_document(document)
-        elif action == Action.DELETE:
-                self.__delete_document(document)
-        elif action == Action.UPDATE:
-            self.__update_document(document)
-        elif action == Action.INDEX:
-            self.__index_document(document)
+        With max_workers of 1 the chunks are sent one after another and each
+        response is checked before the next chunk is sent, so only one chunk
+        is held as a request body at a time. With more workers the chunks
+        are sent concurrently from a thread pool, holding back new requests
+        while max_inflight_bytes are already in flight. The results are
+        collected in payload order either way.
 
-    def send_payload(self, payload):
-        """
-        Sends a bulk payload of documents to the OpenSearch cluster.
+        Items rejected because the cluster is overloaded (429 / 503) are
+        resent on their own following the client's retry_policy; items
+        that were accepted are never resent.
 
         Parameters
         ----------
         payload: Payload
             payload containing bulk documents to be sent to the OpenSearch cluster.
+        request_timeout: int, float
+            timeout in seconds for each bulk request.
+        max_workers: int
+            maximum number of bulk requests in flight at once.
+        max_inflight_bytes: int, optional
+            maximum number of bytes in flight at once. A chunk larger than
+            this is still sent, but only when nothing else is in flight.
+            No limit if None.
+
+        Returns
+        -------
+        BulkResult
+            the per document outcomes and per chunk timings of the bulk requests.
         """
-        self.client.bulk(payload.get_contents(), params={"request_timeout":1000000})
+        result = BulkResult()
+        chunks = payload.get_chunks()
+        budget = self.retry_policy.new_budget()
+
+        if max_workers > 1 and len(chunks) > 1:
+            responses = self.__send_chunks_concurrently(chunks, request_timeout, budget, max_workers, max_inflight_bytes)
+        else:
+            responses = (self.__send_chunk(chunk, request_timeout, budget) for chunk in chunks)
+
+        try:
+            for chunk, (response, seconds) in zip(chunks, responses):
+                result.add_chunk(chunk, response, seconds)
+
+                if result.get_chunks()[-1]["errors"] > 0:
+                    logger.warning("{} of {} documents in bulk request failed".format(
+                        result.get_chunks()[-1]["errors"], len(chunk)))
+        finally:
+            # chunks that failed part way may still have written documents
+            if self.cache is not None:
+                identifiers = {}
+                for chunk in chunks:
+                    for document in chunk.get_documents():
+                        identifiers.setdefault(document.get_index(), []).append(document.get_identifier())
+                for index_name, index_identifiers in identifiers.items():
+                    self.cache.invalidate_documents(index_name, index_identifiers)
+        return result
 
     def get_document(self, document):
         """Returns the specified document"""
-        return self.client.get(index=document.get_index(), id=document.get_identifier())
+        def fetch():
+            return self.__request("get", document.get_index(),
+                                  lambda: self.client.get(index=document.get_index(), id=document.get_identifier()))
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_document("get", document.get_index(), document.get_identifier(), fetch)
+
+    def search(self, index, query=None, size=10, source=None):
+        """
+        Searches an index in the OpenSearch cluster, returning a single page
+        of hits. Use iter_search to read every match.
+
+        Parameters
+        ----------
+        index: Index
+            index to be searched.
+        query: dict, optional
+            OpenSearch query DSL, ex: {"term": {"level": "l0"}}. Matches
+            all documents if None.
+        size: int
+            maximum number of hits to return.
+        source: bool, list, optional
+            fields of _source to return, ex: ["mission", "version"], or
+            False to return none. The whole _source is returned if None.
+
+        Returns
+        -------
+        dict
+            the search response.
+        """
+        body = {"query": query if query is not None else {"match_all": {}}, "size": size}
+        if source is not None:
+            body["_source"] = source
+        name = Index.validate_index(index).get_name()
+
+        def fetch():
+            return self.__request("search", name, lambda: self.client.search(index=name, body=body), body)
+
+        # the indices a wildcard or list matches change as indices are created, so they aren't cached
+        if self.cache is None or any(character in name for character in "*,"):
+            return fetch()
+        try:
+            indices = self.cache.get_resolved(name, lambda: self.__resolve_alias(name))
+        except NotFoundError:
+            return fetch()
+        return self.cache.get_search(name, body, fetch, indices)
+
+    def iter_search(self, index, query=None, page_size=1000, source=None, sort=None, keep_alive="1m"):
+        """
+        Yields every document matching a query, reading the results one page
+        at a time so memory use doesn't grow with the number of matches.
+
+        On OpenSearch 2.4 and later the pages are read from a point in time
+        (PIT) of the index with search_after, with _shard_doc added to the
+        sort as the tiebreaker. Older clusters don't have PITs, so the pages
+        are read with a scroll instead. Either way the results are
+        consistent even if documents are written while they are read, there
+        is no from + size limit on how deep they go, and the PIT or scroll
+        is deleted when the generator is exhausted or closed.
+
+        Parameters
+        ----------
+        index: Index
+            index to be searched.
+        query: dict, optional
+            OpenSearch query DSL, ex: {"term": {"level": "l0"}}. Matches
+            all documents if None.
+        page_size: int
+            number of hits read per request.
+        source: bool, list, optional
+            fields of _source to return, ex: ["mission", "version"], or
+            False to return none. The whole _source is returned if None.
+        sort: list, optional
+            sort of the results, ex: [{"version": "desc"}]. In index order
+            if None.
+        keep_alive: str
+            time the PIT or scroll is kept between two pages, ex: "1m".
+
+        Yields
+        ------
+        dict
+            each hit, with its _id and _source.
+        """
+        name = Index.validate_index(index).get_name()
+        body = {
+            "query": query if query is not None else {"match_all": {}},
+            "size": page_size,
+            "track_total_hits": False,
+        }
+        if source is not None:
+            body["_source"] = source
+
+        if self.supports_point_in_time():
+            # search_after needs a unique sort, _shard_doc is unique within a PIT and cheap to sort on
+            body["sort"] = list(sort or [])
+            if not any(_sort_name(field) == "_shard_doc" for field in body["sort"]):
+                body["sort"].append({"_shard_doc": "asc"})
+            return self.__iter_point_in_time(name, body, keep_alive)
+        body["sort"] = sort if sort is not None else ["_doc"]
+        return self.__iter_scroll(name, body, keep_alive)
+
+    def supports_point_in_time(self):
+        """
+        Returns a boolean indicating whether the cluster supports point in
+        time searches, which OpenSearch added in 2.4. The cluster version is
+        read once per client.
+        """
+        if self.__point_in_time is None:
+            version = self.__request("info", None, self.client.info)["version"]
+            number = tuple(int(part) for part in version["number"].split(".")[:2])
+            # OpenSearch 1.x in compatibility mode reports 7.10.2 without a distribution
+            self.__point_in_time = version.get("distribution") == "opensearch" and number >= (2, 4)
+        return self.__point_in_time
+
+    def ping(self):
+        """Returns a boolean indicating whether the OpenSearch cluster can be reached."""
+        return self.__request("ping", None, self.client.ping)
+
+    @contextmanager
+    def bulk_load(self, index, replicas=0, wait_for_status="yellow", timeout="120s"):
+        """
+        Context manager for large ingests. On entry it disables the periodic
+        refresh of the index and reduces its replicas, so bulk requests
+        aren't slowed by constant segment refreshes and replica writes. On
+        exit, even when an exception escapes, it restores the original
+        settings, refreshes the index and waits for the cluster health to
+        recover.
+
+        Parameters
+        ----------
+        index: Index
+            index being loaded.
+        replicas: int
+            number of replicas during the load.
+        wait_for_status: str
+            cluster health status to wait for on exit, green, yellow or red.
+            Yellow by default, since a cluster with a single data node can't
+            allocate replicas and never turns green.
+        timeout: str
+            maximum time to wait for the cluster health, ex: "120s".
+
+        Example
+        -------
+        with client.bulk_load(index):
+            client.send_payload(payload, max_workers=4)
+        """
+        name = Index.validate_index(index).get_name()
+        settings = self.__request("indices.get_settings", name, lambda: self.client.indices.get_settings(
+            index=name, flat_settings=True))[name]["settings"]
+        # a refresh interval that was never set is restored to the cluster default with None
+        original = {"refresh_interval": settings.get("index.refresh_interval"),
+                    "number_of_replicas": settings.get("index.number_of_replicas")}
+
+        loading = {"index": {"refresh_interval": "-1", "number_of_replicas": replicas}}
+        self.__request("indices.put_settings", name, lambda: self.client.indices.put_settings(index=name, body=loading),
+                       loading)
+        # searches don't see the writes until the refresh on exit, so they aren't cached until then
+        if self.cache is not None:
+            self.cache.suspend_searches(name)
+        logger.info("Bulk loading {}, saved settings {}".format(name, original))
+        try:
+            yield
+        finally:
+            try:
+                restored = {"index": original}
+                self.__request("indices.put_settings", name,
+                               lambda: self.client.indices.put_settings(index=name, body=restored), restored)
+            finally:
+                # the loaded documents are made searchable even if the settings couldn't be restored
+                try:
+                    self.__request("indices.refresh", name, lambda: self.client.indices.refresh(index=name))
+                finally:
+                    if self.cache is not None:
+                        self.cache.resume_searches(name)
+            health = self.__request("cluster.health", name, lambda: self.client.cluster.health(
+                index=name, wait_for_status=wait_for_status, timeout=timeout, ignore=408))
+            if health.get("timed_out"):
+                logger.warning("{} didn't reach {} health within {}, it is {}".format(
+                    name, wait_for_status, timeout, health.get("status")))
 
     def close(self):
         """Close the Transport and all internal connections"""
         self.client.close()
             
+    def __resolve_alias(self, name):
+        # the response is keyed by the indices, the index itself when name isn't an alias
+        return sorted(self.__request("indices.get_alias", name, lambda: self.client.indices.get_alias(index=name)))
+
+    def __iter_point_in_time(self, name, body, keep_alive):
+        """Yields the hits of a search read from a point in time of the index with search_after."""
+        pit_id = self.__request("create_pit", name,
+                                lambda: self.client.create_pit(index=name, keep_alive=keep_alive))["pit_id"]
+        try:
+            while True:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                response = self.__request("search", name, lambda: self.client.search(body=body), body)
+                # the PIT id may change from one page to the next
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                yield from hits
+                if len(hits) < body["size"]:
+                    return
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            try:
+                self.__request("delete_pit", name, lambda: self.client.delete_pit(body={"pit_id": [pit_id]}))
+            except TransportError:
+                logger.warning("Failed to delete point in time {}, it expires after {}".format(pit_id, keep_alive))
+
+    def __iter_scroll(self, name, body, keep_alive):
+        """Yields the hits of a search read with a scroll, for clusters without point in time."""
+        response = self.__request("search", name, lambda: self.client.search(
+            index=name, body=body, scroll=keep_alive), body)
+        scroll_id = response.get("_scroll_id")
+        try:
+            while True:
+                hits = response["hits"]["hits"]
+                yield from hits
+                if len(hits) < body["size"]:
+                    return
+                scroll = {"scroll_id": scroll_id, "scroll": keep_alive}
+                response = self.__request("scroll", name, lambda: self.client.scroll(body=scroll))
+                # the scroll id may change from one page to the next
+                scroll_id = response.get("_scroll_id", scroll_id)
+        finally:
+            try:
+                self.__request("clear_scroll", name, lambda: self.client.clear_scroll(body={"scroll_id": [scroll_id]}))
+            except TransportError:
+                logger.warning("Failed to clear scroll {}, it expires after {}".format(scroll_id, keep_alive))
+
+    def __send_chunk(self, chunk, request_timeout, budget):
+        """
+        Sends a single payload chunk as a bulk request, resending only the
+        items rejected with a retryable status until they are accepted or
+        the retries run out.
+
+        Parameters
+        ----------
+        chunk: PayloadChunk
+            chunk to be sent to the OpenSearch cluster.
+        request_timeout: int, float
+            timeout in seconds for each bulk request.
+        budget: RetryBudget
+            retries left for the payload the chunk belongs to.
+
+        Returns
+        -------
+        tuple
+            the bulk response, with the final item of every document in chunk
+            order, and the client wall time in seconds.
+        """
+        start = time.perf_counter()
+        retry = ChunkRetry(chunk, self.retry_policy, budget)
+        while True:
+            body, size = retry.get_request()
+            try:
+                response = self.__request("bulk", None, lambda: self.client.bulk(
+                    body=body, params={"request_timeout":request_timeout}), size=size)
+            except TransportError as e:
+                # the whole request was rejected, so every pending item is resent
+                if not retry.add_error(e):
+                    raise
+            else:
+                if not retry.add_response(response):
+                    break
+            self.retry_policy.sleep(retry.next_backoff())
+        return retry.get_response(), time.perf_counter() - start
+
+    def __send_chunks_concurrently(self, chunks, request_timeout, budget, max_workers, max_inflight_bytes):
+        """
+        Sends payload chunks as bulk requests from a thread pool, waiting
+        to submit each chunk until it fits within max_inflight_bytes.
+        Returns the (response, seconds) of each chunk in chunk order.
+        """
+        condition = threading.Condition()
+        inflight = {"bytes": 0}
+
+        def fits(size):
+            return max_inflight_bytes is None or inflight["bytes"] == 0 \
+                or inflight["bytes"] + size <= max_inflight_bytes
+
+        def send(chunk):
+            try:
+                return self.__send_chunk(chunk, request_timeout, budget)
+            finally:
+                with condition:
+                    inflight["bytes"] -= chunk.size_in_bytes()
+                    condition.notify_all()
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for chunk in chunks:
+                size = chunk.size_in_bytes()
+                with condition:
+                    condition.wait_for(lambda: fits(size))
+                    inflight["bytes"] += size
+                futures.append(executor.submit(send, chunk))
+            return [future.result() for future in futures]
+
+    def __request(self, operation, index, call, body=None, size=None):
+        """
+        Makes a request to the OpenSearch cluster, firing the client's hooks
+        before and after it. Without hooks the request is made directly.
+
+        Parameters
+        ----------
+        operation: str
+            name of the opensearch-py call, ex: "bulk".
+        index: str
+            name of the index the request is made to, None if it isn't made to an index.
+        call: callable
+            function making the request and returning its response.
+        body: dict, optional
+            body of the request, to report its size, ex: a search.
+        size: int, optional
+            size of the request body in bytes, for a body sent already
+            serialized so it isn't serialized again.
+        """
+        if not self.hooks:
+            return call()
+
+        if size is None:
+            size = 0 if body is None else len(get_serializer().dumps(body))
+        trace = RequestTrace(operation, index, size)
+        self.__fire("before", trace)
+        start = time.perf_counter()
+        try:
+            response = call()
+        except TransportError as e:
+            # a connection error has no HTTP status
+            trace.status = e.status_code if isinstance(e.status_code, int) else None
+            trace.error = e
+            raise
+        except Exception as e:
+            trace.error = e
+            raise
+        else:
+            if isinstance(response, dict):
+                trace.status = 201 if response.get("result") == "created" else 200
+                trace.took = response.get("took")
+            elif response is False:
+                # HEAD requests return False for a missing resource, ping for an unreachable cluster
+                trace.status = None if operation == "ping" else 404
+            else:
+                trace.status = 200
+            return response
+        finally:
+            trace.seconds = time.perf_counter() - start
+            self.__fire("after", trace)
+
+    def __fire(self, name, trace):
+        for hook in self.hooks:
+            try:
+                getattr(hook, name)(trace)
+            except Exception:
+                logger.exception("Request hook {} failed on {}".format(hook, trace))
+
     def __override_action(self, document, action):
         if action == None or not Action.is_action(action):
             action = document.get_action() 
         return action
               
-    def __create_document(self, document):
+    def __create_document(self, document, encoded):
         """
         Creates the document in the OpenSearch cluster. Returns a 409 response 
         when a document with a same identifier already exists in the index.
@@ -154,9 +644,12 @@ class Client():
         ----------
         document: Document 
             Document to be added to the OpenSearch cluster.
+        encoded: bytes
+            serialized body of the request.
 
         """
-        self.client.create(index=document.get_index(), id=document.get_identifier(), body=document.get_body())
+        return self.__request("create", document.get_index(), lambda: self.client.create(
+            index=document.get_index(), id=document.get_identifier(), body=encoded), size=len(encoded))
 
     def __delete_document(self, document):
         """
@@ -168,9 +661,10 @@ class Client():
             Document to be deleted from the OpenSearch cluster.
 
         """
-        self.client.delete(index=document.get_index(), id=document.get_identifier())
+        return self.__request("delete", document.get_index(), lambda: self.client.delete(
+            index=document.get_index(), id=document.get_identifier()))
 
-    def __update_document(self, document):
+    def __update_document(self, document, encoded):
         """
         Updates the document in the OpenSearch cluster if it exists, returns an error
         if it doesn't exist.
@@ -179,12 +673,14 @@ class Client():
         ----------
         document: Document
              Document to be updated in the OpenSearch cluster.
+        encoded: bytes
+            serialized body of the request.
 
         """
-        body = {'doc': document.get_body()}
-        self.client.update(index=document.get_index(), id=document.get_identifier(), body = body)
+        return self.__request("update", document.get_index(), lambda: self.client.update(
+            index=document.get_index(), id=document.get_identifier(), body = encoded), size=len(encoded))
 
-    def __index_document(self, document):
+    def __index_document(self, document, encoded):
         """
         Creates the document in the OpenSearch cluster if it does not already exist. 
         If the document does exist, it will update the document.
@@ -193,8 +689,14 @@ class Client():
         ----------
          document: Document 
             Document to be created or updated in the OpenSearch cluster.
+        encoded: bytes
+            serialized body of the request.
 
         """
-        self.client.index(index=document.get_index(), id=document.get_identifier(), body = document.get_body())
+        return self.__request("index", document.get_index(), lambda: self.client.index(
+            index=document.get_index(), id=document.get_identifier(), body = encoded), size=len(encoded))
+
 
-    
\ No newline at end of file
+def _sort_name(field):
+    """Returns the field name of a sort clause, ex: "version" for {"version": "desc"}."""
+    return field if isinstance(field, str) else next(iter(field))
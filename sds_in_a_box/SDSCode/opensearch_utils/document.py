@@ -1,6 +1,7 @@
-import json
+from functools import lru_cache
 from sds_in_a_box.SDSCode.opensearch_utils.index import Index
 from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.serializer import get_serializer
 
 
 class Document():
@@ -19,11 +20,18 @@ class Document():
         the body of the document.
     action: Action
         the action for OpenSearch to perform on the document.
+    serializer: JsonSerializer, OrjsonSerializer
+        the backend used to serialize the body. Defaults to the
+        serializer returned by get_serializer().
     contents: str
         the complete document formatted as a single API request.
     size: int
         the size of the document in bytes.
 
+    The bulk request contents are serialized lazily, on first use, and
+    the encoded bytes are cached until the body or action changes, so the
+    size and the payload assembly share a single serialization.
+
     Methods
     -------
     update_body(body):
@@ -41,19 +49,22 @@ class Document():
     get_contents():
         returns full contents of the document as a str. this includes
         the index, action, identifier, and body.
+    get_encoded():
+        returns full contents of the document as encoded (utf-8) bytes.
+    get_request_body(action):
+        returns the encoded body of a single document request for the action.
     size_in_bytes():
-        returns the size of the encoded (ascii) document contents in bytes.
+        returns the size of the encoded (utf-8) document contents in bytes.
     """
+    __slots__ = ("index", "identifier", "action", "body", "serializer", "__encoded")
 
-    def __init__(self, index, doc_id, action, body={},):
+    def __init__(self, index, doc_id, action, body={}, serializer=None):
         self.index = Index.validate_index(index)
         self.identifier = self.__validate_identifier(doc_id)
         self.action = Action.validate_action(action)
         self.body = body
-        self.contents = ""
-        self.size = 0
-
-        self.__update_contents()
+        self.serializer = serializer or get_serializer()
+        self.__encoded = None
 
     def update_body(self, body):
         """
@@ -66,7 +77,7 @@ class Document():
         """
         if type(body) is dict:
             self.body = body
-            self.__update_contents()
+            self.__encoded = None
         else:
             raise TypeError("Document body passed in as type {}, but must be of type dict".format(type(body)))
             
@@ -80,6 +91,7 @@ class Document():
             action to be performed on the document by OpenSearch.
         """
         self.action = Action.validate_action(action)
+        self.__encoded = None
 
     def get_body(self):
         """Returns the body of the document as a string."""
@@ -99,28 +111,52 @@ class Document():
     
     def get_contents(self):
         """Returns the full contents of the document as a string."""
-        return self.contents
-    
+        return self.get_encoded().decode("utf-8")
+
+    def get_encoded(self):
+        """Returns the full contents of the document as encoded bytes."""
+        if self.__encoded is None:
+            self.__encoded = b"".join((
+                _action_prefix(self.action, self.index.get_name()),
+                self.identifier.encode("utf-8"),
+                b'" } }\n',
+                self.serializer.dumps(self.body),
+                b"\n",
+            ))
+        return self.__encoded
+
+    def get_request_body(self, action):
+        """
+        Returns the encoded body of a single document request, ex: the
+        document API rather than _bulk, or None for a delete, which sends none.
+
+        Parameters
+        ----------
+        action: Action
+            action of the request, an update wraps the body as a partial document.
+        """
+        if action == Action.DELETE:
+            return None
+        body = {'doc': self.body} if action == Action.UPDATE else self.body
+        return self.serializer.dumps(body)
+
     def size_in_bytes(self):
         """Returns the size of the document's bulk request json string in bytes."""
-        return self.size
-
-    def __update_contents(self):
-        action_string = \
-                '{ "' \
-                + self.action.value \
-                + '": { "_index": "' \
-                + self.index.get_name() \
-                + '", "_id": "' \
-                + self.identifier + '" } }\n'
-        self.contents = action_string + json.dumps(self.body) + '\n'
-        self.size = len(self.contents.encode("ascii"))
+        return len(self.get_encoded())
+
+    @property
+    def contents(self):
+        return self.get_contents()
+
+    @property
+    def size(self):
+        return self.size_in_bytes()
 
     def __validate_identifier(self, identifier):
         if type(identifier) is str or type(identifier) is int:
             return str(identifier)
         else:
-            raise TypeError("Identifier is type {}, but must be type str or int".format(type(index)))
+            raise TypeError("Identifier is type {}, but must be type str or int".format(type(identifier)))
     
     @staticmethod
     def is_document(document):
@@ -135,4 +171,10 @@ class Document():
         return type(document) is Document         
 
     def __repr__(self):
-        return str(self.contents)
+        return self.get_contents()
+
+
+@lru_cache(maxsize=None)
+def _action_prefix(action, index_name):
+    """Returns the encoded start of the bulk action line, up to the document id."""
+    return ('{ "' + action.value + '": { "_index": "' + index_name + '", "_id": "').encode("utf-8")
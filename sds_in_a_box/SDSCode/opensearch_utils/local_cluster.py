@@ -0,0 +1,742 @@
+"""
+An in-process stand-in for an OpenSearch cluster, for running the client
+and the indexer offline in tests and benchmarks.
+
+LocalCluster keeps its indices in memory and answers the REST calls the
+opensearch-py client makes through a connection class, so a Client talks
+to it without any network or credentials:
+
+    cluster = LocalCluster(latency=0.005)
+    client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                    connnection_class=cluster.connection_class)
+
+and an AsyncClient through cluster.async_connection_class.
+
+It implements index create / delete / exists / settings / refresh, index
+aliases, index templates, the document create / index / update / delete / get / exists
+APIs, _bulk with per item responses and version conflicts, and searches
+with match_all, term, terms, ids, exists, range and bool queries, sorting,
+search_after, source filtering, point in time and scroll. It reports the
+OpenSearch version of the stack's domain, 1.2.4 by default, and like
+OpenSearch only has point in time from 2.4.
+
+Documents are visible to searches as soon as they are written, unless the
+cluster is near real time: searches then only see the documents of the
+last refresh of each index, made by _refresh, a write with refresh=true or
+the index.refresh_interval (1s by default, never if -1), while document
+reads stay real time. Request latency and 429 rejections of bulk items can
+be injected to exercise the retry and concurrency paths.
+"""
+import asyncio
+import copy
+import fnmatch
+import functools
+import itertools
+import json
+import random
+import threading
+import time
+from urllib.parse import unquote
+
+from opensearchpy import Connection
+
+try:
+    # the async transport is only available when aiohttp is installed
+    from opensearchpy import AsyncConnection
+except ImportError:
+    AsyncConnection = None
+
+
+class LocalConnection(Connection):
+    """
+    Class to send the requests of an opensearch-py client to a LocalCluster
+    instead of over HTTP. Use LocalCluster.connection_class to get a
+    connection class bound to a cluster.
+    """
+    cluster = None
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        start = time.time()
+        status, response = self.cluster.handle(method, url, params or {}, body)
+        return _respond(self, method, url, body, ignore, status, response, time.time() - start)
+
+    def close(self):
+        """There is no connection to close."""
+
+
+if AsyncConnection is not None:
+    class LocalAsyncConnection(AsyncConnection):
+        """
+        Class to send the requests of an opensearch-py async client to a
+        LocalCluster. The requests are handled on a worker thread, so the
+        injected latency doesn't block the event loop. Use
+        LocalCluster.async_connection_class to get a connection class bound
+        to a cluster.
+        """
+        cluster = None
+
+        async def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+            start = time.time()
+            status, response = await asyncio.get_running_loop().run_in_executor(
+                None, self.cluster.handle, method, url, params or {}, body)
+            return _respond(self, method, url, body, ignore, status, response, time.time() - start)
+
+        async def close(self):
+            """There is no connection to close."""
+else:
+    LocalAsyncConnection = None
+
+
+def _respond(connection, method, url, body, ignore, status, response, duration):
+    """Logs a handled request and returns it as a connection does, raising the error of a failed request."""
+    raw_data = json.dumps(response) if response is not None else ""
+    if not (200 <= status < 300) and status not in ignore:
+        connection.log_request_fail(method, url, url, body, duration, status, raw_data)
+        connection._raise_error(status, raw_data, "application/json")
+
+    connection.log_request_success(method, url, url, body, status, raw_data, duration)
+    return status, {"content-type": "application/json"}, raw_data
+
+
+class LocalCluster():
+    """
+    Class to represent an in-memory OpenSearch cluster.
+
+    ...
+
+    Attributes
+    ----------
+    latency: float
+        seconds added to every request.
+    item_latency: float
+        seconds added to a bulk request per item, to model the cost of
+        indexing.
+    reject_rate: float
+        probability that a bulk item is rejected with a 429.
+    seed: int, optional
+        seed of the random rejections.
+    version: str
+        OpenSearch version the cluster reports.
+    near_real_time: bool
+        whether searches only see the documents of the last refresh of
+        each index, as in OpenSearch, rather than every write.
+    sleep: callable
+        function used to wait out the latency.
+    clock: callable
+        function returning the current time in seconds, for the refresh
+        intervals.
+    indices: dict
+        the indices of the cluster, keyed by name.
+    stats: dict
+        number of requests, bulk requests, bulk items and rejected items
+        handled.
+
+    Methods
+    -------
+    connection_class:
+        opensearch-py connection class that sends requests to the cluster.
+    async_connection_class:
+        opensearch-py async connection class that sends requests to the cluster.
+    reject_items(count):
+        rejects the next count bulk items with a 429.
+    handle(method, path, params, body):
+        handles a REST request and returns its status and response body.
+    get_stats():
+        returns the request counts.
+    """
+    def __init__(self, latency=0.0, item_latency=0.0, reject_rate=0.0, seed=None, sleep=time.sleep,
+                 version="1.2.4", near_real_time=False, clock=time.monotonic):
+        self.latency = latency
+        self.item_latency = item_latency
+        self.reject_rate = reject_rate
+        self.sleep = sleep
+        self.version = version
+        self.near_real_time = near_real_time
+        self.clock = clock
+        self.indices = {}
+        self.templates = {}
+        self.stats = {"requests": 0, "bulk_requests": 0, "bulk_items": 0, "rejected_items": 0}
+
+        self.__random = random.Random(seed)
+        self.__reject_next = 0
+        self.__pits = {}
+        self.__pit_ids = itertools.count()
+        self.__scrolls = {}
+        self.__scroll_ids = itertools.count()
+        self.__lock = threading.Lock()
+
+    @property
+    def connection_class(self):
+        """Returns an opensearch-py connection class that sends its requests to this cluster."""
+        return type("LocalConnection", (LocalConnection,), {"cluster": self})
+
+    @property
+    def async_connection_class(self):
+        """Returns an opensearch-py async connection class that sends its requests to this cluster."""
+        if LocalAsyncConnection is None:
+            raise ImportError("async_connection_class requires aiohttp, install it with: pip install opensearch-py[async]")
+        return type("LocalAsyncConnection", (LocalAsyncConnection,), {"cluster": self})
+
+    def reject_items(self, count):
+        """
+        Rejects the next bulk items with a 429, as an overloaded cluster does.
+
+        Parameters
+        ----------
+        count: int
+            number of bulk items to reject.
+        """
+        with self.__lock:
+            self.__reject_next += count
+
+    def get_stats(self):
+        """Returns the number of requests, bulk requests, bulk items and rejected items as a dict."""
+        with self.__lock:
+            return dict(self.stats)
+
+    def handle(self, method, path, params, body):
+        """
+        Handles a REST request.
+
+        Parameters
+        ----------
+        method: str
+            HTTP method, ex: "PUT".
+        path: str
+            url path, ex: "/test_data/_doc/1".
+        params: dict
+            query string parameters.
+        body: str, bytes, optional
+            request body, newline delimited JSON for _bulk and JSON otherwise.
+
+        Returns
+        -------
+        tuple
+            (status, response body).
+        """
+        parts = [unquote(part) for part in path.split("?")[0].split("/") if part]
+        # the client sends query string values encoded, ex: b"true"
+        params = {key: value.decode("utf-8") if isinstance(value, bytes) else value for key, value in params.items()}
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        is_bulk = parts[-1:] == ["_bulk"]
+        if body and not is_bulk:
+            body = json.loads(body)
+
+        # the latency is waited out without the lock so concurrent requests overlap
+        delay = self.latency
+        if is_bulk and body:
+            delay += self.item_latency * (body.count("\n") // 2)
+        if delay:
+            self.sleep(delay)
+
+        with self.__lock:
+            self.stats["requests"] += 1
+            return self.__route(method, parts, params, body or None)
+
+    def __route(self, method, parts, params, body):
+        if not parts:
+            return 200, {"name": "local", "cluster_name": "local",
+                         "version": {"distribution": "opensearch", "number": self.version}}
+        if parts[-1] == "_bulk" and len(parts) <= 2:
+            return self.__bulk(parts[0] if len(parts) == 2 else None, body or "", params)
+        if parts[-2:] == ["_search", "point_in_time"] and not self.__supports_point_in_time():
+            return self.__no_handler(method, parts)
+        if parts[0] == "_index_template" and len(parts) == 2:
+            self.templates[parts[1]] = body
+            return 200, {"acknowledged": True}
+        if parts == ["_aliases"] and method == "POST":
+            return self.__update_aliases(body or {})
+        if parts[:2] == ["_cluster", "health"]:
+            return 200, {"cluster_name": "local", "status": "green", "timed_out": False, "number_of_nodes": 1}
+        if parts == ["_search", "point_in_time"] and method == "DELETE":
+            return self.__delete_pits(body or {})
+        if parts == ["_search", "scroll"]:
+            return self.__scroll(method, body or {})
+        if parts == ["_search"]:
+            return self.__search(None, body or {}, params)
+
+        index = parts[0]
+        if len(parts) == 1:
+            return self.__index_api(method, index, body or {})
+        if parts[1:] == ["_settings"]:
+            return self.__settings(method, index, body or {}, params)
+        if parts[1:] == ["_alias"]:
+            return self.__get_aliases(index)
+        if parts[1:] == ["_refresh"]:
+            return self.__refresh_api(index)
+        if parts[1:] == ["_search"]:
+            return self.__search(index, body or {}, params)
+        if parts[1:] == ["_search", "point_in_time"]:
+            return self.__create_pit(index)
+        if len(parts) == 3 and parts[1] in ("_doc", "_create", "_update"):
+            return self.__document_api(method, index, parts[1], parts[2], body, params)
+        return self.__no_handler(method, parts)
+
+    def __no_handler(self, method, parts):
+        return 400, _error("illegal_argument_exception",
+                           "no handler found for uri [/{}] and method [{}]".format("/".join(parts), method), 400)
+
+    def __supports_point_in_time(self):
+        return tuple(int(part) for part in self.version.split(".")[:2]) >= (2, 4)
+
+    # ----- indices -----
+
+    def __exists(self, index):
+        return index in self.indices
+
+    def __missing_index(self, index):
+        return 404, _error("index_not_found_exception", "no such index [{}]".format(index), 404)
+
+    def __create_index(self, name, body):
+        # the highest priority template matching the name applies, then the body
+        settings = {"index.number_of_shards": "1", "index.number_of_replicas": "1"}
+        mappings = {}
+        templates = [template for template in self.templates.values()
+                     if any(fnmatch.fnmatchcase(name, pattern) for pattern in template.get("index_patterns", []))]
+        for template in sorted(templates, key=lambda template: template.get("priority", 0))[-1:]:
+            settings.update(_flatten_settings(template.get("template", {}).get("settings", {})))
+            mappings = copy.deepcopy(template.get("template", {}).get("mappings", {}))
+        settings.update(_flatten_settings(body.get("settings", {})))
+        mappings = body.get("mappings", mappings)
+        self.indices[name] = {"settings": settings, "mappings": mappings, "aliases": set(), "documents": {},
+                              "searchable": {}, "refreshed": self.clock(), "seq_no": 0}
+        return self.indices[name]
+
+    def __index_api(self, method, index, body):
+        if method == "PUT":
+            if self.__exists(index):
+                return 400, _error("resource_already_exists_exception",
+                                   "index [{}] already exists".format(index), 400)
+            self.__create_index(index, body)
+            return 200, {"acknowledged": True, "shards_acknowledged": True, "index": index}
+        if not self.__exists(index):
+            return self.__missing_index(index)
+        if method == "DELETE":
+            del self.indices[index]
+            return 200, {"acknowledged": True}
+        if method == "HEAD":
+            return 200, None
+        return 200, {index: {"aliases": {alias: {} for alias in sorted(self.indices[index]["aliases"])},
+                             "mappings": self.indices[index]["mappings"],
+                             "settings": _nest_settings(self.indices[index]["settings"])}}
+
+    def __settings(self, method, index, body, params):
+        if not self.__exists(index):
+            return self.__missing_index(index)
+        settings = self.indices[index]["settings"]
+        if method == "PUT":
+            for key, value in _flatten_settings(body).items():
+                if value is None:
+                    settings.pop(key, None)
+                else:
+                    settings[key] = value
+            return 200, {"acknowledged": True}
+        flat = params.get("flat_settings") == "true"
+        return 200, {index: {"settings": dict(settings) if flat else _nest_settings(settings)}}
+
+    def __update_aliases(self, body):
+        for action in body.get("actions", []):
+            (kind, alias), = action.items()
+            if not self.__exists(alias["index"]):
+                return self.__missing_index(alias["index"])
+            if kind == "add":
+                self.indices[alias["index"]]["aliases"].add(alias["alias"])
+            else:
+                self.indices[alias["index"]]["aliases"].discard(alias["alias"])
+        return 200, {"acknowledged": True}
+
+    def __get_aliases(self, expression):
+        names, missing = self.__resolve(expression)
+        if names is None:
+            return self.__missing_index(missing)
+        return 200, {name: {"aliases": {alias: {} for alias in sorted(self.indices[name]["aliases"])}}
+                     for name in names}
+
+    def __refresh_api(self, expression):
+        names, missing = self.__resolve(expression)
+        if names is None:
+            return self.__missing_index(missing)
+        for name in names:
+            self.__refresh(name)
+        return 200, {"_shards": {"total": len(names), "successful": len(names), "failed": 0}}
+
+    def __refresh(self, name):
+        # documents are replaced rather than changed by writes, so a shallow copy is a snapshot
+        self.indices[name]["searchable"] = dict(self.indices[name]["documents"])
+        self.indices[name]["refreshed"] = self.clock()
+
+    def __refresh_if_due(self, name):
+        """Makes the refresh the refresh interval of an index may have made since the last one."""
+        interval = _seconds(self.indices[name]["settings"].get("index.refresh_interval", "1s"))
+        if interval is not None and self.clock() - self.indices[name]["refreshed"] >= interval:
+            self.__refresh(name)
+
+    def __searchable(self, name):
+        """Returns the documents of an index searches see."""
+        if not self.near_real_time:
+            return self.indices[name]["documents"]
+        self.__refresh_if_due(name)
+        return self.indices[name]["searchable"]
+
+    # ----- documents -----
+
+    def __write(self, op, index, identifier, source):
+        """Applies one document write and returns its status and response item."""
+        if not self.__exists(index):
+            self.__create_index(index, {})
+        # a refresh that was due happened before the write, so it doesn't include it
+        self.__refresh_if_due(index)
+        documents = self.indices[index]["documents"]
+        existing = documents.get(identifier)
+        item = {"_index": index, "_id": identifier}
+
+        if op == "create" and existing is not None:
+            return 409, dict(item, status=409, error={
+                "type": "version_conflict_engine_exception", "index": index,
+                "reason": "[{}]: version conflict, document already exists (current version [{}])".format(
+                    identifier, existing["_version"])})
+        if op == "update" and existing is None:
+            return 404, dict(item, status=404, error={
+                "type": "document_missing_exception", "index": index,
+                "reason": "[{}]: document missing".format(identifier)})
+        if op == "delete" and existing is None:
+            return 404, dict(item, status=404, result="not_found", _version=1, _shards=_SHARDS)
+
+        if op == "delete":
+            del documents[identifier]
+            result, status = "deleted", 200
+        elif op == "update":
+            source = _merge(copy.deepcopy(existing["_source"]), (source or {}).get("doc", {}))
+            if source == existing["_source"]:
+                return 200, dict(item, status=200, result="noop", _version=existing["_version"],
+                                 _seq_no=existing["_seq_no"], _primary_term=1, _shards=_SHARDS)
+            result, status = "updated", 200
+        else:
+            result, status = ("updated", 200) if existing is not None else ("created", 201)
+
+        self.indices[index]["seq_no"] += 1
+        version = existing["_version"] + 1 if existing is not None else 1
+        if op != "delete":
+            documents[identifier] = {"_source": copy.deepcopy(source), "_version": version,
+                                     "_seq_no": self.indices[index]["seq_no"]}
+        return status, dict(item, status=status, result=result, _version=version,
+                            _seq_no=self.indices[index]["seq_no"], _primary_term=1, _shards=_SHARDS)
+
+    def __document_api(self, method, index, endpoint, identifier, body, params):
+        if endpoint == "_create":
+            op = "create"
+        elif endpoint == "_update":
+            op = "update"
+        elif method == "DELETE":
+            op = "delete"
+        elif method in ("PUT", "POST"):
+            op = "create" if params.get("op_type") == "create" else "index"
+        else:
+            return self.__get_document(method, index, identifier)
+
+        status, item = self.__write(op, index, identifier, body)
+        if params.get("refresh") in ("", "true", "wait_for") and self.__exists(index):
+            self.__refresh(index)
+        item.pop("status")
+        return status, item if "error" not in item else _error(item["error"]["type"], item["error"]["reason"], status)
+
+    def __get_document(self, method, index, identifier):
+        if not self.__exists(index):
+            return self.__missing_index(index)
+        document = self.indices[index]["documents"].get(identifier)
+        if document is None:
+            return 404, {"_index": index, "_id": identifier, "found": False}
+        if method == "HEAD":
+            return 200, None
+        return 200, {"_index": index, "_id": identifier, "_version": document["_version"],
+                     "_seq_no": document["_seq_no"], "_primary_term": 1, "found": True,
+                     "_source": copy.deepcopy(document["_source"])}
+
+    def __bulk(self, default_index, body, params):
+        start = time.perf_counter()
+        lines = iter(line for line in body.split("\n") if line.strip())
+        items = []
+        for line in lines:
+            (op, action), = json.loads(line).items()
+            source = json.loads(next(lines)) if op != "delete" else None
+            index = action.get("_index", default_index)
+            identifier = str(action.get("_id"))
+
+            self.stats["bulk_items"] += 1
+            if self.__reject_next > 0 or (self.reject_rate and self.__random.random() < self.reject_rate):
+                self.__reject_next = max(0, self.__reject_next - 1)
+                self.stats["rejected_items"] += 1
+                items.append({op: {"_index": index, "_id": identifier, "status": 429, "error": {
+                    "type": "es_rejected_execution_exception",
+                    "reason": "rejected execution of coordinating operation"}}})
+                continue
+
+            _, item = self.__write(op, index, identifier, source)
+            items.append({op: item})
+
+        if params.get("refresh") in ("", "true", "wait_for"):
+            for index in set(next(iter(item.values()))["_index"] for item in items):
+                if self.__exists(index):
+                    self.__refresh(index)
+
+        self.stats["bulk_requests"] += 1
+        took = int((time.perf_counter() - start) * 1000)
+        return 200, {"took": took, "errors": any("error" in next(iter(item.values())) for item in items),
+                     "items": items}
+
+    # ----- search -----
+
+    def __resolve(self, expression):
+        names = []
+        for pattern in expression.split(","):
+            # a pattern matches the indices by name and through their aliases
+            matches = sorted(name for name, index in self.indices.items()
+                             if any(fnmatch.fnmatchcase(candidate, pattern) for candidate in [name, *index["aliases"]]))
+            if not matches and "*" not in pattern:
+                return None, pattern
+            names.extend(matches)
+        return names, None
+
+    def __create_pit(self, index):
+        names, missing = self.__resolve(index)
+        if names is None:
+            return self.__missing_index(missing)
+        pit_id = "local-pit-{}".format(next(self.__pit_ids))
+        # a point in time is a copy of the documents as they are now
+        self.__pits[pit_id] = [(name, copy.deepcopy(self.__searchable(name))) for name in names]
+        return 200, {"pit_id": pit_id, "_shards": _SHARDS, "creation_time": int(time.time() * 1000)}
+
+    def __delete_pits(self, body):
+        pits = []
+        for pit_id in body.get("pit_id", []):
+            pits.append({"pit_id": pit_id, "successful": self.__pits.pop(pit_id, None) is not None})
+        return 200, {"pits": pits}
+
+    def __search(self, index, body, params):
+        start = time.perf_counter()
+        if "pit" in body:
+            pit_id = body["pit"]["id"]
+            if pit_id not in self.__pits:
+                return 404, _error("search_context_missing_exception", "No search context found for id [{}]".format(pit_id), 404)
+            sources = self.__pits[pit_id]
+        else:
+            names, missing = self.__resolve(index if index is not None else "*")
+            if names is None:
+                return self.__missing_index(missing)
+            sources = [(name, self.__searchable(name)) for name in names]
+
+        query = body.get("query", {"match_all": {}})
+        hits = [(name, identifier, document) for name, documents in sources
+                for identifier, document in documents.items() if _matches(query, identifier, document["_source"])]
+
+        sort = [_sort_field(field) for field in body.get("sort", [])]
+        if sort:
+            rows = [(_sort_values(sort, hit[1], hit[2], position), hit) for position, hit in enumerate(hits)]
+            rows.sort(key=functools.cmp_to_key(lambda a, b: _compare(sort, a[0], b[0])))
+            if "search_after" in body:
+                rows = [row for row in rows if _compare(sort, row[0], body["search_after"]) > 0]
+        else:
+            rows = [(None, hit) for hit in hits]
+
+        offset = int(body.get("from", params.get("from", 0)))
+        size = int(body.get("size", params.get("size", 10)))
+        response = self.__page(rows[offset:offset + size], len(rows), body, bool(sort), start)
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        if "scroll" in params:
+            # a scroll keeps the rest of the sorted matches as they are now
+            scroll_id = "local-scroll-{}".format(next(self.__scroll_ids))
+            self.__scrolls[scroll_id] = {"rows": copy.deepcopy(rows[offset + size:]), "size": size,
+                                         "body": body, "sorted": bool(sort), "total": len(rows)}
+            response["_scroll_id"] = scroll_id
+        return 200, response
+
+    def __scroll(self, method, body):
+        scroll_ids = body.get("scroll_id", [])
+        if method == "DELETE":
+            scroll_ids = scroll_ids if isinstance(scroll_ids, list) else [scroll_ids]
+            freed = sum(self.__scrolls.pop(scroll_id, None) is not None for scroll_id in scroll_ids)
+            return 200, {"succeeded": True, "num_freed": freed}
+        scroll = self.__scrolls.get(scroll_ids)
+        if scroll is None:
+            return 404, _error("search_context_missing_exception", "No search context found for id [{}]".format(scroll_ids), 404)
+        page, scroll["rows"] = scroll["rows"][:scroll["size"]], scroll["rows"][scroll["size"]:]
+        response = self.__page(page, scroll["total"], scroll["body"], scroll["sorted"], time.perf_counter())
+        response["_scroll_id"] = scroll_ids
+        return 200, response
+
+    def __page(self, rows, total, body, is_sorted, start):
+        hits = []
+        for values, (name, identifier, document) in rows:
+            hit = {"_index": name, "_id": identifier, "_score": None if is_sorted else 1.0}
+            source = _filter_source(document["_source"], body.get("_source", True))
+            if source is not None:
+                hit["_source"] = source
+            if values is not None:
+                hit["sort"] = values
+            hits.append(hit)
+        return {"took": int((time.perf_counter() - start) * 1000), "timed_out": False, "_shards": _SHARDS,
+                "hits": {"total": {"value": total, "relation": "eq"},
+                         "max_score": None if is_sorted else 1.0, "hits": hits}}
+
+    def __repr__(self):
+        return str({name: len(index["documents"]) for name, index in self.indices.items()})
+
+
+_SHARDS = {"total": 1, "successful": 1, "failed": 0}
+
+
+def _error(error_type, reason, status):
+    return {"error": {"type": error_type, "reason": reason}, "status": status}
+
+
+def _flatten_settings(settings, prefix=""):
+    """Flattens nested settings to "index.refresh_interval" style keys with string values."""
+    flat = {}
+    for key, value in settings.items():
+        key = prefix + key
+        if isinstance(value, dict):
+            flat.update(_flatten_settings(value, key + "."))
+        else:
+            if not key.startswith("index."):
+                key = "index." + key
+            flat[key] = None if value is None else str(value).lower() if isinstance(value, bool) else str(value)
+    return flat
+
+
+def _nest_settings(settings):
+    nested = {}
+    for key, value in settings.items():
+        node = nested
+        parts = key.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return nested
+
+
+def _seconds(value):
+    """Returns a time setting, ex: "500ms" or "1s", in seconds, None if it is -1."""
+    value = str(value)
+    if value == "-1":
+        return None
+    for unit, scale in (("ms", 0.001), ("s", 1), ("m", 60), ("h", 3600), ("d", 86400)):
+        if value.endswith(unit) and value[:-len(unit)].replace(".", "", 1).isdigit():
+            return float(value[:-len(unit)]) * scale
+    raise ValueError("failed to parse setting with value [{}] as a time value".format(value))
+
+
+def _merge(source, changes):
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(source.get(key), dict):
+            _merge(source[key], value)
+        else:
+            source[key] = value
+    return source
+
+
+def _field_values(source, field):
+    """Returns the values of a (dotted) field of a document as a list."""
+    value = source
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return []
+        value = value[part]
+    return value if isinstance(value, list) else [value]
+
+
+def _term_value(condition):
+    return condition["value"] if isinstance(condition, dict) else condition
+
+
+def _matches(query, identifier, source):
+    """Returns whether a document matches a query."""
+    (kind, condition), = query.items()
+    if kind == "match_all":
+        return True
+    if kind in ("term", "match"):
+        (field, value), = condition.items()
+        value = value.get("query", value.get("value")) if isinstance(value, dict) else value
+        return value in _field_values(source, field)
+    if kind == "terms":
+        (field, values), = condition.items()
+        return any(value in values for value in _field_values(source, field))
+    if kind == "ids":
+        return identifier in [str(value) for value in condition["values"]]
+    if kind == "exists":
+        return bool(_field_values(source, condition["field"]))
+    if kind == "range":
+        (field, bounds), = condition.items()
+        for value in _field_values(source, field):
+            try:
+                if all((operator != "gt" or value > bound) and (operator != "gte" or value >= bound)
+                       and (operator != "lt" or value < bound) and (operator != "lte" or value <= bound)
+                       for operator, bound in bounds.items() if operator in ("gt", "gte", "lt", "lte")):
+                    return True
+            except TypeError:
+                continue
+        return False
+    if kind == "bool":
+        def clauses(name):
+            clause = condition.get(name, [])
+            return clause if isinstance(clause, list) else [clause]
+        if not all(_matches(clause, identifier, source) for clause in clauses("must") + clauses("filter")):
+            return False
+        if any(_matches(clause, identifier, source) for clause in clauses("must_not")):
+            return False
+        should = clauses("should")
+        minimum = condition.get("minimum_should_match", 0 if clauses("must") or clauses("filter") else 1)
+        return not should or sum(_matches(clause, identifier, source) for clause in should) >= int(minimum)
+    raise ValueError("Query {} isn't supported by the local cluster".format(kind))
+
+
+def _sort_field(field):
+    """Returns (field, descending) for a sort clause."""
+    if isinstance(field, str):
+        return field, False
+    (name, order), = field.items()
+    if isinstance(order, dict):
+        order = order.get("order", "asc")
+    return name, order == "desc"
+
+
+def _sort_values(sort, identifier, document, position):
+    values = []
+    for field, _ in sort:
+        if field == "_id":
+            values.append(identifier)
+        elif field in ("_doc", "_shard_doc"):
+            values.append(position)
+        else:
+            field_values = _field_values(document["_source"], field)
+            values.append(min(field_values) if field_values else None)
+    return values
+
+
+def _compare(sort, a, b):
+    """Compares the sort values of two hits, missing values sort last."""
+    for (_, descending), x, y in zip(sort, a, b):
+        if x == y:
+            continue
+        if x is None:
+            return 1
+        if y is None:
+            return -1
+        result = -1 if x < y else 1
+        return -result if descending else result
+    return 0
+
+
+def _filter_source(source, fields):
+    if fields is True or fields is None:
+        return copy.deepcopy(source)
+    if fields is False:
+        return None
+    if isinstance(fields, str):
+        fields = [fields]
+    includes = fields if isinstance(fields, list) else fields.get("includes", ["*"])
+    excludes = [] if isinstance(fields, list) else fields.get("excludes", [])
+    return {key: copy.deepcopy(value) for key, value in source.items()
+            if any(fnmatch.fnmatchcase(key, pattern) for pattern in includes)
+            and not any(fnmatch.fnmatchcase(key, pattern) for pattern in excludes)}
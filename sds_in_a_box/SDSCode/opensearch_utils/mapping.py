@@ -0,0 +1,134 @@
+class IndexMapping():
+    """
+    Class to represent the explicit mapping of the metadata index, generated
+    from the file type configuration.
+
+    Every field parsed from a filename or read from a file header gets a
+    fixed type instead of the text + keyword pair that dynamic mapping
+    creates: dates map to date, the version to integer and everything else
+    to keyword. Dynamic mapping is disabled, so fields that aren't in the
+    configuration are kept in _source but not indexed.
+
+    ...
+
+    Attributes
+    ----------
+    properties: dict
+        mapping of each field, keyed by field name.
+
+    Methods
+    -------
+    from_filetypes(filetypes):
+        creates the mapping for the fields of a list of file types.
+    get_mappings():
+        returns the mappings section of an index body.
+    get_index_body(settings):
+        returns the body to create an index with the mapping.
+    get_template(index_patterns, settings):
+        returns the body of an index template with the mapping.
+    convert(metadata):
+        returns metadata with its values converted to the mapped types.
+    """
+    DATE_FORMAT = "strict_date_optional_time||basic_date||basic_date_time_no_millis||epoch_millis"
+    KEYWORD = {"type": "keyword"}
+    DATE = {"type": "date", "format": DATE_FORMAT, "ignore_malformed": True}
+    INTEGER = {"type": "integer", "ignore_malformed": True}
+    # fields that aren't keywords, fields named date_* are dates as well
+    FIELD_TYPES = {"date": DATE, "version": INTEGER}
+
+    def __init__(self, fields):
+        self.properties = {field: dict(self.get_field_type(field)) for field in fields}
+
+    @classmethod
+    def from_filetypes(cls, filetypes):
+        """
+        Creates the mapping for the fields of a list of file types, the
+        fields of their patterns and the header keywords they index.
+
+        Parameters
+        ----------
+        filetypes: list
+            list of file type dicts as loaded from config.json.
+
+        Returns
+        -------
+        IndexMapping
+            the mapping of every field.
+        """
+        fields = []
+        for filetype in filetypes:
+            fields.extend(filetype["pattern"])
+            # header keywords are indexed as fields such as date_obs, see FitsHeader.get_fields
+            fields.extend(keyword.lower().replace("-", "_") for keyword in filetype.get("header", []))
+        return cls(dict.fromkeys(fields))
+
+    @classmethod
+    def get_field_type(cls, field):
+        """Returns the mapping of a field from its name."""
+        if field in cls.FIELD_TYPES:
+            return cls.FIELD_TYPES[field]
+        if field.startswith("date_"):
+            return cls.DATE
+        return cls.KEYWORD
+
+    def get_mappings(self):
+        """Returns the mappings section of an index body as a dict."""
+        return {"dynamic": False, "properties": self.properties}
+
+    def get_index_body(self, settings=None):
+        """
+        Returns the body to create an index with the mapping, for use as the
+        body of an Index.
+
+        Parameters
+        ----------
+        settings: dict, optional
+            index settings, ex: {"number_of_shards": 1}.
+        """
+        body = {"mappings": self.get_mappings()}
+        if settings:
+            body["settings"] = settings
+        return body
+
+    def get_template(self, index_patterns, settings=None):
+        """
+        Returns the body of a composable index template that applies the
+        mapping to new indices matching the patterns.
+
+        Parameters
+        ----------
+        index_patterns: list
+            index name patterns, ex: ["metadata-*"].
+        settings: dict, optional
+            index settings, ex: {"number_of_shards": 1}.
+        """
+        return {"index_patterns": index_patterns, "template": self.get_index_body(settings)}
+
+    def convert(self, metadata):
+        """
+        Returns a copy of metadata with the integer fields converted from the
+        strings parsed out of filenames, ex: a version of "v001" becomes 1.
+        Values that can't be converted are left as is, the index keeps them
+        in _source without indexing them.
+
+        Parameters
+        ----------
+        metadata: dict
+            document body.
+
+        Returns
+        -------
+        dict
+            the converted document body.
+        """
+        converted = dict(metadata)
+        for field, value in metadata.items():
+            if isinstance(value, str) and self.properties.get(field, {}).get("type") == "integer":
+                try:
+                    converted[field] = int(value.lstrip("vV"))
+                except ValueError:
+                    pass
+        return converted
+
+    def __repr__(self):
+        return str(self.get_mappings())
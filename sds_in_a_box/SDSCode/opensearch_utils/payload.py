@@ -3,6 +3,107 @@ from sds_in_a_box.SDSCode.opensearch_utils.document import Document
 from opensearchpy import OpenSearch, RequestsHttpConnection
 
 
+class PayloadChunk():
+    """
+    Class to represent one bulk request worth of documents within a Payload.
+
+    ...
+
+    Attributes
+    ----------
+    documents: list
+        list of the Documents in the chunk, in the order they were added.
+    contents: list
+        list of the encoded bulk request bytes of the documents in the chunk.
+    sizes: list
+        list of the sizes of the documents in the chunk in bytes.
+    size: int
+        running total of the size of the chunk contents in bytes.
+
+    Methods
+    -------
+    add_document(document):
+        appends a document to the chunk.
+    get_documents():
+        returns the list of documents in the chunk.
+    get_contents():
+        returns the contents of the chunk as a string.
+    get_encoded():
+        returns the contents of the chunk as bytes.
+    size_in_bytes():
+        returns the size of the chunk contents in bytes.
+    """
+    __slots__ = ("documents", "contents", "sizes", "size")
+
+    def __init__(self):
+        self.documents = []
+        self.contents = []
+        self.sizes = []
+        self.size = 0
+
+    def add_document(self, document):
+        """
+        Appends a document to the chunk.
+
+        Parameters
+        ----------
+        document: Document
+            document to be added to the chunk.
+        """
+        self.documents.append(document)
+        self.contents.append(document.get_encoded())
+        self.sizes.append(len(self.contents[-1]))
+        self.size += self.sizes[-1]
+
+    def get_documents(self):
+        """Returns the list of documents in the chunk."""
+        return self.documents
+
+    def get_contents(self, positions=None):
+        """
+        Returns the contents of the chunk as a string.
+
+        Parameters
+        ----------
+        positions: list, optional
+            positions of the documents to include. All documents if None.
+        """
+        return self.get_encoded(positions).decode("utf-8")
+
+    def get_encoded(self, positions=None):
+        """
+        Returns the contents of the chunk as bytes, ready to be sent as the
+        body of a bulk request.
+
+        Parameters
+        ----------
+        positions: list, optional
+            positions of the documents to include. All documents if None.
+        """
+        if positions is None:
+            return b"".join(self.contents)
+        return b"".join(self.contents[position] for position in positions)
+
+    def size_in_bytes(self, positions=None):
+        """
+        Returns the size of the chunk contents in bytes.
+
+        Parameters
+        ----------
+        positions: list, optional
+            positions of the documents to include. All documents if None.
+        """
+        if positions is None:
+            return self.size
+        return sum(self.sizes[position] for position in positions)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __repr__(self):
+        return self.get_contents()
+
+
 class Payload():
     """
     Class to represent an OpenSearch bulk document payload.
@@ -13,38 +114,58 @@ class Payload():
     Attributes
     ----------
     payload_contents: list
-        list of json strings representing the full payload contents,
-        broken up into a list to avoid request limits when sending to OpenSearch.
+        list of PayloadChunks representing the full payload contents,
+        broken up into chunks to avoid request limits when sending to OpenSearch.
+    max_bytes: int
+        maximum size of a chunk in bytes. A document larger than this is
+        placed in a chunk of its own.
+    max_docs: int, optional
+        maximum number of documents in a chunk. No limit if None.
 
     Methods
     -------
     add_documents(documents):
-        adds document(s) to the payload to prepare for a 
+        adds document(s) to the payload to prepare for a
         bulk upload.
     get_contents():
         returns the full payload contents as a string.
+    get_chunks():
+        returns the list of chunks making up the payload.
+    size_in_bytes():
+        returns the size of the full payload contents in bytes.
     """
-    def __init__(self):
+    # TODO: not sure what the actual request limit is or how it's
+    # determined, but the size of the encoded string seems to be
+    # the most consistent way to check if the limit is hit and that
+    # limit seems to be somewhere around the number of bytes below.
+    # Need to figure out how the request limits work.
+    DEFAULT_MAX_BYTES = 5281500
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_docs=None):
+        self.max_bytes = self.__validate_limit(max_bytes, "max_bytes")
+        self.max_docs = None if max_docs is None else self.__validate_limit(max_docs, "max_docs")
         self.payload_contents = []
+        self.size = 0
+        self.document_count = 0
 
     def add_documents(self, documents):
         """
         Add document(s) to the payload for a bulk upload.
-        
+
         Parameters
         ----------
         documents: Document, list of Documents
             document(s) to be added to the payload in preparation for a bulk upload.
-        """       
+        """
         if Document.is_document(documents):
             self.__add_to_payload(documents)
 
         elif type(documents) is list:
             # check that all the objects in documents are of type Document
-            if all(Document.is_document(doc) for doc in documents): 
+            if all(Document.is_document(doc) for doc in documents):
                 for doc in documents:
                     self.__add_to_payload(doc)
-            
+
             else:
                 raise TypeError("Document list contained at least one object that was not type Document")
 
@@ -53,28 +174,40 @@ class Payload():
 
     def get_contents(self):
         """Returns the contents of the payload as a string."""
-        full_contents = "".join(self.payload_contents)
+        full_contents = "".join(chunk.get_contents() for chunk in self.payload_contents)
         return full_contents
 
+    def get_chunks(self):
+        """Returns the list of PayloadChunks making up the payload."""
+        return self.payload_contents
+
+    def size_in_bytes(self):
+        """Returns the size of the payload contents in bytes."""
+        return self.size
+
+    def __len__(self):
+        return self.document_count
+
     def __repr__(self):
         return str(self.payload_contents)
 
     def __add_to_payload(self, document):
-        # TODO: not sure what the actual request limit is or how it's 
-        # determined, but the size of the encoded string seems to be 
-        # the most consistent way to check if the limit is hit and that 
-        # limit seems to be somewhere around the number of bytes below.
-        # Need to figure out how the request limits work.
-        request_limit = 5281500 #bytes
-
-        # check if the payload is empty and if the payload with the new document added would still be under the request limit
-        if len(self.payload_contents) > 0 and self.__size_in_bytes(self.payload_contents[-1]) + document.size_in_bytes() < request_limit:
-            # concat the new document
-            self.payload_contents[-1] = self.payload_contents[-1] + document.get_contents()
-        else:
-            # start a new payload chunk with the new document
-            self.payload_contents.append(document.get_contents())
+        document_size = document.size_in_bytes()
 
-    def __size_in_bytes(self, payload):
-        """Returns the size of the payload contents in bytes."""
-        return len(payload.encode("ascii"))
+        # start a new payload chunk if the payload is empty or if the new document
+        # would take the last chunk over either of the limits
+        if len(self.payload_contents) == 0 \
+                or self.payload_contents[-1].size_in_bytes() + document_size > self.max_bytes \
+                or (self.max_docs is not None and len(self.payload_contents[-1]) >= self.max_docs):
+            self.payload_contents.append(PayloadChunk())
+
+        self.payload_contents[-1].add_document(document)
+        self.size += document_size
+        self.document_count += 1
+
+    def __validate_limit(self, limit, name):
+        if type(limit) is not int:
+            raise TypeError("{} is type {}, but must be type int".format(name, type(limit)))
+        if limit < 1:
+            raise ValueError("{} is {}, but must be at least 1".format(name, limit))
+        return limit
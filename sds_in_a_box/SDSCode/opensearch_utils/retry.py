@@ -0,0 +1,239 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy():
+    """
+    Class to represent how bulk items rejected by an overloaded cluster are
+    retried. Only the rejected items are resent, after a jittered
+    exponential backoff, and the total number of retries made while sending
+    a payload is capped by a retry budget so a saturated cluster isn't
+    flooded with resends.
+
+    ...
+
+    Attributes
+    ----------
+    max_retries: int
+        maximum number of times the items of a chunk are retried.
+    initial_backoff: float
+        backoff cap in seconds for the first retry, doubled on each retry.
+    max_backoff: float
+        largest backoff cap in seconds.
+    retry_budget: int, optional
+        maximum number of retry requests made while sending one payload.
+        No limit if None.
+    retryable_statuses: tuple
+        item and request HTTP statuses that are retried.
+    sleep: callable
+        function used to wait out the backoff.
+
+    Methods
+    -------
+    is_retryable(status):
+        returns whether an HTTP status should be retried.
+    backoff(attempt):
+        returns the jittered backoff in seconds before a retry.
+    wait(attempt):
+        sleeps for the jittered backoff before a retry.
+    new_budget():
+        returns a RetryBudget for sending one payload.
+    """
+    def __init__(self, max_retries=5, initial_backoff=0.1, max_backoff=10, retry_budget=None,
+                 retryable_statuses=(429, 503), sleep=time.sleep):
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget
+        self.retryable_statuses = tuple(retryable_statuses)
+        self.sleep = sleep
+
+    def is_retryable(self, status):
+        """
+        Returns a boolean indicating whether an HTTP status should be retried.
+
+        Parameters
+        ----------
+        status: int
+            HTTP status of a bulk item or request.
+        """
+        return status in self.retryable_statuses
+
+    def backoff(self, attempt):
+        """
+        Returns the backoff in seconds before a retry, drawn uniformly
+        between zero and the exponential cap for the attempt ("full jitter").
+
+        Parameters
+        ----------
+        attempt: int
+            number of retries already made, starting at 0.
+        """
+        cap = min(self.max_backoff, self.initial_backoff * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def wait(self, attempt):
+        """Sleeps for the jittered backoff before a retry."""
+        self.sleep(self.backoff(attempt))
+
+    def new_budget(self):
+        """Returns a RetryBudget for sending one payload."""
+        return RetryBudget(self.retry_budget)
+
+    def __repr__(self):
+        return str({"max_retries": self.max_retries, "initial_backoff": self.initial_backoff,
+                    "max_backoff": self.max_backoff, "retry_budget": self.retry_budget,
+                    "retryable_statuses": self.retryable_statuses})
+
+
+class RetryBudget():
+    """
+    Class to represent the retries left while sending one payload. It is
+    shared by the chunks of the payload and safe to use from several threads.
+
+    ...
+
+    Attributes
+    ----------
+    remaining: int, optional
+        number of retries left. No limit if None.
+
+    Methods
+    -------
+    try_acquire():
+        takes one retry from the budget if any are left.
+    """
+    def __init__(self, remaining=None):
+        self.remaining = remaining
+        self.__lock = threading.Lock()
+
+    def try_acquire(self):
+        """Returns a boolean indicating whether a retry was taken from the budget."""
+        if self.remaining is None:
+            return True
+        with self.__lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def __repr__(self):
+        return str({"remaining": self.remaining})
+
+
+class ChunkRetry():
+    """
+    Class to represent one payload chunk being sent as bulk requests, where
+    only the items rejected with a retryable status are resent until they
+    are accepted or the retries run out. Client and AsyncClient share it and
+    only differ in how they make the requests and wait out the backoff.
+
+    ...
+
+    Attributes
+    ----------
+    chunk: PayloadChunk
+        chunk being sent.
+    policy: RetryPolicy
+        how the rejected items are retried.
+    budget: RetryBudget
+        retries left for the payload the chunk belongs to.
+    retries: int
+        number of retries made so far.
+
+    Methods
+    -------
+    get_request():
+        returns the body and size of the next bulk request.
+    add_response(response):
+        records the items of a bulk response, returns whether to retry.
+    add_error(error):
+        records a failed bulk request, returns whether to retry.
+    next_backoff():
+        returns the seconds to wait before the retry.
+    get_response():
+        returns the bulk response with the final item of every document.
+    """
+    def __init__(self, chunk, policy, budget):
+        self.chunk = chunk
+        self.policy = policy
+        self.budget = budget
+        self.retries = 0
+        self.__items = [None] * len(chunk)
+        # positions of the items to resend, every item if None
+        self.__pending = None
+        self.__took = 0
+        self.__bytes_sent = 0
+
+    def get_request(self):
+        """Returns the body and the size in bytes of the next bulk request, with the pending items."""
+        size = self.chunk.size_in_bytes(self.__pending)
+        self.__bytes_sent += size
+        return self.chunk.get_encoded(self.__pending), size
+
+    def add_response(self, response):
+        """
+        Records the items of a bulk response and returns a boolean
+        indicating whether the rejected ones are retried.
+
+        Parameters
+        ----------
+        response: dict
+            response of the last request returned by get_request.
+        """
+        self.__took += response.get("took", 0)
+        positions = range(len(self.chunk)) if self.__pending is None else self.__pending
+        rejected = []
+        for position, item in zip(positions, response["items"]):
+            self.__items[position] = item
+            if self.policy.is_retryable(next(iter(item.values())).get("status")):
+                rejected.append(position)
+        if not rejected or not self.__can_retry():
+            return False
+        self.__pending = rejected
+        return True
+
+    def add_error(self, error):
+        """
+        Records a bulk request that failed as a whole and returns a boolean
+        indicating whether its items are resent. If not, the caller raises
+        the error.
+
+        Parameters
+        ----------
+        error: TransportError
+            error raised by the last request returned by get_request.
+        """
+        return self.policy.is_retryable(error.status_code) and self.__can_retry()
+
+    def next_backoff(self):
+        """Returns the jittered seconds to wait before the retry and counts it."""
+        logger.info("Retrying {} rejected bulk items".format(
+            len(self.chunk) if self.__pending is None else len(self.__pending)))
+        seconds = self.policy.backoff(self.retries)
+        self.retries += 1
+        return seconds
+
+    def get_response(self):
+        """
+        Returns the bulk response with the final item of every document in
+        chunk order, the took of every request, the number of retries and
+        the bytes sent including the retries.
+        """
+        return {
+            "took": self.__took,
+            "errors": any("error" in next(iter(item.values())) for item in self.__items),
+            "items": self.__items,
+            "retries": self.retries,
+            "bytes_sent": self.__bytes_sent,
+        }
+
+    def __can_retry(self):
+        return self.retries < self.policy.max_retries and self.budget.try_acquire()
+
+    def __repr__(self):
+        return str({"documents": len(self.chunk), "retries": self.retries, "bytes_sent": self.__bytes_sent})
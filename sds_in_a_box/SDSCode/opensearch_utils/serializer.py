@@ -0,0 +1,109 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonSerializer():
+    """
+    Class to serialize document bodies to bytes with the standard library
+    json module. This is always available and is the default.
+
+    ...
+
+    Methods
+    -------
+    dumps(obj):
+        returns obj serialized as utf-8 encoded JSON bytes.
+    """
+    name = "json"
+
+    def dumps(self, obj):
+        """Returns obj serialized as utf-8 encoded JSON bytes."""
+        return json.dumps(obj).encode("utf-8")
+
+    def __repr__(self):
+        return self.name
+
+
+class OrjsonSerializer():
+    """
+    Class to serialize document bodies to bytes with orjson, which encodes
+    straight to bytes and is several times faster than json. The output is
+    compact, without spaces after separators. Requires orjson.
+
+    ...
+
+    Methods
+    -------
+    dumps(obj):
+        returns obj serialized as utf-8 encoded JSON bytes.
+    """
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("The orjson serializer requires orjson, install it with: pip install orjson")
+
+    def dumps(self, obj):
+        """Returns obj serialized as utf-8 encoded JSON bytes."""
+        return orjson.dumps(obj)
+
+    def __repr__(self):
+        return self.name
+
+
+SERIALIZERS = {
+    JsonSerializer.name: JsonSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+}
+
+_default = {"serializer": None}
+
+
+def get_serializer(name=None):
+    """
+    Returns a serializer backend.
+
+    Parameters
+    ----------
+    name: str, optional
+        name of the backend, one of SERIALIZERS. Returns the default
+        serializer if None.
+
+    Returns
+    -------
+    JsonSerializer, OrjsonSerializer
+        the serializer backend.
+    """
+    if name is None:
+        if _default["serializer"] is None:
+            _default["serializer"] = get_serializer(os.environ.get("OS_JSON_SERIALIZER", JsonSerializer.name))
+        return _default["serializer"]
+
+    if name not in SERIALIZERS:
+        raise ValueError("Serializer is {}, but must be one of {}".format(name, list(SERIALIZERS)))
+    return SERIALIZERS[name]()
+
+
+def set_default_serializer(name):
+    """
+    Sets the serializer backend used by Documents that aren't given one.
+    The default is read from the OS_JSON_SERIALIZER environment variable,
+    falling back to json.
+
+    Parameters
+    ----------
+    name: str
+        name of the backend, one of SERIALIZERS.
+    """
+    _default["serializer"] = get_serializer(name)
+
+
+def available_serializers():
+    """Returns the names of the serializer backends that are installed."""
+    return [name for name, serializer in SERIALIZERS.items()
+            if serializer is not OrjsonSerializer or orjson is not None]
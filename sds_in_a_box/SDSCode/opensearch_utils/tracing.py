@@ -0,0 +1,134 @@
+import threading
+
+
+class RequestTrace():
+    """
+    Class to represent one request made by a Client to the OpenSearch
+    cluster, as seen by the request hooks. The same trace is passed to
+    before() and after(), so a hook can keep its own state for the request,
+    ex: a tracing span, in context.
+
+    ...
+
+    Attributes
+    ----------
+    operation: str
+        name of the opensearch-py call, ex: "bulk", "get" or "indices.create".
+    index: str
+        name of the index the request is made to, None for calls that
+        aren't made to an index.
+    bytes: int
+        size of the request body in bytes, 0 for requests without a body.
+    status: int
+        HTTP status of the response, None until the request has returned.
+        For successful calls opensearch-py only returns the response body,
+        so it is 201 for a created document, 404 for a HEAD request of a
+        missing resource and 200 otherwise. It is None when the cluster
+        couldn't be reached.
+    took: int
+        milliseconds the cluster reports it spent on the request, None if
+        the response doesn't include it.
+    seconds: float
+        client wall clock time of the request, None until it has returned.
+    error: Exception
+        exception raised by the request, None if it succeeded.
+    context: dict
+        state kept by the hooks for the request.
+    """
+    __slots__ = ("operation", "index", "bytes", "status", "took", "seconds", "error", "context")
+
+    def __init__(self, operation, index=None, size=0):
+        self.operation = operation
+        self.index = index
+        self.bytes = size
+        self.status = None
+        self.took = None
+        self.seconds = None
+        self.error = None
+        self.context = {}
+
+    def __repr__(self):
+        return "RequestTrace(operation={}, index={}, bytes={}, status={}, took={}, seconds={})".format(
+            self.operation, self.index, self.bytes, self.status, self.took, self.seconds)
+
+
+class RequestHooks():
+    """
+    Class to represent callbacks fired around every request a Client makes
+    to the OpenSearch cluster. Subclass it and override before and/or after
+    to record histograms or tracing spans. Reads served from the Client's
+    cache make no request and fire no hooks.
+
+    Hooks of a Client sending a payload with several workers are called
+    from the worker threads, so they must be thread safe. An exception
+    raised by a hook is logged and doesn't fail the request.
+
+    ...
+
+    Methods
+    -------
+    before(trace):
+        called before the request is sent.
+    after(trace):
+        called once the request has returned or raised.
+    """
+    def before(self, trace):
+        """
+        Called before the request is sent.
+
+        Parameters
+        ----------
+        trace: RequestTrace
+            the request, without its status, took and seconds.
+        """
+
+    def after(self, trace):
+        """
+        Called once the request has returned or raised.
+
+        Parameters
+        ----------
+        trace: RequestTrace
+            the request, with its status, took, seconds and error.
+        """
+
+
+class OperationStats(RequestHooks):
+    """
+    Class to represent request hooks that add up the requests of each
+    operation, to find the operations that dominate the latency.
+
+    ...
+
+    Methods
+    -------
+    get_stats():
+        returns the totals of each operation.
+    """
+    def __init__(self):
+        self.__stats = {}
+        self.__lock = threading.Lock()
+
+    def after(self, trace):
+        with self.__lock:
+            stats = self.__stats.setdefault(trace.operation, {
+                "requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0, "max_seconds": 0.0, "took_ms": 0})
+            stats["requests"] += 1
+            stats["errors"] += trace.error is not None
+            stats["bytes"] += trace.bytes
+            stats["seconds"] += trace.seconds
+            stats["max_seconds"] = max(stats["max_seconds"], trace.seconds)
+            stats["took_ms"] += trace.took or 0
+
+    def get_stats(self):
+        """
+        Returns the number of requests and errors, the bytes sent, the total
+        and largest wall clock seconds and the total took of each operation
+        as a dict, slowest operation in total first.
+        """
+        with self.__lock:
+            ordered = sorted(self.__stats.items(), key=lambda item: item[1]["seconds"], reverse=True)
+            return {operation: dict(stats) for operation, stats in ordered}
+
+    def __repr__(self):
+        return str(self.get_stats())
@@ -0,0 +1,191 @@
+import cProfile
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import time
+import tracemalloc
+import urllib.parse
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class InvocationProfiler():
+    """
+    Class to profile a sample of the invocations of a Lambda handler with
+    cProfile and tracemalloc, since a profiler can't be attached to a
+    running Lambda. Both slow the invocation down noticeably, so only a
+    fraction of the invocations is profiled, and none by default.
+
+    For every profiled invocation a report of the top functions by
+    cumulative time and the top allocation sites by size is written as
+    JSON to the log, to a local directory, or to an S3 prefix. The
+    directory and S3 outputs also get the raw cProfile stats, which can be
+    loaded with pstats or a viewer such as snakeviz.
+
+    ...
+
+    Attributes
+    ----------
+    sample_rate: float
+        fraction of the invocations profiled, between 0 and 1.
+    top: int
+        number of functions and allocation sites in the report.
+    output: str, optional
+        where the reports are written, a local directory or an
+        "s3://bucket/prefix" url. They are logged if None.
+    s3: boto3 S3 client, optional
+        client used to upload the reports to an S3 output.
+    random: callable
+        function returning a random float in [0, 1), to sample invocations.
+
+    Methods
+    -------
+    from_env(s3=None):
+        returns a profiler configured from the PROFILE_* environment variables.
+    profile(name=None):
+        context manager profiling its block if the invocation is sampled.
+    """
+    def __init__(self, sample_rate=0.0, top=25, output=None, s3=None, random=random.random):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate is {}, but must be between 0 and 1".format(sample_rate))
+        self.sample_rate = sample_rate
+        self.top = top
+        self.output = output or None
+        self.s3 = s3
+        self.random = random
+
+    @classmethod
+    def from_env(cls, s3=None):
+        """
+        Returns a profiler configured from the environment:
+        PROFILE_SAMPLE_RATE (default 0, profiling off), PROFILE_TOP_N
+        (default 25) and PROFILE_OUTPUT (default unset, the reports are
+        logged). An invalid configuration is logged and turns profiling
+        off, so it can't fail the cold start.
+
+        Parameters
+        ----------
+        s3: boto3 S3 client, optional
+            client used to upload the reports when PROFILE_OUTPUT is an s3:// url.
+        """
+        try:
+            return cls(sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+                       top=int(os.environ.get("PROFILE_TOP_N", 25)),
+                       output=os.environ.get("PROFILE_OUTPUT"), s3=s3)
+        except ValueError:
+            logger.warning("Invalid profiling configuration, profiling is off", exc_info=True)
+            return cls(s3=s3)
+
+    @contextmanager
+    def profile(self, name=None):
+        """
+        Profiles the block if the invocation is sampled and writes its
+        report. Failing to profile or to write the report is logged and
+        never fails the invocation.
+
+        Parameters
+        ----------
+        name: str, optional
+            name of the invocation in the report and the output file
+            names, ex: the Lambda request id. The current time if None.
+        """
+        if not self.sample_rate or self.random() >= self.sample_rate:
+            yield
+            return
+
+        name = name or time.strftime("%Y%m%dT%H%M%S")
+        profiler = cProfile.Profile()
+        # a caller may already be tracing allocations, in which case it is left running
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        try:
+            profiler.enable()
+        except ValueError:
+            # only one profiler can be active at a time
+            logger.warning("Another profiler is active, {} isn't profiled".format(name))
+            if started_tracing:
+                tracemalloc.stop()
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            seconds = time.perf_counter() - start
+            try:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+            try:
+                self.__write(name, self.__get_report(name, seconds, profiler, snapshot, peak), profiler)
+            except Exception:
+                logger.exception("Failed to write the profile of {}".format(name))
+
+    def __get_report(self, name, seconds, profiler, snapshot, peak):
+        stats = pstats.Stats(profiler).stats
+        functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        allocations = snapshot.statistics("lineno")[:self.top]
+
+        return {
+            "type": "profile",
+            "invocation": name,
+            "seconds": seconds,
+            "peak_memory_bytes": peak,
+            "functions": [{
+                "function": function,
+                "file": filename,
+                "line": line,
+                "calls": calls,
+                "total_seconds": total,
+                "cumulative_seconds": cumulative,
+            } for (filename, line, function), (_, calls, total, cumulative, _) in functions],
+            "allocations": [{
+                "file": allocation.traceback[0].filename,
+                "line": allocation.traceback[0].lineno,
+                "size_bytes": allocation.size,
+                "count": allocation.count,
+            } for allocation in allocations],
+        }
+
+    def __write(self, name, report, profiler):
+        if self.output is None:
+            logger.info("Profile: " + json.dumps(report))
+            return
+
+        # the raw stats, as written by Profile.dump_stats
+        profiler.create_stats()
+        raw = marshal.dumps(profiler.stats)
+        contents = {name + ".json": json.dumps(report, indent=2).encode("utf-8"), name + ".prof": raw}
+
+        if self.output.startswith("s3://"):
+            url = urllib.parse.urlparse(self.output)
+            prefix = url.path.strip("/")
+            for filename, body in contents.items():
+                key = prefix + "/" + filename if prefix else filename
+                self.s3.put_object(Bucket=url.netloc, Key=key, Body=body)
+        else:
+            os.makedirs(self.output, exist_ok=True)
+            for filename, body in contents.items():
+                with open(os.path.join(self.output, filename), "wb") as f:
+                    f.write(body)
+        logger.info("Wrote the profile of {} to {}".format(name, self.output))
+
+    def __repr__(self):
+        return "InvocationProfiler(sample_rate={}, top={}, output={})".format(
+            self.sample_rate, self.top, self.output)
@@ -1,9 +1,9 @@
 import os
 from aws_cdk import (
-    # Duration,
+    Duration,
     Stack,
     RemovalPolicy,
-    # aws_sqs as sqs,
+    aws_sqs as sqs,
 )
 from constructs import Construct
 import aws_cdk as cdk
@@ -13,11 +13,15 @@ import aws_cdk.aws_iam as iam
 import aws_cdk.aws_opensearchservice as opensearch
 import aws_cdk.aws_ec2 as ec2
 import aws_cdk.aws_secretsmanager as secretsmanager
-from aws_cdk.aws_lambda_event_sources import S3EventSource, SnsEventSource
+import aws_cdk.aws_s3_notifications as s3n
+from aws_cdk.aws_lambda_event_sources import SnsEventSource, SqsEventSource
 
 class SdsInABoxStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str,
+                 indexer_batch_size: int = 500,
+                 indexer_batching_window: Duration = Duration.seconds(30),
+                 **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # This is the S3 bucket where the data will be stored
@@ -97,8 +101,31 @@ class SdsInABoxStack(Stack):
                                             }
                                           )
 
-        indexer_lambda.add_event_source(S3EventSource(data_bucket,
-                                                      events=[s3.EventType.OBJECT_CREATED]
-                                                      )
+        # Rather than invoking the indexer once per upload, new object notifications
+        # are buffered in a queue and handed to the indexer in batches, so a burst of
+        # uploads is indexed with a handful of bulk requests.
+        # The visibility timeout should be at least 6x the lambda timeout:
+        # https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html#events-sqs-queueconfig
+        indexer_dead_letter_queue = sqs.Queue(self, "IndexerDeadLetterQueue",
+                                              retention_period=Duration.days(14),
+                                              removal_policy=RemovalPolicy.DESTROY
+                                              )
+        indexer_queue = sqs.Queue(self, "IndexerQueue",
+                                  visibility_timeout=Duration.minutes(90),
+                                  dead_letter_queue=sqs.DeadLetterQueue(max_receive_count=5,
+                                                                        queue=indexer_dead_letter_queue),
+                                  removal_policy=RemovalPolicy.DESTROY
+                                  )
+
+        data_bucket.add_event_notification(s3.EventType.OBJECT_CREATED,
+                                           s3n.SqsDestination(indexer_queue)
+                                           )
+
+        indexer_lambda.add_event_source(SqsEventSource(indexer_queue,
+                                                       batch_size=indexer_batch_size,
+                                                       max_batching_window=indexer_batching_window,
+                                                       # only the records that failed are retried
+                                                       report_batch_item_failures=True
+                                                       )
                                         )
         indexer_lambda.apply_removal_policy(cdk.RemovalPolicy.DESTROY)
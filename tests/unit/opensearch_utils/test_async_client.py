@@ -0,0 +1,190 @@
+import asyncio
+import unittest
+
+import boto3
+from botocore.exceptions import ClientError
+import pytest
+
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+from sds_in_a_box.SDSCode.opensearch_utils.async_client import AsyncClient
+from sds_in_a_box.SDSCode.opensearch_utils.local_cluster import LocalCluster
+from sds_in_a_box.SDSCode.opensearch_utils.retry import RetryPolicy
+
+
+@pytest.mark.network
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    """tests for async_client.py"""
+
+    async def asyncSetUp(self):
+        #Opensearch client Params
+        host = 'search-sds-metadata-uum2vnbdbqbnh7qnbde6t74xim.us-west-2.es.amazonaws.com'
+        port = 443
+        hosts = [{"host":host, "port":port}]
+
+        secret_name = "OpenSearchPassword9643DC3D-uVH94BjrbF9u"
+        region_name = "us-west-2"
+
+        # Create a Secrets Manager client
+        session = boto3.session.Session()
+        client = session.client(
+            service_name='secretsmanager',
+            region_name=region_name
+        )
+        try:
+            get_secret_value_response = client.get_secret_value(
+                SecretId=secret_name
+            )
+        except ClientError as e:
+            raise e
+
+        secret = get_secret_value_response['SecretString']
+
+        auth = ("master-user", secret)
+        self.client = AsyncClient(hosts=hosts, http_auth=auth, use_ssl=True, verify_certs=True)
+        self.index = Index("test_data")
+        await self.client.create_index(self.index)
+
+    async def test_send_document_create(self):
+        """
+        test that the send_document method correctly creates the specified document in OpenSearch.
+        """
+        ## Arrange ##
+        document = Document(self.index, 1, Action.CREATE, {'test body': 10})
+
+        ## Act ##
+        await self.client.send_document(document)
+        document_out = await self.client.get_document(document)
+
+        ## Assert ##
+        assert document_out["_source"] == {'test body': 10}
+
+    async def test_send_payload(self):
+        """
+        test that the send_payload method sends every chunk of the payload concurrently.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.INDEX, {'test body': i}) for i in range(6)]
+        payload = Payload(max_docs=2)
+        payload.add_documents(documents)
+
+        ## Act ##
+        result = await self.client.send_payload(payload, max_concurrency=3)
+        exists_out = await asyncio.gather(*(self.client.document_exists(document) for document in documents))
+
+        ## Assert ##
+        assert not result.has_errors()
+        assert all(exists_out)
+
+    async def test_search(self):
+        """
+        test that the search method returns the documents matching a query.
+        """
+        ## Arrange ##
+        document = Document(self.index, 1, Action.INDEX, {'level': 'l0'})
+        await self.client.send_document(document)
+        await self.client.client.indices.refresh(index=self.index.get_name())
+
+        ## Act ##
+        response = await self.client.search(self.index, {"term": {"level": "l0"}})
+
+        ## Assert ##
+        assert [hit["_id"] for hit in response["hits"]["hits"]] == ["1"]
+
+    async def asyncTearDown(self):
+        await self.client.delete_index(self.index)
+        await self.client.close()
+
+class TestAsyncClientLocal(unittest.IsolatedAsyncioTestCase):
+    """tests for async_client.py against a LocalCluster"""
+
+    async def asyncSetUp(self):
+        self.cluster = LocalCluster()
+        self.client = AsyncClient(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                                  connection_class=self.cluster.async_connection_class,
+                                  retry_policy=RetryPolicy(initial_backoff=0))
+        self.index = Index("test_data")
+        await self.client.create_index(self.index)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_send_document_size(self):
+        """
+        test that the send_document method records the size of the request body sent, and none for a delete.
+        """
+        ## Arrange ##
+        document = Document(self.index, 1, Action.CREATE, {'test body': 10})
+
+        ## Act ##
+        created = await self.client.send_document(document)
+        updated = await self.client.send_document(document, Action.UPDATE)
+        deleted = await self.client.send_document(document, Action.DELETE)
+
+        ## Assert ##
+        assert created.get_counts()["created"] == 1
+        assert created.size_in_bytes() == len(document.serializer.dumps({'test body': 10}))
+        assert updated.size_in_bytes() == len(document.serializer.dumps({'doc': {'test body': 10}}))
+        assert deleted.size_in_bytes() == 0
+        assert "1" not in self.cluster.indices["test_data"]["documents"]
+
+    async def test_send_payload(self):
+        """
+        test that the send_payload method sends every chunk of the payload concurrently.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.INDEX, {'test body': i}) for i in range(6)]
+        payload = Payload(max_docs=2)
+        payload.add_documents(documents)
+
+        ## Act ##
+        result = await self.client.send_payload(payload, max_concurrency=3)
+        exists_out = await asyncio.gather(*(self.client.document_exists(document) for document in documents))
+
+        ## Assert ##
+        assert not result.has_errors()
+        assert all(exists_out)
+        assert self.cluster.get_stats()["bulk_requests"] == 3
+
+    async def test_send_payload_retry(self):
+        """
+        test that items rejected with a 429 are resent on their own until they are accepted.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.CREATE, {'test body': i}) for i in range(6)]
+        payload = Payload(max_docs=3)
+        payload.add_documents(documents)
+        self.cluster.reject_items(2)
+
+        ## Act ##
+        result = await self.client.send_payload(payload, max_concurrency=2)
+
+        ## Assert ##
+        assert not result.has_errors()
+        assert result.get_counts()["created"] == 6
+        assert sum(chunk["retries"] for chunk in result.get_chunks()) >= 1
+        assert self.cluster.get_stats()["bulk_items"] == 8
+        assert len(self.cluster.indices["test_data"]["documents"]) == 6
+
+    async def test_send_payload_retries_exhausted(self):
+        """
+        test that items still rejected when the retries run out are reported as failed.
+        """
+        ## Arrange ##
+        self.client.retry_policy = RetryPolicy(max_retries=1, initial_backoff=0)
+        payload = Payload()
+        payload.add_documents([Document(self.index, i, Action.CREATE, {'test body': i}) for i in range(2)])
+        self.cluster.reject_items(3)
+
+        ## Act ##
+        result = await self.client.send_payload(payload)
+
+        ## Assert ##
+        assert result.get_failed_identifiers() == ["0"]
+        assert result.get_chunks()[0]["retries"] == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
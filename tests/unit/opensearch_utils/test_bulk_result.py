@@ -0,0 +1,105 @@
+import unittest
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.bulk_result import BulkResult
+
+
+class TestBulkResult(unittest.TestCase):
+    """tests for bulk_result.py"""
+
+    def setUp(self):
+        self.index = Index("test_data")
+        self.payload = Payload(max_docs=2)
+        self.payload.add_documents([Document(self.index, i, Action.INDEX, {"testbody": "test"}) for i in range(3)])
+        self.response_ok = {"took": 5, "errors": False, "items": [
+            {"index": {"_index": "test_data", "_id": "0", "status": 201, "result": "created"}},
+            {"index": {"_index": "test_data", "_id": "1", "status": 200, "result": "updated"}}]}
+        self.response_error = {"took": 3, "errors": True, "items": [
+            {"index": {"_index": "test_data", "_id": "2", "status": 409,
+                        "error": {"type": "version_conflict_engine_exception", "reason": "[2]: version conflict"}}}]}
+
+    def test_add_chunk(self):
+        """
+        test that the add_chunk method records the size, timing and outcomes of a chunk.
+        """
+        ## Arrange ##
+        result = BulkResult()
+        chunk = self.payload.get_chunks()[0]
+        chunk_true = {"documents": 2, "bytes": chunk.size_in_bytes(), "took": 5, "seconds": 0.5, "errors": 0, "retries": 0}
+
+        ## Act ##
+        result.add_chunk(chunk, self.response_ok, 0.5)
+
+        ## Assert ##
+        assert result.get_chunks() == [chunk_true]
+        assert result.get_counts() == {"created": 1, "updated": 1, "deleted": 0, "conflicted": 0, "failed": 0}
+        assert not result.has_errors()
+
+    def test_add_chunk_errors(self):
+        """
+        test that conflicted and failed items are counted separately and their reasons
+        are keyed by document identifier.
+        """
+        ## Arrange ##
+        result = BulkResult()
+        chunk = self.payload.get_chunks()[0]
+        response = {"took": 5, "errors": True, "items": [
+            {"index": {"_id": "0", "status": 409, "error": {"type": "version_conflict_engine_exception"}}},
+            {"index": {"_id": "1", "status": 400, "error": {"type": "mapper_parsing_exception", "reason": "failed to parse"}}}]}
+
+        ## Act ##
+        result.add_chunk(chunk, response, 0.5)
+
+        ## Assert ##
+        assert result.get_counts()["conflicted"] == 1
+        assert result.get_counts()["failed"] == 1
+        assert result.get_errors() == {"0": "version_conflict_engine_exception", "1": "failed to parse"}
+        assert result.get_failed_identifiers() == ["1"]
+        assert result.get_chunks()[0]["errors"] == 2
+
+    def test_add_document(self):
+        """
+        test that the add_document and add_conflict methods record single document requests.
+        """
+        ## Arrange ##
+        result = BulkResult()
+        document1, document2 = self.payload.get_chunks()[0].get_documents()
+
+        ## Act ##
+        result.add_document(document1, {"_id": "0", "result": "created"}, 0.1, 20)
+        result.add_conflict(document2, "version_conflict_engine_exception", 0.2, 30)
+        result.add_document(document1, {"_id": "0", "result": "deleted"}, 0.1)
+
+        ## Assert ##
+        assert result.get_counts()["created"] == 1
+        assert result.get_counts()["conflicted"] == 1
+        assert result.get_errors() == {"1": "version_conflict_engine_exception"}
+        assert result.document_count() == 3
+        assert result.size_in_bytes() == 50
+        assert result.get_chunks()[2]["bytes"] == 0
+
+    def test_totals(self):
+        """
+        test that the totals are summed across chunks.
+        """
+        ## Arrange ##
+        result = BulkResult()
+        chunks = self.payload.get_chunks()
+
+        ## Act ##
+        result.add_chunk(chunks[0], self.response_ok, 0.5)
+        result.add_chunk(chunks[1], self.response_error, 0.25)
+
+        ## Assert ##
+        assert result.has_errors()
+        assert result.document_count() == 3
+        assert result.size_in_bytes() == self.payload.size_in_bytes()
+        assert result.took() == 8
+        assert result.wall_time() == 0.75
+        assert result.get_errors() == {"2": "[2]: version conflict"}
+
+
+if __name__ == '__main__':
+    unittest.main()
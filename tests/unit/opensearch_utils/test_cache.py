@@ -0,0 +1,190 @@
+import unittest
+
+from sds_in_a_box.SDSCode.opensearch_utils.cache import QueryCache
+
+
+class Clock():
+    """Stands in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryCache(unittest.TestCase):
+    """tests for cache.py"""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = QueryCache(max_entries=3, ttl=60, clock=self.clock)
+        self.fetches = []
+
+    def fetch(self, value):
+        def fetch():
+            self.fetches.append(value)
+            return value
+        return fetch
+
+    def test_get_document(self):
+        """
+        test that a document read is fetched once and served from the cache afterwards.
+        """
+        ## Act ##
+        first_out = self.cache.get_document("get", "test_data", 1, self.fetch({"found": True}))
+        second_out = self.cache.get_document("get", "test_data", "1", self.fetch({"found": False}))
+
+        ## Assert ##
+        assert first_out == second_out == {"found": True}
+        assert self.fetches == [{"found": True}]
+        assert self.cache.get_stats()["hit_rate"] == 0.5
+
+    def test_get_search_normalized(self):
+        """
+        test that searches are keyed by the query regardless of the order of its keys.
+        """
+        ## Act ##
+        self.cache.get_search("test_data", {"query": {"term": {"level": "l0"}}, "size": 10}, self.fetch(1))
+        search_out = self.cache.get_search("test_data", {"size": 10, "query": {"term": {"level": "l0"}}}, self.fetch(2))
+
+        ## Assert ##
+        assert search_out == 1
+        assert self.cache.get_stats()["hits"] == 1
+
+    def test_ttl(self):
+        """
+        test that an entry older than the ttl is fetched again.
+        """
+        ## Arrange ##
+        self.cache.get_document("exists", "test_data", 1, self.fetch(False))
+        self.clock.now = 61
+
+        ## Act ##
+        exists_out = self.cache.get_document("exists", "test_data", 1, self.fetch(True))
+
+        ## Assert ##
+        assert exists_out is True
+        assert self.cache.get_stats()["misses"] == 2
+
+    def test_lru(self):
+        """
+        test that the least recently used entry is evicted when the cache is full.
+        """
+        ## Arrange ##
+        for identifier in range(3):
+            self.cache.get_document("get", "test_data", identifier, self.fetch(identifier))
+        self.cache.get_document("get", "test_data", 0, self.fetch(0))
+
+        ## Act ##
+        self.cache.get_document("get", "test_data", 3, self.fetch(3))
+        self.cache.get_document("get", "test_data", 0, self.fetch(0))
+        self.cache.get_document("get", "test_data", 1, self.fetch(1))
+
+        ## Assert ##
+        assert self.fetches == [0, 1, 2, 3, 1]
+        assert self.cache.get_stats()["evictions"] == 2
+
+    def test_invalidate_documents(self):
+        """
+        test that a write drops the reads of its documents and the searches of its index only.
+        """
+        ## Arrange ##
+        self.cache.get_document("exists", "test_data", 1, self.fetch(False))
+        self.cache.get_document("exists", "test_data", 2, self.fetch(False))
+        self.cache.get_search("test_data", {"size": 10}, self.fetch([]))
+
+        ## Act ##
+        self.cache.invalidate_documents("test_data", [1])
+
+        ## Assert ##
+        assert self.cache.get_document("exists", "test_data", 1, self.fetch(True)) is True
+        assert self.cache.get_document("exists", "test_data", 2, self.fetch(True)) is False
+        assert self.cache.get_search("test_data", {"size": 10}, self.fetch([1])) == [1]
+        assert self.cache.get_stats()["invalidations"] == 2
+
+    def test_invalidate_during_fetch(self):
+        """
+        test that a read that raced a write isn't cached.
+        """
+        ## Arrange ##
+        def fetch():
+            self.cache.invalidate_documents("test_data", [1])
+            return False
+
+        ## Act ##
+        self.cache.get_document("exists", "test_data", 1, fetch)
+
+        ## Assert ##
+        assert self.cache.get_stats()["entries"] == 0
+
+
+    def test_search_not_cached_before_refresh(self):
+        """
+        test that searches of an index aren't cached until a refresh interval after a write.
+        """
+        ## Arrange ##
+        self.cache.invalidate_documents("test_data", [1])
+
+        ## Act ##
+        stale_out = self.cache.get_search("test_data", {"size": 10}, self.fetch([]))
+        self.clock.now = 1.5
+        fresh_out = self.cache.get_search("test_data", {"size": 10}, self.fetch([1]))
+        cached_out = self.cache.get_search("test_data", {"size": 10}, self.fetch([2]))
+
+        ## Assert ##
+        assert stale_out == [] and fresh_out == cached_out == [1]
+        assert self.fetches == [[], [1]]
+
+    def test_suspend_searches(self):
+        """
+        test that searches aren't cached while suspended and are fetched again once resumed.
+        """
+        ## Arrange ##
+        self.cache.get_search("test_data", {"size": 10}, self.fetch([]))
+
+        ## Act ##
+        self.cache.suspend_searches("test_data")
+        self.cache.get_search("test_data", {"size": 10}, self.fetch([]))
+        self.cache.get_search("test_data", {"size": 10}, self.fetch([]))
+        self.cache.resume_searches("test_data")
+        search_out = self.cache.get_search("test_data", {"size": 10}, self.fetch([1]))
+
+        ## Assert ##
+        assert search_out == [1]
+        assert self.fetches == [[], [], [], [1]]
+
+    def test_search_of_alias(self):
+        """
+        test that a search of an alias is invalidated by a write to any of its indices.
+        """
+        ## Arrange ##
+        self.cache.get_search("metadata", {"size": 10}, self.fetch([]), ["metadata-1", "metadata-2"])
+        self.clock.now = 2
+
+        ## Act ##
+        self.cache.invalidate_documents("metadata-2", [1])
+        self.clock.now = 4
+        search_out = self.cache.get_search("metadata", {"size": 10}, self.fetch([1]), ["metadata-1", "metadata-2"])
+
+        ## Assert ##
+        assert search_out == [1]
+        assert self.cache.get_stats()["invalidations"] == 1
+
+    def test_clear_during_fetch(self):
+        """
+        test that a read that raced a clear isn't cached.
+        """
+        ## Arrange ##
+        def fetch():
+            self.cache.clear()
+            return False
+
+        ## Act ##
+        self.cache.get_document("exists", "test_data", 1, fetch)
+
+        ## Assert ##
+        assert self.cache.get_stats()["entries"] == 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -183,6 +183,116 @@ class TestClient(unittest.TestCase):
         self.client.send_document(document1, Action.DELETE)
         self.client.send_document(document2, Action.DELETE)
 
+    def test_bulk_load(self):
+        """
+        test that the bulk_load context manager disables refreshes while loading and restores
+        the index settings afterwards, even when an exception escapes.
+        """
+        ## Arrange ##
+        self.client.create_index(self.index)
+        settings_true = self.client.client.indices.get_settings(index="test_data", flat_settings=True)["test_data"]["settings"]
+        document = Document(self.index, 1, Action.INDEX, {'test body': 10})
+        self.payload.add_documents(document)
+
+        ## Act ##
+        with self.assertRaises(RuntimeError):
+            with self.client.bulk_load(self.index):
+                settings_loading = self.client.client.indices.get_settings(index="test_data", flat_settings=True)["test_data"]["settings"]
+                self.client.send_payload(self.payload)
+                raise RuntimeError("interrupted")
+        settings_out = self.client.client.indices.get_settings(index="test_data", flat_settings=True)["test_data"]["settings"]
+
+        ## Assert ##
+        assert settings_loading["index.refresh_interval"] == "-1"
+        assert settings_loading["index.number_of_replicas"] == "0"
+        assert settings_out.get("index.refresh_interval") == settings_true.get("index.refresh_interval")
+        assert settings_out["index.number_of_replicas"] == settings_true["index.number_of_replicas"]
+        assert self.client.document_exists(document)
+
+        ## TearDown ##
+        self.client.send_document(document, Action.DELETE)
+
+    def test_iter_search(self):
+        """
+        test that the iter_search method yields every matching document across pages,
+        returning only the requested source fields.
+        """
+        ## Arrange ##
+        self.client.create_index(self.index)
+        documents = [Document(self.index, i, Action.INDEX, {"level": "l0" if i % 2 else "l1", "version": i}) for i in range(25)]
+        self.payload.add_documents(documents)
+        self.client.send_payload(self.payload)
+        self.client.client.indices.refresh(index="test_data")
+
+        ## Act ##
+        hits_out = list(self.client.iter_search(self.index, {"term": {"level": "l0"}}, page_size=5, source=["version"]))
+
+        ## Assert ##
+        assert sorted(hit["_source"]["version"] for hit in hits_out) == list(range(1, 25, 2))
+        assert all(hit["_source"].keys() == {"version"} for hit in hits_out)
+
+        ## TearDown ##
+        for document in documents:
+            self.client.send_document(document, Action.DELETE)
+
+    def test_send_payload_chunks(self):
+        """
+        test that the send payload method sends each chunk of the payload as its own
+        bulk request.
+        """
+        ## Arrange ##
+        self.client.create_index(self.index)
+        action = Action.INDEX
+        documents = [Document(self.index, i, action, {'test body': i}) for i in range(5)]
+        payload = Payload(max_docs=2)
+        payload.add_documents(documents)
+
+        ## Act ##
+        result = self.client.send_payload(payload)
+
+        ## Assert ##
+        assert [chunk["documents"] for chunk in result.get_chunks()] == [2, 2, 1]
+        assert not result.has_errors()
+        assert all(self.client.document_exists(document) for document in documents)
+
+    def test_send_payload_concurrent(self):
+        """
+        test that the send payload method sends the chunks of the payload from a thread
+        pool and returns the chunk results in payload order.
+        """
+        ## Arrange ##
+        self.client.create_index(self.index)
+        action = Action.INDEX
+        documents = [Document(self.index, i, action, {'test body': i}) for i in range(10)]
+        payload = Payload(max_docs=2)
+        payload.add_documents(documents)
+        max_inflight_bytes = 2 * payload.get_chunks()[0].size_in_bytes()
+
+        ## Act ##
+        result = self.client.send_payload(payload, max_workers=4, max_inflight_bytes=max_inflight_bytes)
+
+        ## Assert ##
+        assert [chunk["bytes"] for chunk in result.get_chunks()] == [chunk.size_in_bytes() for chunk in payload.get_chunks()]
+        assert not result.has_errors()
+        assert all(self.client.document_exists(document) for document in documents)
+
+    def test_send_document_conflict(self):
+        """
+        test that the send_document method reports a create of an existing document as
+        conflicted instead of raising.
+        """
+        ## Arrange ##
+        self.client.create_index(self.index)
+        document = Document(self.index, 1, Action.CREATE, {'test body': 10})
+        self.client.send_document(document)
+
+        ## Act ##
+        result = self.client.send_document(document)
+
+        ## Assert ##
+        assert result.get_counts()["conflicted"] == 1
+        assert "1" in result.get_errors()
+
     def tearDown(self):
         self.client.delete_index(self.index)
         self.client.close()
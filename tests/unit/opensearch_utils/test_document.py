@@ -150,6 +150,46 @@ class TestDocument(unittest.TestCase):
         ## Assert ##
         assert size_in_bytes_out == size_in_bytes_true
     
+    def test_get_encoded(self):
+        """
+        test that the get_encoded method returns the encoded contents and serializes
+        the document only once.
+        """
+        ## Arrange ##
+        document = Document(self.index, self.identifier, self.action, self.document_body)
+
+        ## Act ##
+        encoded_out = document.get_encoded()
+
+        ## Assert ##
+        assert encoded_out == document.get_contents().encode("utf-8")
+        assert document.get_encoded() is encoded_out
+        assert document.size_in_bytes() == len(encoded_out)
+
+    def test_update_action_contents(self):
+        """
+        test that the contents of the document follow an update of its action.
+        """
+        ## Arrange ##
+        document = Document(self.index, self.identifier, self.action, self.document_body)
+        document.get_contents()
+
+        ## Act ##
+        document.update_action(Action.INDEX)
+
+        ## Assert ##
+        assert document.get_contents().startswith('{ "index": { "_index": "test_data", "_id": "1" } }\n')
+
+    def test_slots(self):
+        """
+        test that documents don't carry an instance __dict__.
+        """
+        ## Arrange ##
+        document = Document(self.index, self.identifier, self.action)
+
+        ## Act / Assert ##
+        assert not hasattr(document, "__dict__")
+
     def test_is_document_true(self):
         """
         test that the static method is_document correctly returns whether the input is of type Document.
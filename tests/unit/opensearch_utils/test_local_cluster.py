@@ -0,0 +1,318 @@
+import unittest
+from unittest import mock
+
+from opensearchpy import NotFoundError, RequestError
+
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.cache import QueryCache
+from sds_in_a_box.SDSCode.opensearch_utils.client import Client
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.local_cluster import LocalCluster
+from sds_in_a_box.SDSCode.opensearch_utils.mapping import IndexMapping
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+from sds_in_a_box.SDSCode.opensearch_utils.retry import RetryPolicy
+from sds_in_a_box.SDSCode.opensearch_utils.tracing import OperationStats
+
+
+class Clock():
+    """Stands in for time.monotonic."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalCluster(unittest.TestCase):
+    """tests for local_cluster.py, through Client"""
+
+    def setUp(self):
+        self.cluster = LocalCluster()
+        self.client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                             connnection_class=self.cluster.connection_class,
+                             retry_policy=RetryPolicy(sleep=lambda seconds: None))
+        self.index = Index("test_data")
+        self.client.create_index(self.index)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_index_api(self):
+        """
+        test that indices are created with their mapping, checked and deleted.
+        """
+        ## Arrange ##
+        mapping = IndexMapping(["mission", "version"])
+        index = Index("mapped_data", mapping.get_index_body())
+
+        ## Act ##
+        self.client.create_index(index)
+        exists_out = self.client.index_exists(index)
+        mappings_out = self.client.client.indices.get(index="mapped_data")["mapped_data"]["mappings"]
+        self.client.delete_index(index)
+
+        ## Assert ##
+        assert exists_out
+        assert mappings_out == mapping.get_mappings()
+        assert not self.client.index_exists(index)
+
+    def test_send_document(self):
+        """
+        test that each document action has the same outcome as on a cluster.
+        """
+        ## Arrange ##
+        document = Document(self.index, 1, Action.CREATE, {"level": "l0"})
+
+        ## Act ##
+        created = self.client.send_document(document)
+        conflicted = self.client.send_document(document)
+        document.update_body({"level": "l1"})
+        updated = self.client.send_document(document, Action.UPDATE)
+        document_out = self.client.get_document(document)
+        deleted = self.client.send_document(document, Action.DELETE)
+
+        ## Assert ##
+        assert created.get_counts()["created"] == 1
+        assert conflicted.get_counts()["conflicted"] == 1
+        assert updated.get_counts()["updated"] == 1
+        assert document_out["_version"] == 2
+        assert document_out["_source"] == {"level": "l1"}
+        assert deleted.get_counts()["deleted"] == 1
+        assert not self.client.document_exists(document)
+        self.assertRaises(NotFoundError, self.client.get_document, document)
+
+    def test_send_payload(self):
+        """
+        test that bulk items get per item responses, with conflicts for existing documents
+        and rejected items retried.
+        """
+        ## Arrange ##
+        self.client.send_document(Document(self.index, 0, Action.CREATE, {"version": 0}))
+        payload = Payload(max_docs=10)
+        payload.add_documents([Document(self.index, i, Action.CREATE, {"version": i}) for i in range(25)])
+        self.cluster.reject_items(4)
+
+        ## Act ##
+        result = self.client.send_payload(payload, max_workers=2)
+
+        ## Assert ##
+        assert result.get_counts() == {"created": 24, "updated": 0, "deleted": 0, "conflicted": 1, "failed": 0}
+        assert sum(chunk["retries"] for chunk in result.get_chunks()) >= 1
+        assert self.cluster.get_stats()["rejected_items"] == 4
+        assert len(self.cluster.indices["test_data"]["documents"]) == 25
+
+    def test_latency(self):
+        """
+        test that the injected latency is waited out for every request and bulk item.
+        """
+        ## Arrange ##
+        waits = []
+        cluster = LocalCluster(latency=0.01, item_latency=0.001, sleep=waits.append)
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=cluster.connection_class)
+        payload = Payload()
+        payload.add_documents([Document(self.index, i, Action.INDEX, {"version": i}) for i in range(10)])
+
+        ## Act ##
+        client.send_payload(payload)
+
+        ## Assert ##
+        assert waits == [0.01 + 10 * 0.001]
+
+    def test_search(self):
+        """
+        test that searches filter, sort and page through the documents.
+        """
+        ## Arrange ##
+        payload = Payload()
+        payload.add_documents([Document(self.index, i, Action.INDEX, {"level": "l0" if i % 2 else "l1", "version": i})
+                               for i in range(30)])
+        self.client.send_payload(payload)
+        query = {"bool": {"filter": [{"term": {"level": "l0"}}, {"range": {"version": {"gte": 10}}}]}}
+
+        ## Act ##
+        page_out = self.client.search(self.index, query, size=3, source=["version"])
+        hits_out = list(self.client.iter_search(self.index, query, page_size=4, sort=[{"version": "desc"}]))
+
+        ## Assert ##
+        assert page_out["hits"]["total"]["value"] == 10
+        assert [hit["_source"] for hit in page_out["hits"]["hits"]] == [{"version": 11}, {"version": 13}, {"version": 15}]
+        assert [hit["_source"]["version"] for hit in hits_out] == list(range(29, 10, -2))
+
+    def test_iter_search_scroll(self):
+        """
+        test that iter_search reads the pages with a scroll from a cluster without point in time,
+        and with a point in time and a _shard_doc tiebreaker from one with it.
+        """
+        ## Arrange ##
+        clusters = [LocalCluster(version="1.2.4"), LocalCluster(version="2.11.0")]
+        hooks = OperationStats()
+        clients = [Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                          connnection_class=cluster.connection_class, hooks=[hooks]) for cluster in clusters]
+        for client in clients:
+            payload = Payload()
+            payload.add_documents([Document(self.index, i, Action.INDEX, {"version": i % 5}) for i in range(23)])
+            client.send_payload(payload)
+
+        ## Act ##
+        hits_out = [list(client.iter_search(self.index, page_size=4, sort=[{"version": "asc"}])) for client in clients]
+
+        ## Assert ##
+        assert [client.supports_point_in_time() for client in clients] == [False, True]
+        for hits in hits_out:
+            assert [hit["_source"]["version"] for hit in hits] == sorted(i % 5 for i in range(23))
+            assert sorted(int(hit["_id"]) for hit in hits) == list(range(23))
+        assert hits_out[1][0]["sort"][-1] is not None and len(hits_out[1][0]["sort"]) == 2
+        stats = hooks.get_stats()
+        assert stats["scroll"]["requests"] == 5 and stats["clear_scroll"]["requests"] == 1
+        assert stats["create_pit"]["requests"] == 1 and stats["delete_pit"]["requests"] == 1
+
+    def test_bulk_load(self):
+        """
+        test that bulk_load disables refreshes and replicas while loading and restores them.
+        """
+        ## Act ##
+        with self.client.bulk_load(self.index):
+            settings_loading = self.cluster.indices["test_data"]["settings"].copy()
+        settings_out = self.cluster.indices["test_data"]["settings"]
+
+        ## Assert ##
+        assert settings_loading["index.refresh_interval"] == "-1"
+        assert settings_loading["index.number_of_replicas"] == "0"
+        assert "index.refresh_interval" not in settings_out
+        assert settings_out["index.number_of_replicas"] == "1"
+
+    def test_bulk_load_restore_fails(self):
+        """
+        test that bulk_load refreshes the index and caches its searches again even if its settings
+        can't be restored, and doesn't stop caching them if the load can't start.
+        """
+        ## Arrange ##
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=self.cluster.connection_class, cache=QueryCache(refresh_interval=0),
+                        hooks=[OperationStats()])
+        put_settings = client.client.indices.put_settings
+        calls = []
+
+        def failing_put_settings(index, body):
+            calls.append(body)
+            if len(calls) != 2:
+                raise ConnectionError("connection lost")
+            return put_settings(index=index, body=body)
+
+        ## Act ##
+        with mock.patch.object(client.client.indices, "put_settings", side_effect=failing_put_settings):
+            with self.assertRaises(ConnectionError):
+                with client.bulk_load(self.index):
+                    pass
+            client.search(self.index)
+            client.search(self.index)
+            with self.assertRaises(ConnectionError):
+                with client.bulk_load(self.index):
+                    pass
+        client.search(self.index)
+        client.search(self.index)
+
+        ## Assert ##
+        stats = client.hooks[0].get_stats()
+        assert stats["indices.refresh"]["requests"] == 1
+        assert stats["search"]["requests"] == 2
+        assert len(calls) == 3
+
+    def test_cache(self):
+        """
+        test that cached reads are served without a request until a write invalidates them.
+        """
+        ## Arrange ##
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=self.cluster.connection_class, cache=QueryCache())
+        document = Document(self.index, 1, Action.CREATE, {"level": "l0"})
+
+        ## Act ##
+        exists_before = client.document_exists(document)
+        client.document_exists(document)
+        requests = self.cluster.get_stats()["requests"]
+        client.send_document(document)
+        exists_after = client.document_exists(document)
+
+        ## Assert ##
+        assert not exists_before and exists_after
+        assert self.cluster.get_stats()["requests"] == requests + 2
+        assert client.cache.get_stats()["hits"] == 1
+
+    def test_cache_search_alias(self):
+        """
+        test that a cached search of an alias is invalidated by a write to its index, and that
+        searches aren't cached during a bulk load.
+        """
+        ## Arrange ##
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=self.cluster.connection_class, cache=QueryCache(refresh_interval=0),
+                        hooks=[OperationStats()])
+        client.client.indices.update_aliases(body={"actions": [{"add": {"index": "test_data", "alias": "metadata"}}]})
+        client.search(Index("metadata"))
+
+        ## Act ##
+        client.send_document(Document(self.index, 1, Action.CREATE, {"level": "l0"}))
+        search_out = client.search(Index("metadata"))
+        with client.bulk_load(self.index):
+            client.search(Index("metadata"))
+            client.search(Index("metadata"))
+
+        ## Assert ##
+        assert [hit["_id"] for hit in search_out["hits"]["hits"]] == ["1"]
+        assert client.hooks[0].get_stats()["search"]["requests"] == 4
+        assert client.hooks[0].get_stats()["indices.get_alias"]["requests"] == 1
+
+    def test_point_in_time_version(self):
+        """
+        test that point in time is rejected by a cluster older than 2.4, as by the stack's domain.
+        """
+        ## Act ##
+        with self.assertRaises(RequestError):
+            self.client.client.create_pit(index="test_data", keep_alive="1m")
+
+        ## Assert ##
+        assert not self.client.supports_point_in_time()
+
+    def test_near_real_time(self):
+        """
+        test that a near real time cluster only shows writes to searches after a refresh, and
+        never refreshes an index with a refresh interval of -1 on its own.
+        """
+        ## Arrange ##
+        clock = Clock()
+        cluster = LocalCluster(near_real_time=True, clock=clock)
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=cluster.connection_class)
+        client.create_index(self.index)
+        clock.now = 10
+
+        def count():
+            return client.search(self.index)["hits"]["total"]["value"]
+
+        ## Act ##
+        client.send_document(Document(self.index, 1, Action.CREATE, {"level": "l0"}))
+        counts_out = [count()]
+        clock.now = 11
+        counts_out.append(count())
+        with client.bulk_load(self.index):
+            client.send_document(Document(self.index, 2, Action.CREATE, {"level": "l0"}))
+            clock.now = 100
+            counts_out.append(count())
+        counts_out.append(count())
+        client.send_document(Document(self.index, 3, Action.CREATE, {"level": "l0"}))
+        counts_out.append(count())
+        found_out = client.get_document(Document(self.index, 3, Action.CREATE, {}))["found"]
+        client.client.indices.refresh(index="test_data")
+        counts_out.append(count())
+
+        ## Assert ##
+        assert counts_out == [0, 1, 1, 2, 2, 3]
+        assert found_out
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.opensearch_utils.mapping import IndexMapping
+
+
+class TestIndexMapping(unittest.TestCase):
+    """tests for mapping.py"""
+
+    def setUp(self):
+        self.filetypes = indexer._load_allowed_filenames()
+
+    def test_from_filetypes(self):
+        """
+        test that the pattern fields and header keywords of the configuration are mapped
+        to keyword, date and integer with dynamic mapping disabled.
+        """
+        ## Act ##
+        mappings_out = IndexMapping.from_filetypes(self.filetypes).get_mappings()
+
+        ## Assert ##
+        assert mappings_out["dynamic"] is False
+        properties = mappings_out["properties"]
+        assert properties["mission"] == {"type": "keyword"}
+        assert properties["level"] == {"type": "keyword"}
+        assert properties["instrument"] == {"type": "keyword"}
+        assert properties["extension"] == {"type": "keyword"}
+        assert properties["date"]["type"] == "date"
+        assert properties["date_obs"]["type"] == "date"
+        assert properties["version"]["type"] == "integer"
+        assert properties["instrume"] == {"type": "keyword"}
+
+    def test_get_template(self):
+        """
+        test that the template applies the mapping and settings to the index patterns.
+        """
+        ## Arrange ##
+        mapping = IndexMapping(["mission", "version"])
+
+        ## Act ##
+        template_out = mapping.get_template(["metadata*"], {"number_of_shards": 1})
+
+        ## Assert ##
+        assert template_out == {"index_patterns": ["metadata*"], "template": {
+            "mappings": mapping.get_mappings(), "settings": {"number_of_shards": 1}}}
+
+    def test_convert(self):
+        """
+        test that integer fields are converted from the strings parsed out of filenames.
+        """
+        ## Arrange ##
+        mapping = IndexMapping(["mission", "date", "version"])
+        metadata = {"mission": "imap", "date": "20250102", "version": "v001"}
+
+        ## Act ##
+        metadata_out = mapping.convert(metadata)
+
+        ## Assert ##
+        assert metadata_out == {"mission": "imap", "date": "20250102", "version": 1}
+        assert mapping.convert({"version": "version"}) == {"version": "version"}
+        assert metadata["version"] == "v001"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -84,6 +84,60 @@ class TestPayload(unittest.TestCase):
         ## Assert ##
         assert contents_true == contents_out
 
+    def test_max_bytes(self):
+        """
+        test that a new chunk is started when a document would take the last chunk over max_bytes.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.CREATE, {"testbody": "test"}) for i in range(5)]
+        payload = Payload(max_bytes=2 * documents[0].size_in_bytes())
+
+        ## Act ##
+        payload.add_documents(documents)
+
+        ## Assert ##
+        assert [len(chunk) for chunk in payload.get_chunks()] == [2, 2, 1]
+        assert payload.get_contents() == "".join(doc.get_contents() for doc in documents)
+
+    def test_max_docs(self):
+        """
+        test that a new chunk is started once the last chunk holds max_docs documents.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.CREATE, {"testbody": "test"}) for i in range(7)]
+        payload = Payload(max_docs=3)
+
+        ## Act ##
+        payload.add_documents(documents)
+
+        ## Assert ##
+        assert [len(chunk) for chunk in payload.get_chunks()] == [3, 3, 1]
+        assert payload.get_chunks()[1].get_documents() == documents[3:6]
+
+    def test_size_in_bytes(self):
+        """
+        test that the size_in_bytes method returns the running size of the payload contents.
+        """
+        ## Arrange ##
+        documents = [Document(self.index, i, Action.CREATE, {"testbody": "test"}) for i in range(4)]
+        payload = Payload(max_docs=3)
+
+        ## Act ##
+        payload.add_documents(documents)
+
+        ## Assert ##
+        assert payload.size_in_bytes() == len(payload.get_contents().encode("ascii"))
+        assert len(payload) == 4
+
+    def test_bad_limits(self):
+        """
+        test that the payload limits are validated.
+        """
+        ## Act / Assert ##
+        self.assertRaises(TypeError, Payload, max_bytes="1000")
+        self.assertRaises(ValueError, Payload, max_bytes=0)
+        self.assertRaises(ValueError, Payload, max_docs=-1)
+
 
 
     
@@ -0,0 +1,74 @@
+import unittest
+from sds_in_a_box.SDSCode.opensearch_utils.retry import RetryPolicy, RetryBudget
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """tests for retry.py"""
+
+    def test_is_retryable(self):
+        """
+        test that only overload statuses are retried by default.
+        """
+        ## Arrange ##
+        policy = RetryPolicy()
+
+        ## Act / Assert ##
+        assert policy.is_retryable(429)
+        assert policy.is_retryable(503)
+        assert not policy.is_retryable(409)
+        assert not policy.is_retryable(201)
+
+    def test_backoff(self):
+        """
+        test that the backoff is jittered below an exponentially growing cap.
+        """
+        ## Arrange ##
+        policy = RetryPolicy(initial_backoff=1, max_backoff=5)
+
+        for attempt, cap in [(0, 1), (1, 2), (2, 4), (3, 5), (10, 5)]:
+            ## Act ##
+            backoffs = [policy.backoff(attempt) for _ in range(50)]
+
+            ## Assert ##
+            assert all(0 <= backoff <= cap for backoff in backoffs)
+
+    def test_wait(self):
+        """
+        test that the wait method sleeps with the configured sleep function.
+        """
+        ## Arrange ##
+        sleeps = []
+        policy = RetryPolicy(initial_backoff=1, sleep=sleeps.append)
+
+        ## Act ##
+        policy.wait(0)
+
+        ## Assert ##
+        assert len(sleeps) == 1 and 0 <= sleeps[0] <= 1
+
+    def test_budget(self):
+        """
+        test that a retry budget runs out after the configured number of retries.
+        """
+        ## Arrange ##
+        budget = RetryPolicy(retry_budget=2).new_budget()
+
+        ## Act ##
+        acquired = [budget.try_acquire() for _ in range(3)]
+
+        ## Assert ##
+        assert acquired == [True, True, False]
+
+    def test_unlimited_budget(self):
+        """
+        test that a budget of None never runs out.
+        """
+        ## Arrange ##
+        budget = RetryBudget()
+
+        ## Act / Assert ##
+        assert all(budget.try_acquire() for _ in range(100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import unittest
+from sds_in_a_box.SDSCode.opensearch_utils import serializer
+from sds_in_a_box.SDSCode.opensearch_utils.serializer import JsonSerializer, OrjsonSerializer, get_serializer
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+
+
+class TestSerializer(unittest.TestCase):
+    """tests for serializer.py"""
+
+    def setUp(self):
+        self.body = {"mission":"imap", "level":"l0", "instrument":"*", "date":"*", "version":"*", "extension":"fits"}
+
+    def test_json_dumps(self):
+        """
+        test that the json serializer returns the json module's output as bytes.
+        """
+        ## Act ##
+        encoded_out = JsonSerializer().dumps(self.body)
+
+        ## Assert ##
+        assert encoded_out == json.dumps(self.body).encode("utf-8")
+
+    @unittest.skipIf(serializer.orjson is None, "orjson is not installed")
+    def test_orjson_dumps(self):
+        """
+        test that the orjson serializer returns JSON bytes that decode to the same body.
+        """
+        ## Act ##
+        encoded_out = OrjsonSerializer().dumps(self.body)
+
+        ## Assert ##
+        assert type(encoded_out) is bytes
+        assert json.loads(encoded_out) == self.body
+
+    @unittest.skipIf(serializer.orjson is None, "orjson is not installed")
+    def test_document_serializer(self):
+        """
+        test that a document serializes its body with the serializer it was given.
+        """
+        ## Arrange ##
+        document = Document(Index("test_data"), 1, Action.CREATE, self.body, serializer=get_serializer("orjson"))
+
+        ## Act ##
+        contents_out = document.get_contents()
+
+        ## Assert ##
+        assert contents_out == '{ "create": { "_index": "test_data", "_id": "1" } }\n' + json.dumps(self.body, separators=(",", ":")) + '\n'
+
+    def test_get_serializer_default(self):
+        """
+        test that the default serializer is shared and falls back to json.
+        """
+        ## Act / Assert ##
+        assert get_serializer() is get_serializer()
+        assert "json" in serializer.available_serializers()
+
+    def test_get_serializer_error(self):
+        """
+        test that an unknown serializer name raises an error.
+        """
+        ## Act / Assert ##
+        self.assertRaises(ValueError, get_serializer, "not a serializer")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+
+from sds_in_a_box.SDSCode.opensearch_utils.action import Action
+from sds_in_a_box.SDSCode.opensearch_utils.client import Client
+from sds_in_a_box.SDSCode.opensearch_utils.document import Document
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+from sds_in_a_box.SDSCode.opensearch_utils.local_cluster import LocalCluster
+from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
+from sds_in_a_box.SDSCode.opensearch_utils.retry import RetryPolicy
+from sds_in_a_box.SDSCode.opensearch_utils.serializer import JsonSerializer
+from sds_in_a_box.SDSCode.opensearch_utils.tracing import OperationStats, RequestHooks
+
+
+class RecordingHooks(RequestHooks):
+    """Records the traces passed to before and after."""
+
+    def __init__(self):
+        self.calls = []
+
+    def before(self, trace):
+        trace.context["started"] = True
+        self.calls.append(("before", trace.operation, trace.status))
+
+    def after(self, trace):
+        self.calls.append(("after", trace.operation, trace.status))
+        self.traces = getattr(self, "traces", []) + [trace]
+
+
+class FailingHooks(RequestHooks):
+    """Raises from every hook."""
+
+    def before(self, trace):
+        raise RuntimeError("hook failed")
+
+
+class CountingSerializer(JsonSerializer):
+    """Counts the bodies it serializes."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def dumps(self, obj):
+        self.calls += 1
+        return super().dumps(obj)
+
+
+class TestRequestHooks(unittest.TestCase):
+    """tests for tracing.py, through Client"""
+
+    def setUp(self):
+        self.cluster = LocalCluster()
+        self.hooks = RecordingHooks()
+        self.stats = OperationStats()
+        self.client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                             connnection_class=self.cluster.connection_class,
+                             retry_policy=RetryPolicy(sleep=lambda seconds: None),
+                             hooks=[self.hooks, self.stats])
+        self.index = Index("test_data")
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_document_calls(self):
+        """
+        test that every call fires before and after with its operation, index, status and size.
+        """
+        ## Arrange ##
+        document = Document(self.index, 1, Action.CREATE, {"level": "l0"})
+
+        ## Act ##
+        self.client.create_index(self.index)
+        exists_before = self.client.document_exists(document)
+        self.client.send_document(document)
+        self.client.send_document(document)
+        self.client.get_document(document)
+
+        ## Assert ##
+        assert not exists_before
+        assert self.hooks.calls == [
+            ("before", "indices.create", None), ("after", "indices.create", 200),
+            ("before", "exists", None), ("after", "exists", 404),
+            ("before", "create", None), ("after", "create", 201),
+            ("before", "create", None), ("after", "create", 409),
+            ("before", "get", None), ("after", "get", 200),
+        ]
+        create, conflict = self.hooks.traces[2:4]
+        assert create.index == "test_data"
+        assert create.bytes == len(b'{"level": "l0"}')
+        assert create.context == {"started": True}
+        assert create.error is None and create.seconds >= 0
+        assert conflict.error is not None
+
+    def test_document_body_serialized_once(self):
+        """
+        test that a single document write serializes its body once, to send it and to report its size, and a delete reports none.
+        """
+        ## Arrange ##
+        serializer = CountingSerializer()
+        document = Document(self.index, 1, Action.CREATE, {"level": "l0"}, serializer=serializer)
+
+        ## Act ##
+        results = [self.client.send_document(document, action) for action in (Action.CREATE, Action.INDEX, Action.UPDATE)]
+        deleted = self.client.send_document(document, Action.DELETE)
+
+        ## Assert ##
+        sizes = [len(b'{"level": "l0"}')] * 2 + [len(b'{"doc": {"level": "l0"}}')]
+        assert serializer.calls == 3
+        assert [trace.bytes for trace in self.hooks.traces[:3]] == sizes
+        assert [result.size_in_bytes() for result in results] == sizes
+        assert deleted.size_in_bytes() == 0
+        assert "1" not in self.cluster.indices["test_data"]["documents"]
+
+    def test_bulk(self):
+        """
+        test that every bulk request, including retries of rejected items, is traced with
+        its size and the took reported by the cluster.
+        """
+        ## Arrange ##
+        payload = Payload()
+        payload.add_documents([Document(self.index, i, Action.INDEX, {"version": i}) for i in range(10)])
+        self.cluster.reject_items(3)
+
+        ## Act ##
+        self.client.send_payload(payload)
+
+        ## Assert ##
+        bulks = [trace for trace in self.hooks.traces if trace.operation == "bulk"]
+        assert len(bulks) == 2
+        assert bulks[0].bytes == payload.size_in_bytes()
+        assert bulks[1].bytes == sum(document.size_in_bytes() for document in payload.get_chunks()[0].get_documents()[:3])
+        assert all(trace.status == 200 and trace.took is not None for trace in bulks)
+        assert self.stats.get_stats()["bulk"]["requests"] == 2
+        assert self.stats.get_stats()["bulk"]["bytes"] == bulks[0].bytes + bulks[1].bytes
+
+    def test_failing_hook(self):
+        """
+        test that a hook raising doesn't fail the request or stop the other hooks.
+        """
+        ## Arrange ##
+        client = Client(hosts=[{"host": "localhost", "port": 9200}], http_auth=None,
+                        connnection_class=self.cluster.connection_class, hooks=[FailingHooks(), self.stats])
+
+        ## Act ##
+        with self.assertLogs("sds_in_a_box.SDSCode.opensearch_utils.client", level="ERROR"):
+            client.create_index(self.index)
+
+        ## Assert ##
+        assert client.index_exists(self.index)
+        assert self.stats.get_stats()["indices.exists"]["requests"] == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
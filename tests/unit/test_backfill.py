@@ -0,0 +1,288 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.backfill import Backfill, Checkpoint, main
+from sds_in_a_box.SDSCode.fits_header import BLOCK_SIZE, FitsHeaderReader
+from sds_in_a_box.SDSCode.inventory import InventoryManifest
+from sds_in_a_box.SDSCode.matcher import FiletypeMatcher
+from sds_in_a_box.SDSCode.opensearch_utils.bulk_result import BulkResult
+from sds_in_a_box.SDSCode.opensearch_utils.index import Index
+
+
+class LocalS3():
+    """Stands in for a boto3 S3 client holding a single bucket."""
+
+    def __init__(self, keys, empty=()):
+        self.keys = sorted(keys)
+        self.empty = set(empty)
+        self.requests = []
+        cards = ["SIMPLE  =                    T", "DATE-OBS= '2025-01-02T03:04:05'", "INSTRUME= 'SWAPI'", "END"]
+        self.header = "".join(card.ljust(80) for card in cards).ljust(BLOCK_SIZE).encode("ascii")
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(position) for position in Range[len("bytes="):].split("-"))
+        if Key in self.empty:
+            raise ClientError({"Error": {"Code": "InvalidRange", "Message": "The requested range is not satisfiable"}},
+                              "GetObject")
+        return {"Body": io.BytesIO(self.header[start:end + 1])}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix="", StartAfter="", PaginationConfig=None):
+        self.requests.append({"Bucket": Bucket, "Prefix": Prefix, "StartAfter": StartAfter})
+        page_size = (PaginationConfig or {}).get("PageSize", 1000)
+        keys = [key for key in self.keys if key.startswith(Prefix) and key > StartAfter]
+        for start in range(0, len(keys), page_size):
+            yield {"Contents": [{"Key": key} for key in keys[start:start + page_size]]}
+
+
+class LocalInventory():
+    """Stands in for a boto3 S3 client holding the CSV files of an inventory report."""
+
+    def __init__(self, files):
+        self.files = {}
+        for file_key, keys in files.items():
+            rows = "".join('"imap-data-bucket","{}","10"\n'.format(key) for key in keys)
+            self.files[file_key] = gzip.compress(rows.encode("utf-8"))
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.files[Key])}
+
+
+class LocalClient():
+    """Stands in for Client, accepting every document and optionally failing a batch or some documents."""
+
+    def __init__(self, fail_on_batch=None, fail_keys=()):
+        self.fail_on_batch = fail_on_batch
+        self.fail_keys = set(fail_keys)
+        self.indexed = []
+        self.bodies = {}
+
+    def send_payload(self, payload, max_workers=1):
+        if len(self.indexed) == self.fail_on_batch:
+            raise ConnectionError("connection lost")
+        result = BulkResult()
+        for chunk in payload.get_chunks():
+            items = [{"index": {"status": 500, "error": {"type": "internal_server_error", "reason": "failed"}}}
+                     if document.get_identifier() in self.fail_keys else {"index": {"status": 201, "result": "created"}}
+                     for document in chunk.get_documents()]
+            result.add_chunk(chunk, {"took": 1, "items": items}, 0.01)
+            self.bodies.update((document.get_identifier(), document.get_body()) for document in chunk.get_documents())
+        self.indexed.append([document.get_identifier() for chunk in payload.get_chunks() for document in chunk.get_documents()
+                             if document.get_identifier() not in self.fail_keys])
+        return result
+
+
+class LocalAdminClient(LocalClient):
+    """Stands in for Client in main, recording the bulk loads."""
+
+    def __init__(self):
+        super().__init__()
+        self.bulk_loads = []
+
+    def put_index_template(self, name, template):
+        pass
+
+    @contextmanager
+    def bulk_load(self, index):
+        self.bulk_loads.append(index.get_name())
+        yield
+
+    def close(self):
+        pass
+
+
+class TestBackfill(unittest.TestCase):
+    """tests for backfill.py"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.directory.name, "checkpoint.json")
+        self.matcher = FiletypeMatcher(indexer._load_allowed_filenames())
+        self.index = Index("test_data")
+        self.keys = ["imap_l{}_instrument_date_v{:03d}.fits".format(i % 2, i) for i in range(25)]
+        self.keys.append("emm_l0_anything_anything_anything.fits")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_listing(self):
+        """
+        test that every matching key in the bucket is indexed, one batch per listing page.
+        """
+        ## Arrange ##
+        s3 = LocalS3(self.keys)
+        client = LocalClient()
+        backfill = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+
+        ## Act ##
+        backfill.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+
+        ## Assert ##
+        assert len(client.indexed) == 3
+        assert sorted(key for batch in client.indexed for key in batch) == sorted(self.keys[:25])
+        assert backfill.checkpoint.counts["keys"] == 26
+        assert backfill.checkpoint.counts["skipped"] == 1
+        assert backfill.checkpoint.counts["created"] == 25
+
+    def test_run_listing_headers(self):
+        """
+        test that backfilled documents get the header fields, as the documents indexed by the
+        Lambda do, so a rerun doesn't strip them.
+        """
+        ## Arrange ##
+        s3 = LocalS3(self.keys)
+        client = LocalClient()
+        backfill = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path),
+                            header_reader=FitsHeaderReader(s3), header_workers=4)
+
+        ## Act ##
+        backfill.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+
+        ## Assert ##
+        assert len(client.bodies) == 25
+        assert client.bodies["imap_l1_instrument_date_v007.fits"] == {
+            "mission": "imap", "level": "l1", "instrument": "instrument", "date": "date", "version": "v007",
+            "extension": "fits", "date_obs": "2025-01-02T03:04:05", "instrume": "SWAPI"}
+
+    def test_run_listing_not_fits(self):
+        """
+        test that a matching file without a readable header, ex: an empty one, is indexed with
+        its filename metadata, as by the Lambda, rather than skipped or retried.
+        """
+        ## Arrange ##
+        s3 = LocalS3(self.keys, empty=["imap_l1_instrument_date_v007.fits"])
+        client = LocalClient()
+        backfill = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path),
+                            header_reader=FitsHeaderReader(s3))
+
+        ## Act ##
+        backfill.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+
+        ## Assert ##
+        assert len(client.bodies) == 25
+        assert client.bodies["imap_l1_instrument_date_v007.fits"] == {
+            "mission": "imap", "level": "l1", "instrument": "instrument", "date": "date", "version": "v007",
+            "extension": "fits"}
+        assert backfill.checkpoint.counts["skipped"] == 1
+        assert backfill.checkpoint.failed == set()
+
+    def test_resume(self):
+        """
+        test that an interrupted backfill resumes after the last checkpointed page.
+        """
+        ## Arrange ##
+        s3 = LocalS3(self.keys)
+        failing_client = LocalClient(fail_on_batch=1)
+        backfill = Backfill(failing_client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        self.assertRaises(ConnectionError, backfill.run_listing, s3, "IMAP-Data-Bucket", "", 10)
+        first_page = failing_client.indexed[0]
+
+        ## Act ##
+        client = LocalClient()
+        resumed = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        resumed.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+
+        ## Assert ##
+        assert s3.requests[-1]["StartAfter"] == s3.keys[9]
+        assert not set(first_page) & set(key for batch in client.indexed for key in batch)
+        assert resumed.checkpoint.counts["keys"] == 26
+        assert resumed.checkpoint.counts["created"] == 25
+
+    def test_resume_failed_keys(self):
+        """
+        test that documents that failed to index are kept in the checkpoint and indexed
+        when the run is resumed, even though the position moved past their batch.
+        """
+        ## Arrange ##
+        s3 = LocalS3(self.keys)
+        failing_client = LocalClient(fail_keys=[self.keys[3], self.keys[12]])
+        backfill = Backfill(failing_client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        backfill.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+        failed = Checkpoint(self.checkpoint_path).failed
+
+        ## Act ##
+        client = LocalClient()
+        resumed = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        resumed.run_listing(s3, "IMAP-Data-Bucket", page_size=10)
+
+        ## Assert ##
+        assert failed == {self.keys[3], self.keys[12]}
+        assert client.indexed[0] == sorted(failed)
+        assert Checkpoint(self.checkpoint_path).failed == set()
+        assert resumed.checkpoint.counts["keys"] == 26
+        assert resumed.checkpoint.counts["created"] == 25
+
+    def test_run_inventory(self):
+        """
+        test that the keys of an inventory report are indexed and an interrupted run resumes
+        after the last checkpointed batch.
+        """
+        ## Arrange ##
+        s3 = LocalInventory({"inventory/data/0.csv.gz": self.keys[:13], "inventory/data/1.csv.gz": self.keys[13:]})
+        inventory = InventoryManifest("imap-inventory-bucket", "CSV", "Bucket, Key, Size", sorted(s3.files))
+        failing_client = LocalClient(fail_on_batch=2)
+        backfill = Backfill(failing_client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        self.assertRaises(ConnectionError, backfill.run_inventory, s3, inventory, 10)
+
+        ## Act ##
+        client = LocalClient()
+        resumed = Backfill(client, self.index, self.matcher, Checkpoint(self.checkpoint_path))
+        resumed.run_inventory(s3, inventory, 10)
+
+        ## Assert ##
+        indexed = [key for batch in failing_client.indexed + client.indexed for key in batch]
+        assert sorted(indexed) == sorted(self.keys[:25])
+        assert resumed.checkpoint.position == {"file": 1, "rows": 13}
+        assert resumed.checkpoint.counts["keys"] == 26
+        assert resumed.checkpoint.counts["skipped"] == 1
+
+    def test_checkpoint_save(self):
+        """
+        test that a checkpoint is written to its file and read back.
+        """
+        ## Arrange ##
+        checkpoint = Checkpoint(self.checkpoint_path)
+
+        ## Act ##
+        checkpoint.update("imap_l0_instrument_date_v009.fits", 10, 1, BulkResult())
+        checkpoint_out = Checkpoint(self.checkpoint_path)
+
+        ## Assert ##
+        assert checkpoint_out.position == "imap_l0_instrument_date_v009.fits"
+        assert checkpoint_out.counts["keys"] == 10
+        assert checkpoint_out.counts["skipped"] == 1
+
+
+    def test_main_bulk_load(self):
+        """
+        test that main only bulk loads the index when asked to.
+        """
+        ## Arrange ##
+        clients = [LocalAdminClient(), LocalAdminClient()]
+        argv = ["--bucket", "IMAP-Data-Bucket", "--index", "test_data"]
+
+        ## Act ##
+        with mock.patch("sds_in_a_box.SDSCode.backfill.boto3.client", return_value=LocalS3(self.keys)), \
+                mock.patch.object(indexer, "_create_open_search_client", side_effect=clients), \
+                mock.patch.object(indexer, "_ensure_index"):
+            main(argv + ["--checkpoint", os.path.join(self.directory.name, "live.json")])
+            main(argv + ["--checkpoint", os.path.join(self.directory.name, "fresh.json"), "--bulk-load"])
+
+        ## Assert ##
+        assert clients[0].bulk_loads == []
+        assert clients[1].bulk_loads == ["test_data"]
+        assert len(clients[0].indexed[0]) == len(clients[1].indexed[0]) == 25
+
+if __name__ == '__main__':
+    unittest.main()
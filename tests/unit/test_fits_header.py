@@ -0,0 +1,167 @@
+import gzip
+import io
+import os
+import threading
+import unittest
+
+from botocore.exceptions import ClientError
+
+from sds_in_a_box.SDSCode.fits_header import BLOCK_SIZE, FitsHeader, FitsHeaderReader
+
+
+class LocalS3():
+    """Stands in for a boto3 S3 client serving ranged GETs of a single object."""
+
+    def __init__(self, data):
+        self.data = data
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(position) for position in Range[len("bytes="):].split("-"))
+        self.ranges.append((start, end))
+        if start >= len(self.data):
+            raise ClientError({"Error": {"Code": "InvalidRange", "Message": "The requested range is not satisfiable"}},
+                              "GetObject")
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+
+def fits_file(cards, data_blocks=10):
+    """Returns a FITS file made of the given header cards, an END card and empty data blocks."""
+    header = "".join(card.ljust(80) for card in cards + ["END"])
+    header = header.ljust(-(-len(header) // BLOCK_SIZE) * BLOCK_SIZE).encode("ascii")
+    return header + bytes(data_blocks * BLOCK_SIZE)
+
+
+class TestFitsHeader(unittest.TestCase):
+    """tests for fits_header.py"""
+
+    def setUp(self):
+        self.cards = [
+            "SIMPLE  =                    T / conforms to FITS standard",
+            "BITPIX  =                    8",
+            "NAXIS   =                    0",
+            "DATE-OBS= '2025-01-02T03:04:05' / start of the observation",
+            "INSTRUME= 'SWAPI   '",
+            "OBJECT  = 'O''Brien'",
+            "EXPTIME =              1.5D+01",
+            "COMMENT   a comment card",
+        ]
+
+    def test_add_block(self):
+        """
+        test that the values of the header cards are converted to their python types.
+        """
+        ## Arrange ##
+        header = FitsHeader()
+        data = fits_file(self.cards)
+
+        ## Act ##
+        complete_out = header.add_block(data[:BLOCK_SIZE])
+
+        ## Assert ##
+        assert complete_out
+        assert header.cards == {"SIMPLE": True, "BITPIX": 8, "NAXIS": 0, "DATE-OBS": "2025-01-02T03:04:05",
+                                "INSTRUME": "SWAPI", "OBJECT": "O'Brien", "EXPTIME": 15.0}
+        assert header.get_fields(["DATE-OBS", "INSTRUME", "OBS_MODE"]) == {"date_obs": "2025-01-02T03:04:05",
+                                                                         "instrume": "SWAPI"}
+
+    def test_add_block_not_fits(self):
+        """
+        test that a file that doesn't start with a FITS header raises an error.
+        """
+        ## Act / Assert ##
+        self.assertRaises(ValueError, FitsHeader().add_block, bytes(BLOCK_SIZE))
+
+    def test_read(self):
+        """
+        test that only the header blocks are read, doubling the blocks fetched per request.
+        """
+        ## Arrange ##
+        cards = self.cards + ["HISTORY   line {}".format(i) for i in range(200)]
+        s3 = LocalS3(fits_file(cards))
+        reader = FitsHeaderReader(s3)
+
+        ## Act ##
+        header_out = reader.read("IMAP-Data-Bucket", "imap_l0_instrument_date_version.fits")
+
+        ## Assert ##
+        assert header_out.blocks == 6
+        assert header_out.cards["DATE-OBS"] == "2025-01-02T03:04:05"
+        assert s3.ranges == [(0, BLOCK_SIZE - 1), (BLOCK_SIZE, 3 * BLOCK_SIZE - 1), (3 * BLOCK_SIZE, 7 * BLOCK_SIZE - 1)]
+
+    def test_read_gzip(self):
+        """
+        test that a gzip compressed file is decompressed as it is read and that reading
+        stops at the END card, fetching only a small part of the object.
+        """
+        ## Arrange ##
+        cards = self.cards + ["HISTORY   line {}".format(i) for i in range(200)]
+        data = fits_file(cards, data_blocks=0) + os.urandom(100 * BLOCK_SIZE)
+        s3 = LocalS3(gzip.compress(data))
+        reader = FitsHeaderReader(s3)
+
+        ## Act ##
+        header_out = reader.read("IMAP-Data-Bucket", "imap_l1_instrument_date_version.fits.gz")
+
+        ## Assert ##
+        assert header_out.blocks == 6
+        assert header_out.cards["INSTRUME"] == "SWAPI"
+        assert sum(end - start + 1 for start, end in s3.ranges) < 10 * BLOCK_SIZE
+
+    def test_read_no_end(self):
+        """
+        test that a header without an END card within max_blocks raises an error.
+        """
+        ## Arrange ##
+        cards = self.cards + ["HISTORY   line {}".format(i) for i in range(200)]
+        reader = FitsHeaderReader(LocalS3(fits_file(cards)), max_blocks=4)
+
+        ## Act / Assert ##
+        self.assertRaises(ValueError, reader.read, "IMAP-Data-Bucket", "imap_l0_instrument_date_version.fits")
+
+    def test_read_not_fits(self):
+        """
+        test that empty objects, like the repo's test fixtures, and corrupt gzip files raise a
+        ValueError rather than an S3 or zlib error.
+        """
+        for key, data in (("imap_l0_anything_anything_anything.fits", b""),
+                          ("imap_l1_anything_anything_anything.fits.gz", b""),
+                          ("imap_l1_anything_anything_anything.fits.gz", b"not gzip" * 1000)):
+            with self.subTest(key=key, size=len(data)):
+                ## Arrange ##
+                reader = FitsHeaderReader(LocalS3(data))
+
+                ## Act / Assert ##
+                self.assertRaises(ValueError, reader.read, "IMAP-Data-Bucket", key)
+
+    def test_read_many(self):
+        """
+        test that headers are read concurrently and returned in order, with the error of a
+        file that can't be read in its place.
+        """
+        ## Arrange ##
+        s3 = LocalS3(fits_file(self.cards))
+        barrier = threading.Barrier(3, timeout=5)
+        get_object = s3.get_object
+
+        def concurrent_get_object(Bucket, Key, Range):
+            # every read waits until three of them are in flight at once
+            if Range.startswith("bytes=0-"):
+                barrier.wait()
+            if Key == "not_fits.fits":
+                return {"Body": io.BytesIO(bytes(BLOCK_SIZE))}
+            return get_object(Bucket, Key, Range)
+        s3.get_object = concurrent_get_object
+        reader = FitsHeaderReader(s3)
+
+        ## Act ##
+        headers_out = reader.read_many([("imap-data-bucket", "a.fits"), ("imap-data-bucket", "not_fits.fits"),
+                                        ("imap-data-bucket", "b.fits")], max_workers=3)
+
+        ## Assert ##
+        assert headers_out[0].cards["INSTRUME"] == headers_out[2].cards["INSTRUME"] == "SWAPI"
+        assert isinstance(headers_out[1], ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
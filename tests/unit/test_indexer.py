@@ -1,6 +1,9 @@
+import contextlib
+import io
 import json
 import os
 import unittest
+from unittest import mock
 
 import boto3
 from botocore.exceptions import ClientError
@@ -13,6 +16,11 @@ from sds_in_a_box.SDSCode.opensearch_utils.index import Index
 from sds_in_a_box.SDSCode.opensearch_utils.document import Document
 from sds_in_a_box.SDSCode.opensearch_utils.payload import Payload
 from sds_in_a_box.SDSCode.opensearch_utils.client import Client
+from sds_in_a_box.SDSCode.opensearch_utils.local_cluster import LocalCluster
+from sds_in_a_box.SDSCode.opensearch_utils.retry import RetryPolicy
+from sds_in_a_box.SDSCode.opensearch_utils.tracing import OperationStats
+from sds_in_a_box.SDSCode.fits_header import BLOCK_SIZE, FitsHeaderReader
+from sds_in_a_box.SDSCode.lifecycle import ContainerResources
 
 
 @pytest.mark.network
@@ -90,7 +98,12 @@ class TestIndexer(unittest.TestCase):
         document_true = {"_index":"test_data","_type":"_doc","_id":"imap_l0_instrument_date_version.fits","_version":1,"_seq_no":0,"_primary_term":1,"found":True,"_source":{"mission": "imap", "level": "l0", "instrument": "instrument", "date": "date", "version": "version", "extension": "fits"}}
 
         ## Act
-        indexer.lambda_handler(self.sample_payload, "")
+        # the key isn't in the bucket, it is served as an empty object like the tests/*.fits fixtures,
+        # which have no header to read, so only the filename metadata is indexed
+        bucket = LocalBucket([])
+        bucket.objects["imap_l0_instrument_date_version.fits"] = b""
+        with mock.patch.object(indexer, "header_reader", FitsHeaderReader(bucket)):
+            indexer.lambda_handler(self.sample_payload, "")
 
         document_out = self.client.get_document(self.document)
 
@@ -104,5 +117,243 @@ class TestIndexer(unittest.TestCase):
         self.client.delete_index(self.index)
         self.client.close()
 
+class LocalQueue():
+    """Stands in for the SQS queue between the data bucket and the indexer."""
+
+    def __init__(self):
+        self.messages = []
+
+    def notify(self, bucket, key):
+        """Queues the S3 notification for a new object."""
+        notification = {"Records": [{"eventSource": "aws:s3", "eventName": "ObjectCreated:Put",
+                                     "s3": {"bucket": {"name": bucket}, "object": {"key": key, "size": 1}}}]}
+        self.messages.append(json.dumps(notification))
+
+    def receive(self, batch_size):
+        """Returns a lambda event for up to batch_size queued messages."""
+        batch, self.messages = self.messages[:batch_size], self.messages[batch_size:]
+        return {"Records": [{"messageId": str(i), "eventSource": "aws:sqs", "body": body}
+                            for i, body in enumerate(batch)]}
+
+
+class LocalBucket():
+    """Stands in for a boto3 S3 client serving ranged GETs of FITS files."""
+
+    def __init__(self, keys):
+        cards = ["SIMPLE  =                    T", "DATE-OBS= '2025-01-02T03:04:05'", "INSTRUME= 'SWAPI'", "END"]
+        header = "".join(card.ljust(80) for card in cards).ljust(BLOCK_SIZE).encode("ascii")
+        self.objects = {key: header + bytes(BLOCK_SIZE) for key in keys}
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = (int(position) for position in Range[len("bytes="):].split("-"))
+        if start >= len(self.objects[Key]):
+            raise ClientError({"Error": {"Code": "InvalidRange", "Message": "The requested range is not satisfiable"}},
+                              "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key][start:end + 1])}
+
+
+class TestLambdaHandler(unittest.TestCase):
+    """tests for lambda_handler against a local stand-in for the cluster and the bucket"""
+
+    def setUp(self):
+        self.cluster = LocalCluster()
+        self.keys = ["imap_l0_instrument_date_v{:03d}.fits".format(i) for i in range(20)]
+        resources = ContainerResources(indexer._load_allowed_filenames, lambda: Client(
+            hosts=[{"host": "localhost", "port": 9200}], http_auth=None, connnection_class=self.cluster.connection_class))
+        self.patches = [
+            mock.patch.object(indexer, "resources", resources),
+            mock.patch.object(indexer, "header_reader", FitsHeaderReader(LocalBucket(self.keys))),
+            mock.patch.object(indexer, "_ready_indices", set()),
+            mock.patch.dict(os.environ, {"OS_INDEX": "test_data"}),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def test_lambda_handler(self):
+        """
+        test that a batch of SQS messages is indexed with the filename and header metadata,
+        and that the messages that can never be indexed aren't reported as failed, so SQS
+        doesn't retry them.
+        """
+        ## Arrange ##
+        queue = LocalQueue()
+        for key in self.keys:
+            queue.notify("IMAP-Data-Bucket", key)
+        queue.notify("IMAP-Data-Bucket", "emm_l0_anything_anything_anything.fits")
+        queue.messages.append("not json")
+
+        ## Act ##
+        response = indexer.lambda_handler(queue.receive(100), None)
+
+        ## Assert ##
+        assert response == {"batchItemFailures": []}
+        index = self.cluster.indices["test_data"]
+        assert index["mappings"]["properties"]["version"]["type"] == "integer"
+        assert len(index["documents"]) == 20
+        assert index["documents"]["imap_l0_instrument_date_v007.fits"]["_source"] == {
+            "mission": "imap", "level": "l0", "instrument": "instrument", "date": "date", "version": 7,
+            "extension": "fits", "date_obs": "2025-01-02T03:04:05", "instrume": "SWAPI"}
+
+    def test_lambda_handler_retryable(self):
+        """
+        test that a message whose file can't be read from the bucket is reported as failed, so SQS
+        retries it, while files that aren't FITS, ex: empty ones, are indexed without header fields.
+        """
+        ## Arrange ##
+        queue = LocalQueue()
+        queue.notify("IMAP-Data-Bucket", self.keys[0])
+        queue.notify("IMAP-Data-Bucket", "imap_l0_instrument_date_v100.fits")
+        queue.notify("IMAP-Data-Bucket", "imap_l0_instrument_date_v101.fits")
+        queue.notify("IMAP-Data-Bucket", "imap_l0_instrument_date_v102.fits")
+        bucket = indexer.header_reader.s3
+        bucket.objects["imap_l0_instrument_date_v101.fits"] = bytes(2 * BLOCK_SIZE)
+        bucket.objects["imap_l0_instrument_date_v102.fits"] = b""
+
+        ## Act ##
+        response = indexer.lambda_handler(queue.receive(100), None)
+
+        ## Assert ##
+        assert response == {"batchItemFailures": [{"itemIdentifier": "1"}]}
+        documents = self.cluster.indices["test_data"]["documents"]
+        assert sorted(documents) == [self.keys[0], "imap_l0_instrument_date_v101.fits", "imap_l0_instrument_date_v102.fits"]
+        assert documents["imap_l0_instrument_date_v102.fits"]["_source"] == {
+            "mission": "imap", "level": "l0", "instrument": "instrument", "date": "date", "version": 102,
+            "extension": "fits"}
+
+    def test_lambda_handler_s3_event_raises(self):
+        """
+        test that a direct S3 event whose file can't be read raises, so Lambda retries it,
+        since it has no message id to report as failed.
+        """
+        ## Arrange ##
+        event = {"Records": [{"s3": {"bucket": {"name": "IMAP-Data-Bucket"},
+                                     "object": {"key": "imap_l0_instrument_date_v100.fits"}}}]}
+
+        ## Act / Assert ##
+        self.assertRaises(KeyError, indexer.lambda_handler, event, None)
+        assert self.cluster.indices["test_data"]["documents"] == {}
+
+    def test_lambda_handler_metrics(self):
+        """
+        test that every invocation emits an embedded metric record with the stage timings and counts.
+        """
+        ## Arrange ##
+        queue = LocalQueue()
+        for key in self.keys[:5]:
+            queue.notify("IMAP-Data-Bucket", key)
+        queue.notify("IMAP-Data-Bucket", "emm_l0_anything_anything_anything.fits")
+        stdout = io.StringIO()
+
+        ## Act ##
+        with contextlib.redirect_stdout(stdout):
+            indexer.lambda_handler(queue.receive(100), None)
+
+        ## Assert ##
+        records = [json.loads(line) for line in stdout.getvalue().splitlines() if line.startswith('{"_aws"')]
+        assert len(records) == 1
+        record = records[0]
+        assert record["Index"] == "test_data"
+        assert record["records"] == 6
+        assert record["failures"] == 0
+        assert record["skipped"] == 1
+        assert record["bulk_items_failed"] == 0
+        assert record["bytes_sent"] > 0
+        for stage in ("config", "client", "match", "header", "document", "payload", "send"):
+            assert stage + "_ms" in record
+
+    def test_lambda_handler_bytes_sent(self):
+        """
+        test that the bytes sent metric counts the bulk requests made, including the retries.
+        """
+        ## Arrange ##
+        stats = OperationStats()
+        resources = ContainerResources(indexer._load_allowed_filenames, lambda: Client(
+            hosts=[{"host": "localhost", "port": 9200}], http_auth=None, connnection_class=self.cluster.connection_class,
+            retry_policy=RetryPolicy(sleep=lambda seconds: None), hooks=[stats]))
+        queue = LocalQueue()
+        for key in self.keys[:5]:
+            queue.notify("IMAP-Data-Bucket", key)
+        self.cluster.reject_items(2)
+        stdout = io.StringIO()
+
+        ## Act ##
+        with mock.patch.object(indexer, "resources", resources), contextlib.redirect_stdout(stdout):
+            indexer.lambda_handler(queue.receive(100), None)
+
+        ## Assert ##
+        record = next(json.loads(line) for line in stdout.getvalue().splitlines() if line.startswith('{"_aws"'))
+        assert stats.get_stats()["bulk"]["requests"] == 2
+        assert record["bytes_sent"] == stats.get_stats()["bulk"]["bytes"]
+
+
+class TestExtractS3Records(unittest.TestCase):
+
+    def test_s3_event(self):
+        """
+        test that records of a direct S3 notification are returned unchanged.
+        """
+        ## Arrange ##
+        event = {"Records": [{"s3": {"bucket": {"name": "IMAP-Data-Bucket"},
+                                     "object": {"key": "imap_l0_instrument_date_version.fits"}}}]}
+
+        ## Act ##
+        records_out = indexer._extract_s3_records(event)
+
+        ## Assert ##
+        assert records_out == [(None, event["Records"][0])]
+
+    def test_sqs_event(self):
+        """
+        test that the S3 records wrapped in a batch of SQS messages are unwrapped in order.
+        """
+        ## Arrange ##
+        queue = LocalQueue()
+        keys = ["imap_l0_instrument_date_v{}.fits".format(i) for i in range(250)]
+        for key in keys:
+            queue.notify("IMAP-Data-Bucket", key)
+
+        ## Act ##
+        records_out = indexer._extract_s3_records(queue.receive(200))
+
+        ## Assert ##
+        assert [record["s3"]["object"]["key"] for _, record in records_out] == keys[:200]
+        assert [message_id for message_id, _ in records_out] == [str(i) for i in range(200)]
+        assert len(queue.messages) == 50
+
+    def test_sqs_test_event(self):
+        """
+        test that the s3:TestEvent sent when the notification is configured is skipped.
+        """
+        ## Arrange ##
+        event = {"Records": [{"messageId": "0", "eventSource": "aws:sqs",
+                              "body": json.dumps({"Service": "Amazon S3", "Event": "s3:TestEvent"})}]}
+
+        ## Act / Assert ##
+        assert indexer._extract_s3_records(event) == []
+
+    def test_sqs_bad_message(self):
+        """
+        test that a message that isn't an S3 notification is passed through with its
+        message id, so it can be reported as a failure without dropping the batch.
+        """
+        ## Arrange ##
+        queue = LocalQueue()
+        queue.notify("IMAP-Data-Bucket", "imap_l0_instrument_date_version.fits")
+        event = queue.receive(10)
+        bad_message = {"messageId": "bad", "eventSource": "aws:sqs", "body": "not json"}
+        event["Records"].append(bad_message)
+
+        ## Act ##
+        records_out = indexer._extract_s3_records(event)
+
+        ## Assert ##
+        assert [message_id for message_id, _ in records_out] == ["0", "bad"]
+        assert records_out[1][1] == bad_message
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,144 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+
+from sds_in_a_box.SDSCode.inventory import InventoryManifest
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+class LocalS3():
+    """Stands in for a boto3 S3 client serving objects from memory."""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+def csv_gz(rows):
+    """Returns rows as a gzipped CSV inventory file."""
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return gzip.compress(text.getvalue().encode("utf-8"))
+
+
+def manifest(file_format, file_schema, files):
+    """Returns the contents of a manifest.json."""
+    return json.dumps({
+        "sourceBucket": "imap-data-bucket",
+        "destinationBucket": "arn:aws:s3:::imap-inventory-bucket",
+        "fileFormat": file_format,
+        "fileSchema": file_schema,
+        "files": [{"key": key, "size": 0, "MD5checksum": ""} for key in files],
+    }).encode("utf-8")
+
+
+class TestInventoryManifest(unittest.TestCase):
+    """tests for inventory.py"""
+
+    def setUp(self):
+        self.schema = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size"
+        self.files = ["inventory/data/0.csv.gz", "inventory/data/1.csv.gz"]
+        self.s3 = LocalS3({
+            ("imap-inventory-bucket", "inventory/manifest.json"): manifest("CSV", self.schema, self.files),
+            ("imap-inventory-bucket", self.files[0]): csv_gz([
+                ["imap-data-bucket", "imap_l0_instrument_date_v001.fits", "1", "true", "false", "10"],
+                ["imap-data-bucket", "imap_l0_instrument_date_v001.fits", "0", "false", "false", "10"],
+                ["imap-data-bucket", "l0%2Fimap_l0_instrument_date+time_v002.fits", "1", "true", "false", "10"],
+                ["imap-data-bucket", "imap_l0_instrument_date_v003.fits", "1", "true", "true", "0"],
+            ]),
+            ("imap-inventory-bucket", self.files[1]): csv_gz([
+                ["imap-data-bucket", "imap_l1_instrument_date_v{:03d}.fits".format(i), "1", "true", "false", "10"]
+                for i in range(5)
+            ]),
+        })
+
+    def test_from_s3(self):
+        """
+        test that a manifest is read from S3 with the bucket of its data files.
+        """
+        ## Act ##
+        manifest_out = InventoryManifest.from_url(self.s3, "s3://imap-inventory-bucket/inventory/manifest.json")
+
+        ## Assert ##
+        assert manifest_out.bucket == "imap-inventory-bucket"
+        assert manifest_out.file_format == "CSV"
+        assert manifest_out.files == self.files
+
+    def test_from_json_format(self):
+        """
+        test that an unsupported file format raises an error.
+        """
+        ## Act / Assert ##
+        self.assertRaises(ValueError, InventoryManifest.from_json, json.loads(manifest("ORC", "", [])))
+
+    def test_iter_keys_csv(self):
+        """
+        test that the current keys are url decoded and yielded in batches, skipping
+        noncurrent versions and delete markers.
+        """
+        ## Arrange ##
+        inventory = InventoryManifest.from_s3(self.s3, "imap-inventory-bucket", "inventory/manifest.json")
+
+        ## Act ##
+        batches_out = list(inventory.iter_keys(self.s3, batch_size=2))
+
+        ## Assert ##
+        assert batches_out[0] == (["imap_l0_instrument_date_v001.fits", "l0/imap_l0_instrument_date time_v002.fits"],
+                                  {"file": 0, "rows": 3})
+        assert batches_out[1] == ([], {"file": 0, "rows": 4})
+        assert [position for _, position in batches_out[2:]] == [{"file": 1, "rows": 2}, {"file": 1, "rows": 4},
+                                                                 {"file": 1, "rows": 5}]
+        assert sum(len(keys) for keys, _ in batches_out) == 7
+
+    def test_iter_keys_resume(self):
+        """
+        test that iter_keys resumes after a position it yielded.
+        """
+        ## Arrange ##
+        inventory = InventoryManifest.from_s3(self.s3, "imap-inventory-bucket", "inventory/manifest.json")
+
+        ## Act ##
+        batches_out = list(inventory.iter_keys(self.s3, batch_size=2, start={"file": 1, "rows": 2}))
+
+        ## Assert ##
+        assert [keys for keys, _ in batches_out] == [
+            ["imap_l1_instrument_date_v002.fits", "imap_l1_instrument_date_v003.fits"],
+            ["imap_l1_instrument_date_v004.fits"]]
+
+    @unittest.skipIf(pa is None, "requires pyarrow")
+    def test_iter_keys_parquet(self):
+        """
+        test that keys are read from Parquet files, which aren't url encoded.
+        """
+        ## Arrange ##
+        table = pa.table({
+            "bucket": ["imap-data-bucket"] * 3,
+            "key": ["imap_l0_instrument_date_v001.fits", "l0/imap_l0 instrument_date_v002.fits",
+                    "imap_l0_instrument_date_v003.fits"],
+            "is_latest": [True, True, True],
+            "is_delete_marker": [False, False, True],
+        })
+        data = io.BytesIO()
+        pq.write_table(table, data)
+        s3 = LocalS3({("imap-inventory-bucket", "inventory/data/0.parquet"): data.getvalue()})
+        inventory = InventoryManifest("imap-inventory-bucket", "Parquet", "", ["inventory/data/0.parquet"])
+
+        ## Act ##
+        batches_out = list(inventory.iter_keys(s3, batch_size=2, start={"file": 0, "rows": 1}))
+
+        ## Assert ##
+        assert batches_out == [(["l0/imap_l0 instrument_date_v002.fits"], {"file": 0, "rows": 2}),
+                               ([], {"file": 0, "rows": 3})]
+
+
+if __name__ == '__main__':
+    unittest.main()
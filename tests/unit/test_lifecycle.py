@@ -0,0 +1,135 @@
+import unittest
+
+from sds_in_a_box.SDSCode.lifecycle import ContainerResources
+
+
+class FakeClient():
+    """Stands in for Client, recording pings and closes."""
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+
+    def ping(self):
+        return self.healthy
+
+    def close(self):
+        self.closed = True
+
+
+class TestContainerResources(unittest.TestCase):
+    """tests for lifecycle.py"""
+
+    def setUp(self):
+        self.now = 0
+        self.filetypes = [
+            {"product": "IMAP-L0-File",
+            "pattern": {"mission":"imap", "level":"l0", "instrument":"*", "date":"*", "version":"*", "extension":"fits"},
+            "path": "/imap/l0"},
+        ]
+        self.loads = 0
+        self.clients = []
+
+    def load_filetypes(self):
+        self.loads += 1
+        return self.filetypes
+
+    def create_client(self):
+        self.clients.append(FakeClient())
+        return self.clients[-1]
+
+    def resources(self, **kwargs):
+        return ContainerResources(self.load_filetypes, self.create_client, clock=lambda: self.now, **kwargs)
+
+    def test_warm_reuse(self):
+        """
+        test that the configuration and client are created once and reused on later calls.
+        """
+        ## Arrange ##
+        resources = self.resources()
+
+        ## Act ##
+        for _ in range(3):
+            resources.get_filetypes()
+            resources.get_matcher()
+            client = resources.get_client()
+
+        ## Assert ##
+        assert self.loads == 1
+        assert self.clients == [client]
+        assert resources.get_stats()["config"] == {"warm_hits": 2, "cold_inits": 1}
+        assert resources.get_stats()["client"] == {"warm_hits": 2, "cold_inits": 1, "health_check_failures": 0}
+
+    def test_get_matcher(self):
+        """
+        test that the get_matcher method returns a matcher for the loaded file types.
+        """
+        ## Arrange ##
+        resources = self.resources()
+
+        ## Act ##
+        filetype, metadata = resources.get_matcher().match("imap_l0_instrument_date_version.fits")
+
+        ## Assert ##
+        assert filetype == self.filetypes[0]
+        assert self.loads == 1
+
+    def test_ttl_refresh(self):
+        """
+        test that resources older than the ttl are rebuilt and the old client is closed.
+        """
+        ## Arrange ##
+        resources = self.resources(ttl=10, idle_check=100)
+        resources.get_filetypes()
+        first_client = resources.get_client()
+
+        ## Act ##
+        self.now = 11
+        resources.get_filetypes()
+        second_client = resources.get_client()
+
+        ## Assert ##
+        assert self.loads == 2
+        assert first_client.closed
+        assert second_client is not first_client
+
+    def test_idle_health_check(self):
+        """
+        test that an idle client failing its health check is replaced.
+        """
+        ## Arrange ##
+        resources = self.resources(ttl=1000, idle_check=5)
+        first_client = resources.get_client()
+        first_client.healthy = False
+
+        ## Act ##
+        self.now = 6
+        second_client = resources.get_client()
+
+        ## Assert ##
+        assert second_client is not first_client
+        assert first_client.closed
+        assert resources.get_stats()["client"]["health_check_failures"] == 1
+
+    def test_invalidate(self):
+        """
+        test that the invalidate method closes the client and forces the resources to be recreated.
+        """
+        ## Arrange ##
+        resources = self.resources()
+        resources.get_filetypes()
+        first_client = resources.get_client()
+
+        ## Act ##
+        resources.invalidate()
+        resources.get_filetypes()
+        second_client = resources.get_client()
+
+        ## Assert ##
+        assert first_client.closed
+        assert second_client is not first_client
+        assert self.loads == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+
+from sds_in_a_box.SDSCode import indexer
+from sds_in_a_box.SDSCode.matcher import FiletypeMatcher
+
+
+class TestFiletypeMatcher(unittest.TestCase):
+    """tests for matcher.py"""
+
+    def setUp(self):
+        self.filetypes = [
+            {"product": "IMAP-L0-File",
+            "pattern": {"mission":"imap", "level":"l0", "instrument":"*", "date":"*", "version":"*", "extension":"fits"},
+            "path": "/imap/l0"},
+            {"product": "IMAP-L1-File",
+            "pattern": {"mission":"imap", "level":"l1", "instrument":"*", "date":"*", "version":"*", "extension":"fits"},
+            "path": "/imap/l1"},
+            {"product": "Any-Fits-File",
+            "pattern": {"mission":"*", "level":"*", "instrument":"*", "date":"*", "version":"*", "extension":"fits"},
+            "path": "/other"},
+        ]
+        self.matcher = FiletypeMatcher(self.filetypes)
+
+    def test_match(self):
+        """
+        test that the match method returns the file type and the metadata parsed from the filename.
+        """
+        ## Arrange ##
+        filename = "imap_l1_instrument_date_version.fits"
+        metadata_true = {'mission': 'imap', 'level': 'l1', 'instrument': 'instrument', 'date': 'date', 'version': 'version', 'extension': 'fits'}
+
+        ## Act ##
+        filetype_out, metadata_out = self.matcher.match(filename)
+
+        ## Assert ##
+        assert filetype_out == self.filetypes[1]
+        assert metadata_out == metadata_true
+
+    def test_match_first_filetype_wins(self):
+        """
+        test that the file type listed first in the configuration is returned when several match.
+        """
+        ## Arrange ##
+        filename = "imap_l0_instrument_date_version.fits"
+
+        ## Act ##
+        filetype_out, _ = self.matcher.match(filename)
+
+        ## Assert ##
+        assert filetype_out == self.filetypes[0]
+
+    def test_match_wildcard_fallback(self):
+        """
+        test that a filename with no literal match falls back to a wildcard pattern.
+        """
+        ## Arrange ##
+        filename = "emm_l0_anything_anything_anything.fits"
+
+        ## Act ##
+        filetype_out, metadata_out = self.matcher.match(filename)
+
+        ## Assert ##
+        assert filetype_out == self.filetypes[2]
+        assert metadata_out["mission"] == "emm"
+
+    def test_match_none(self):
+        """
+        test that the match method returns None when no file type matches.
+        """
+        ## Act / Assert ##
+        assert self.matcher.match("imap_l0_instrument_date_version.cdf") is None
+        assert self.matcher.match("imap_l0_instrument_date.fits") is None
+
+    def test_match_agrees_with_linear_scan(self):
+        """
+        test that the match method agrees with checking every file type in order
+        using _check_for_matching_filetype.
+        """
+        ## Arrange ##
+        filenames = [
+            "imap_l0_anything_anything_anything.fits",
+            "imap_l1_anything_anything_anything.fits",
+            "imap_l2_anything_anything_anything.fits",
+            "emm_l0_anything_anything_anything.fits",
+            "emm_l0_anything_anything_anything.cdf",
+            "imap_l1_anything_anything_anything.fits.gz",
+        ]
+
+        for filename in filenames:
+            ## Act ##
+            match_out = self.matcher.match(filename)
+
+            match_true = None
+            for filetype in self.filetypes:
+                metadata = indexer._check_for_matching_filetype(filetype['pattern'], filename)
+                if metadata is not None:
+                    match_true = (filetype, metadata)
+                    break
+
+            ## Assert ##
+            assert match_out == match_true
+
+    def test_match_compound_extension(self):
+        """
+        test that a literal containing "." matches one filename field per segment and is
+        returned as a single field.
+        """
+        ## Arrange ##
+        filetypes = self.filetypes + [
+            {"product": "IMAP-L1-Compressed-File",
+            "pattern": {"mission":"imap", "level":"l1", "instrument":"*", "date":"*", "version":"*", "extension":"fits.gz"},
+            "path": "/imap/l1"},
+        ]
+        matcher = FiletypeMatcher(filetypes)
+        filename = "imap_l1_anything_anything_anything.fits.gz"
+
+        ## Act ##
+        filetype_out, metadata_out = matcher.match(filename)
+
+        ## Assert ##
+        assert filetype_out == filetypes[3]
+        assert metadata_out["extension"] == "fits.gz"
+        assert metadata_out == indexer._check_for_matching_filetype(filetypes[3]["pattern"], filename)
+        assert matcher.match_batch([filename, "imap_l1_anything_anything_anything.fits"]) == [
+            (filetypes[3], metadata_out), matcher.match("imap_l1_anything_anything_anything.fits")]
+        assert matcher.match("imap_l1_anything_anything_anything.fits.zip") is None
+
+    def test_match_batch(self):
+        """
+        test that the match_batch method returns the result of match for every filename, in order.
+        """
+        ## Arrange ##
+        filenames = [
+            "imap_l0_instrument_date_version.fits",
+            "emm_l0_anything_anything_anything.fits",
+            "imap_l0_instrument_date_version.cdf",
+            "imap_l0_instrument_date.fits",
+            "imap_l1_instrument_date_version.fits",
+            "",
+        ] * 3
+
+        ## Act ##
+        matches_out = self.matcher.match_batch(filenames)
+
+        ## Assert ##
+        assert matches_out == [self.matcher.match(filename) for filename in filenames]
+
+
+if __name__ == '__main__':
+    unittest.main()
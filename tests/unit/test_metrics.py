@@ -0,0 +1,88 @@
+import io
+import json
+import unittest
+
+from sds_in_a_box.SDSCode.metrics import InvocationMetrics
+
+
+class Clock():
+    """Stands in for time.perf_counter."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestInvocationMetrics(unittest.TestCase):
+    """tests for metrics.py"""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.metrics = InvocationMetrics(namespace="SDS/Test", dimensions={"Index": "test_data"}, clock=self.clock)
+
+    def test_stage(self):
+        """
+        test that the time spent in every block of a stage is added up, including
+        blocks left with an exception.
+        """
+        ## Act ##
+        for seconds in (0.001, 0.002):
+            with self.metrics.stage("match"):
+                self.clock.now += seconds
+        with self.assertRaises(ValueError):
+            with self.metrics.stage("send"):
+                self.clock.now += 0.5
+                raise ValueError()
+
+        ## Assert ##
+        assert round(self.metrics.stages["match"], 6) == 3
+        assert round(self.metrics.stages["send"], 6) == 500
+
+    def test_get_record(self):
+        """
+        test that stages and counts are declared in the EMF metadata and set at the top level.
+        """
+        ## Arrange ##
+        with self.metrics.stage("config"):
+            self.clock.now += 0.25
+        self.metrics.add("records", 3)
+        self.metrics.add("records", 2)
+        self.metrics.add("bytes_sent", 100, "Bytes")
+
+        ## Act ##
+        record = self.metrics.get_record(timestamp=1700000000.5)
+
+        ## Assert ##
+        assert record["_aws"] == {"Timestamp": 1700000000500, "CloudWatchMetrics": [{
+            "Namespace": "SDS/Test",
+            "Dimensions": [["Index"]],
+            "Metrics": [{"Name": "config_ms", "Unit": "Milliseconds"},
+                        {"Name": "duration_ms", "Unit": "Milliseconds"},
+                        {"Name": "records", "Unit": "Count"},
+                        {"Name": "bytes_sent", "Unit": "Bytes"}]}]}
+        assert record["Index"] == "test_data"
+        assert record["config_ms"] == record["duration_ms"] == 250
+        assert record["records"] == 5
+        assert record["bytes_sent"] == 100
+
+    def test_emit(self):
+        """
+        test that the record is written as a single line of JSON.
+        """
+        ## Arrange ##
+        stream = io.StringIO()
+        self.metrics.add("failures", 1)
+
+        ## Act ##
+        self.metrics.emit(stream)
+
+        ## Assert ##
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["failures"] == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import json
+import marshal
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+from sds_in_a_box.SDSCode.profiling import InvocationProfiler
+
+
+class LocalBucket():
+    """Stands in for a boto3 S3 client, keeping the uploaded objects."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+
+def work():
+    """Something to profile."""
+    return [str(i) * 10 for i in range(10000)]
+
+
+class TestInvocationProfiler(unittest.TestCase):
+    """tests for profiling.py"""
+
+    def test_not_sampled(self):
+        """
+        test that an invocation that isn't sampled isn't profiled.
+        """
+        ## Arrange ##
+        profiler = InvocationProfiler(sample_rate=0.5, random=lambda: 0.5)
+
+        ## Act ##
+        with self.assertNoLogs("sds_in_a_box.SDSCode.profiling"):
+            with profiler.profile("request-1"):
+                work()
+
+        ## Assert ##
+        assert not tracemalloc.is_tracing()
+
+    def test_log_output(self):
+        """
+        test that the report of a sampled invocation is logged with the top functions
+        and allocation sites.
+        """
+        ## Arrange ##
+        profiler = InvocationProfiler(sample_rate=1, top=5)
+
+        ## Act ##
+        with self.assertLogs("sds_in_a_box.SDSCode.profiling", level="INFO") as logs:
+            with profiler.profile("request-1"):
+                work()
+
+        ## Assert ##
+        report = json.loads(logs.records[0].getMessage()[len("Profile: "):])
+        assert report["invocation"] == "request-1"
+        assert len(report["functions"]) == 5
+        assert "work" in [function["function"] for function in report["functions"]]
+        assert 0 < len(report["allocations"]) <= 5
+        assert report["peak_memory_bytes"] > 0
+        assert not tracemalloc.is_tracing()
+
+    def test_directory_output(self):
+        """
+        test that the report and the raw stats are written to a local directory,
+        even when the profiled block raises.
+        """
+        ## Arrange ##
+        directory = tempfile.mkdtemp()
+        profiler = InvocationProfiler(sample_rate=1, output=os.path.join(directory, "profiles"))
+
+        ## Act ##
+        with self.assertRaises(ValueError):
+            with profiler.profile("request-1"):
+                work()
+                raise ValueError()
+
+        ## Assert ##
+        with open(os.path.join(directory, "profiles", "request-1.json")) as f:
+            assert json.load(f)["invocation"] == "request-1"
+        with open(os.path.join(directory, "profiles", "request-1.prof"), "rb") as f:
+            assert any(key[2] == "work" for key in marshal.load(f))
+
+    def test_s3_output(self):
+        """
+        test that the report and the raw stats are uploaded under the S3 prefix.
+        """
+        ## Arrange ##
+        s3 = LocalBucket()
+        profiler = InvocationProfiler(sample_rate=1, output="s3://profile-bucket/indexer/", s3=s3)
+
+        ## Act ##
+        with profiler.profile("request-1"):
+            work()
+
+        ## Assert ##
+        assert sorted(s3.objects) == [("profile-bucket", "indexer/request-1.json"),
+                                      ("profile-bucket", "indexer/request-1.prof")]
+
+    def test_already_tracing(self):
+        """
+        test that allocation tracing started by the caller is left running.
+        """
+        ## Arrange ##
+        profiler = InvocationProfiler(sample_rate=1)
+        tracemalloc.start()
+
+        ## Act ##
+        try:
+            with self.assertLogs("sds_in_a_box.SDSCode.profiling", level="INFO"):
+                with profiler.profile():
+                    work()
+            tracing = tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+        ## Assert ##
+        assert tracing
+
+
+    def test_from_env(self):
+        """
+        test that the profiler is configured from the environment.
+        """
+        ## Act ##
+        with mock.patch.dict(os.environ, {"PROFILE_SAMPLE_RATE": "0.25", "PROFILE_TOP_N": "10"}):
+            profiler = InvocationProfiler.from_env()
+
+        ## Assert ##
+        assert (profiler.sample_rate, profiler.top, profiler.output) == (0.25, 10, None)
+
+    def test_from_env_invalid(self):
+        """
+        test that an invalid configuration is logged and turns profiling off instead of raising.
+        """
+        for environ in ({"PROFILE_SAMPLE_RATE": "often"}, {"PROFILE_SAMPLE_RATE": "2"},
+                        {"PROFILE_SAMPLE_RATE": "1", "PROFILE_TOP_N": "ten"}):
+            with self.subTest(environ=environ):
+                ## Act ##
+                with mock.patch.dict(os.environ, environ), \
+                        self.assertLogs("sds_in_a_box.SDSCode.profiling", level="WARNING"):
+                    profiler = InvocationProfiler.from_env()
+
+                ## Assert ##
+                assert profiler.sample_rate == 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,47 @@
-###################################################
-# NOTE: Doesn't actually do anything at the moment
-###################################################
-
 import aws_cdk as core
 import aws_cdk.assertions as assertions
 
 from sds_in_a_box.sds_in_a_box_stack import SdsInABoxStack
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in sds_in_a_box/sds_in_a_box_stack.py
-def test_sqs_queue_created():
+
+def test_indexer_queue_created():
+    app = core.App()
+    stack = SdsInABoxStack(app, "sds-in-a-box")
+    template = assertions.Template.from_stack(stack)
+
+    template.resource_count_is("AWS::SQS::Queue", 2)
+    template.has_resource_properties("AWS::SQS::Queue", {
+        "VisibilityTimeout": 5400,
+        "RedrivePolicy": {"maxReceiveCount": 5}
+    })
+
+
+def test_indexer_reads_from_queue_in_batches():
+    app = core.App()
+    stack = SdsInABoxStack(app, "sds-in-a-box",
+                           indexer_batch_size=200,
+                           indexer_batching_window=core.Duration.seconds(10))
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::EventSourceMapping", {
+        "BatchSize": 200,
+        "MaximumBatchingWindowInSeconds": 10,
+        "FunctionResponseTypes": ["ReportBatchItemFailures"],
+        "EventSourceArn": {"Fn::GetAtt": [assertions.Match.string_like_regexp("IndexerQueue"), "Arn"]}
+    })
+
+
+def test_bucket_notifies_queue():
     app = core.App()
     stack = SdsInABoxStack(app, "sds-in-a-box")
     template = assertions.Template.from_stack(stack)
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+    template.has_resource_properties("Custom::S3BucketNotifications", {
+        "NotificationConfiguration": {
+            "QueueConfigurations": [{
+                "Events": ["s3:ObjectCreated:*"],
+                "QueueArn": {"Fn::GetAtt": [assertions.Match.string_like_regexp("IndexerQueue"), "Arn"]}
+            }]
+        }
+    })
+    template.resource_count_is("AWS::Lambda::Permission", 0)